@@ -1,78 +1,339 @@
 import sys
 import subprocess
-import ast
 import os
+import time
+import threading
+import multiprocessing
+from collections import deque
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QFileDialog, 
-                             QCheckBox, QLineEdit, QComboBox, QTextEdit, 
+                             QCheckBox, QLineEdit, QComboBox, QTextEdit, QPlainTextEdit,
                              QGroupBox, QMessageBox, QProgressBar, QListWidget,
-                             QListWidgetItem, QTabWidget, QFrame)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize
+                             QListWidgetItem, QTabWidget, QFrame, QSpinBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, QThread, QObject, QTimer, QFileSystemWatcher, pyqtSignal, QSize
 from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
 from PyQt5.QtWidgets import QSizePolicy
 
+from pydeploy.startup import format_report, profile_startup
+from pydeploy.spec import VARIANTS, build_variants
+from pydeploy.envindex import EnvIndex, detect_gui_framework, import_report, suggest_hidden_imports
+from pydeploy.dynamic import dynamic_hidden_imports
+from pydeploy.monitor import format_sample, parse_cpu_list
+from pydeploy.history import check_regressions, format_regressions, list_builds
+from pydeploy.lazy import format_plan, plan as plan_lazy_imports
+from pydeploy.profiles import PROFILES, apply_profile, check_imports, compare_profiles, format_comparison
+from pydeploy.sizes import format_size_report, human_size, size_report
+from pydeploy.excludes import optimize_excludes
+from pydeploy.procs import CancelToken
+from pydeploy.imports import ParseCache, build_import_graph, import_cache_path, top_level_imports
+from pydeploy.engine import (BuildOptions, COMMON_EXCLUDES, GUI_FRAMEWORKS,
+                             LOG_TAIL_LINES, artifact_path, format_command, get_gui_imports,
+                             run_build)
+
 
 class ConvertThread(QThread):
     """Thread để chạy PyInstaller không block UI"""
     finished = pyqtSignal(bool, str)
     output = pyqtSignal(str)
     progress = pyqtSignal(int)
+    status = pyqtSignal(str)
+    resources = pyqtSignal(object)
+    
+    # Gom log thành từng khối thay vì một signal cho mỗi dòng
+    FLUSH_INTERVAL_MS = 100
     
-    def __init__(self, command):
+    def __init__(self, options, variants=None):
         super().__init__()
-        self.command = command
+        self.options = options
+        self.variants = variants
+        self.result = None
+        self.savings = None
+        self.cancel_token = CancelToken()
+        self.size_text = ''
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.last_progress = -1
+        self.last_status = ''
+        
+        # Timer sống ở UI thread, định kỳ đẩy các dòng đang chờ ra signal output
+        self.flush_timer = QTimer()
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush_output)
+        self.finished.connect(lambda *_: self.flush_timer.stop())
+    
+    def start(self):
+        self.flush_timer.start()
+        super().start()
+    
+    def queue_output(self, line):
+        with self.pending_lock:
+            self.pending.append(line)
+    
+    def flush_output(self):
+        with self.pending_lock:
+            lines, self.pending = self.pending, []
+        if lines:
+            self.output.emit('\n'.join(lines))
+    
+    def emit_progress(self, value):
+        if value != self.last_progress:
+            self.last_progress = value
+            self.progress.emit(value)
+    
+    def cancel(self):
+        """Dừng PyInstaller cùng mọi process con của nó"""
+        self.cancel_token.cancel()
+    
+    def emit_status(self, text):
+        if text != self.last_status:
+            self.last_status = text
+            self.status.emit(text)
+    
+    def run(self):
+        if self.variants:
+            try:
+                self.result, self.savings = build_variants(self.options, self.variants, self.queue_output,
+                                                           self.emit_progress, self.emit_status,
+                                                           self.cancel_token, self.resources.emit)
+            except Exception as e:
+                self.flush_output()
+                self.finished.emit(False, f'Lỗi: {e}')
+                return
+        else:
+            if self.options.optimize:
+                # Profile tối ưu bỏ docstring/assert: kiểm tra app còn import được trước khi build
+                check = check_imports(self.options)
+                for warning in check['warnings']:
+                    self.queue_output(f'Warning: {warning}')
+                if not check['ok']:
+                    for name, error in check['failed'].items():
+                        self.queue_output(f'Import of {name} fails under -{"O" * self.options.optimize}: {error}')
+                    self.flush_output()
+                    self.finished.emit(False, 'Lỗi: app không import được với profile đã chọn')
+                    return
+            self.result = run_build(self.options, self.queue_output, self.emit_progress, self.emit_status,
+                                    self.cancel_token, on_resources=self.resources.emit)
+        if self.result.success and not self.result.cached and not self.variants:
+            try:
+                self.size_text = format_size_report(size_report(self.options), top=10)
+            except Exception as e:
+                self.size_text = f'Size report unavailable: {e}'
+        self.flush_output()
+        self.finished.emit(self.result.success, self.result.message)
+
+
+class ImportGraphThread(QThread):
+    """Thread dựng import graph của cả project để mở file lớn không block UI"""
+    finished = pyqtSignal(str, object)
+    
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self.env_index = None
+        self.dynamic_imports = []
     
     def run(self):
         try:
-            process = subprocess.Popen(
-                self.command,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            progress_keywords = {
-                'building': 15, 'analyzing': 25, 'running': 35,
-                'processing': 45, 'collecting': 55, 'copying': 65,
-                'building exe': 75, 'building pyz': 80,
-                'appending': 85, 'completed successfully': 100
-            }
-            
-            current_progress = 5
-            self.progress.emit(5)
-            all_output = []
-            
-            for line in process.stdout:
-                line_lower = line.lower().strip()
-                self.output.emit(line.strip())
-                all_output.append(line.strip())
-                
-                for keyword, progress_value in progress_keywords.items():
-                    if keyword in line_lower:
-                        if progress_value > current_progress:
-                            current_progress = progress_value
-                            self.progress.emit(current_progress)
-                        break
-                
-                if current_progress < 90 and line.strip():
-                    current_progress = min(current_progress + 1, 90)
-                    self.progress.emit(current_progress)
-            
-            process.wait()
-            
-            if process.returncode == 0:
-                self.progress.emit(100)
-                self.finished.emit(True, "Chuyển đổi thành công!")
-            else:
-                error_lines = [line for line in all_output if 'error' in line.lower() or 'failed' in line.lower()]
-                error_msg = '\n'.join(error_lines[-5:]) if error_lines else '\n'.join(all_output[-10:])
-                self.finished.emit(False, f"PyInstaller lỗi (code {process.returncode}):\n\n{error_msg}")
-                
+            cache = ParseCache(import_cache_path(self.file_path))
+            graph = build_import_graph(self.file_path, cache)
+        except Exception as e:
+            print(f"Lỗi phân tích file: {e}")
+            graph = None
+        try:
+            # Index môi trường đã cache, chỉ dựng lại khi site-packages thay đổi
+            self.env_index = EnvIndex.load()
+        except Exception as e:
+            print(f"Lỗi đọc môi trường: {e}")
+        if graph is not None and self.env_index is not None:
+            try:
+                self.dynamic_imports = dynamic_hidden_imports(self.file_path, 'low', self.env_index, graph)
+            except Exception as e:
+                print(f"Lỗi quét import động: {e}")
+        self.finished.emit(self.file_path, graph)
+
+
+class StartupProfileThread(QThread):
+    """Thread chạy thử exe nhiều lần để đo thời gian khởi động"""
+    finished = pyqtSignal(str)
+    
+    def __init__(self, artifact, runs=5):
+        super().__init__()
+        self.artifact = artifact
+        self.runs = runs
+    
+    def run(self):
+        try:
+            report = profile_startup(self.artifact, self.runs, imports=True)
+            self.finished.emit(format_report(report))
+        except Exception as e:
+            self.finished.emit(f"Lỗi: {str(e)}")
+
+
+class ProfileCompareThread(QThread):
+    """Thread build app với từng profile rồi so dung lượng và thời gian khởi động với default"""
+    finished = pyqtSignal(str)
+    
+    def __init__(self, options, runs=3):
+        super().__init__()
+        self.options = options
+        self.runs = runs
+    
+    def run(self):
+        try:
+            self.finished.emit(format_comparison(compare_profiles(self.options, runs=self.runs)))
+        except Exception as e:
+            self.finished.emit(f"Lỗi: {str(e)}")
+
+
+class LazyImportPlanThread(QThread):
+    """Thread đo thời gian import của từng module ngoài và ước tính startup tiết kiệm được khi trì hoãn"""
+    finished = pyqtSignal(str)
+    
+    def __init__(self, options):
+        super().__init__()
+        self.options = options
+    
+    def run(self):
+        try:
+            self.finished.emit(format_plan(plan_lazy_imports(self.options)))
+        except Exception as e:
+            self.finished.emit(f"Lỗi: {str(e)}")
+
+
+class ExcludeOptimizerThread(QThread):
+    """Thread tìm các module loại bỏ được an toàn từ module graph của PyInstaller"""
+    finished = pyqtSignal(object, str)
+    
+    def __init__(self, options, app_imports):
+        super().__init__()
+        self.options = options
+        self.app_imports = set(app_imports)
+    
+    def run(self):
+        try:
+            self.finished.emit(optimize_excludes(self.options, self.app_imports or None), '')
+        except FileNotFoundError:
+            self.finished.emit([], 'Build the project once so the PyInstaller module graph '
+                                   'is available, then run Auto detect again.')
         except Exception as e:
-            self.finished.emit(False, f"Lỗi: {str(e)}")
+            self.finished.emit([], f"Lỗi: {str(e)}")
+
+
+class BatchQueue(QObject):
+    """Hàng đợi build nhiều file, chạy tối đa max_workers ConvertThread cùng lúc"""
+    job_changed = pyqtSignal(int)
+    job_output = pyqtSignal(int, str)
+    stats_changed = pyqtSignal(str)
+    all_finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = []
+        self.max_workers = 1
+        self.running = {}
+        self.started_at = None
+        self.job_counter = 0
+
+    def add_job(self, file_path, name, options):
+        self.jobs.append({
+            'file': file_path,
+            'name': name,
+            'options': options,
+            'status': 'Queued',
+            'progress': 0,
+            'log': deque(maxlen=LOG_TAIL_LINES),
+            'started': None,
+            'ended': None
+        })
+        return len(self.jobs) - 1
+
+    def remove_job(self, job_id):
+        # Job id là index trong self.jobs nên chỉ xoá khi không có job đang chạy
+        if not self.running:
+            del self.jobs[job_id]
+
+    def clear(self):
+        if not self.running:
+            self.jobs = []
+
+    def is_running(self):
+        return bool(self.running)
+
+    def start(self, max_workers):
+        self.max_workers = max(1, max_workers)
+        if not self.running:
+            self.started_at = time.time()
+        self.fill_slots()
+
+    def fill_slots(self):
+        for job_id, job in enumerate(self.jobs):
+            if len(self.running) >= self.max_workers:
+                break
+            if job['status'] != 'Queued':
+                continue
+
+            job['status'] = 'Running'
+            job['started'] = time.time()
+            thread = ConvertThread(job['options'])
+            thread.output.connect(lambda line, j=job_id: self.on_job_output(j, line))
+            thread.progress.connect(lambda value, j=job_id: self.on_job_progress(j, value))
+            thread.finished.connect(lambda ok, msg, j=job_id: self.on_job_finished(j, ok, msg))
+            self.running[job_id] = thread
+            thread.start()
+            self.job_changed.emit(job_id)
+
+        self.stats_changed.emit(self.stats_text())
+        if not self.running:
+            self.all_finished.emit()
+
+    def on_job_output(self, job_id, text):
+        self.jobs[job_id]['log'].extend(text.split('\n'))
+        self.job_output.emit(job_id, text)
+
+    def on_job_progress(self, job_id, value):
+        self.jobs[job_id]['progress'] = value
+        self.job_changed.emit(job_id)
+
+    def on_job_finished(self, job_id, success, message):
+        job = self.jobs[job_id]
+        job['status'] = 'Done' if success else 'Failed'
+        job['progress'] = 100 if success else job['progress']
+        job['ended'] = time.time()
+        job['log'].append(f'\n{message}')
+        thread = self.running.pop(job_id, None)
+        if thread is not None:
+            # finished(bool, str) được phát trước khi run() trả về: chờ thread dừng hẳn rồi mới bỏ tham chiếu
+            thread.wait()
+            thread.deleteLater()
+        self.job_changed.emit(job_id)
+        self.fill_slots()
+
+    def stats_text(self):
+        """Tổng hợp tiến độ, throughput và ETA của cả batch"""
+        total = len(self.jobs)
+        done = sum(1 for job in self.jobs if job['status'] in ('Done', 'Failed'))
+        failed = sum(1 for job in self.jobs if job['status'] == 'Failed')
+        if not total:
+            return 'No jobs queued'
+
+        text = f'{done}/{total} finished'
+        if failed:
+            text += f' ({failed} failed)'
+        if self.started_at is None or not done:
+            return text
+
+        elapsed = time.time() - self.started_at
+        throughput = done / elapsed * 60
+        text += f' • {throughput:.1f} builds/min'
+
+        remaining = total - done
+        if remaining:
+            eta = remaining / (done / elapsed)
+            text += f' • ETA {int(eta // 60)}m {int(eta % 60):02d}s'
+        else:
+            text += f' • total {int(elapsed // 60)}m {int(elapsed % 60):02d}s'
+        return text
 
 
 class PyToExeConverter(QMainWindow):
@@ -80,6 +341,21 @@ class PyToExeConverter(QMainWindow):
         super().__init__()
         self.selected_file = None
         self.convert_thread = None
+        self.build_status = ''
+        self.graph_thread = None
+        self.profile_thread = None
+        self.exclude_thread = None
+        self.rebuild_pending = False
+        self.watched_stamps = {}
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_watched_change)
+        self.file_watcher.directoryChanged.connect(self.on_watched_change)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(500)
+        self.watch_timer.timeout.connect(self.on_watch_debounced)
+        self.import_graph = None
+        self.env_index = None
         self.used_modules = set()
         self.output_dir = "dist"
         self.init_ui()
@@ -87,20 +363,8 @@ class PyToExeConverter(QMainWindow):
     
     def analyze_imports(self, file_path):
         """Phân tích file Python để tìm modules được import"""
-        imports = set()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                tree = ast.parse(f.read(), filename=file_path)
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.add(alias.name.split('.')[0])
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.add(node.module.split('.')[0])
-            
-            return imports
+            return top_level_imports(file_path)
         except Exception as e:
             print(f"Lỗi phân tích file: {e}")
             return set()
@@ -189,6 +453,17 @@ class PyToExeConverter(QMainWindow):
         self.clean_build_cb.setChecked(True)
         basic_layout.addWidget(self.clean_build_cb)
         
+        self.warm_cb = QCheckBox('Warm build (reuse analysis cache, no --clean)')
+        basic_layout.addWidget(self.warm_cb)
+        
+        self.watch_cb = QCheckBox('Watch mode (rebuild on save)')
+        self.watch_cb.toggled.connect(self.toggle_watch)
+        basic_layout.addWidget(self.watch_cb)
+        
+        self.incremental_cb = QCheckBox('Skip unchanged builds (incremental)')
+        self.incremental_cb.setChecked(True)
+        basic_layout.addWidget(self.incremental_cb)
+        
         # Separator
         line = QFrame()
         line.setFrameShape(QFrame.HLine)
@@ -201,9 +476,7 @@ class PyToExeConverter(QMainWindow):
         gui_label.setMinimumWidth(110)
         gui_row.addWidget(gui_label)
         self.gui_combo = QComboBox()
-        self.gui_combo.addItems(['None', 'Tkinter', 'CustomTkinter',
-                                 'PyQt5', 'PyQt6', 'PySide2', 'PySide6',
-                                 'Kivy', 'Pygame'])
+        self.gui_combo.addItems(GUI_FRAMEWORKS)
         gui_row.addWidget(self.gui_combo)
         basic_layout.addLayout(gui_row)
         
@@ -260,12 +533,7 @@ class PyToExeConverter(QMainWindow):
         self.exclude_list.setMaximumHeight(140)
         self.exclude_list.setSelectionMode(QListWidget.MultiSelection)
         
-        self.common_excludes = [
-            'unittest', 'test', 'doctest', 'pydoc',
-            'tkinter', 'PyQt5', 'PyQt6', 'PySide2', 
-            'PySide6', 'matplotlib', 'scipy', 'pandas',
-            'numpy', 'PIL', 'wx', 'sqlite3', 'email'
-        ]
+        self.common_excludes = list(COMMON_EXCLUDES)
         
         for module in self.common_excludes:
             item = QListWidgetItem(module)
@@ -278,6 +546,121 @@ class PyToExeConverter(QMainWindow):
         self.custom_exclude_input.setPlaceholderText('Custom modules...')
         advanced_layout.addWidget(self.custom_exclude_input)
         
+        warm_row = QHBoxLayout()
+        warm_row.addWidget(QLabel('Warm cache limit (MB):'))
+        self.warm_cache_spin = QSpinBox()
+        self.warm_cache_spin.setRange(100, 100000)
+        self.warm_cache_spin.setSingleStep(256)
+        self.warm_cache_spin.setValue(2048)
+        warm_row.addWidget(self.warm_cache_spin)
+        advanced_layout.addLayout(warm_row)
+        
+        daemon_row = QHBoxLayout()
+        daemon_row.addWidget(QLabel('Build daemon:'))
+        self.daemon_input = QLineEdit()
+        self.daemon_input.setPlaceholderText('host:port (python -m pydeploy daemon)')
+        daemon_row.addWidget(self.daemon_input)
+        advanced_layout.addLayout(daemon_row)
+        
+        remote_row = QHBoxLayout()
+        remote_row.addWidget(QLabel('Remote workers:'))
+        self.remote_input = QLineEdit()
+        self.remote_input.setPlaceholderText('host:port, host:port (python -m pydeploy worker)')
+        remote_row.addWidget(self.remote_input)
+        advanced_layout.addLayout(remote_row)
+        
+        cache_row = QHBoxLayout()
+        cache_row.addWidget(QLabel('Artifact cache:'))
+        self.cache_input = QLineEdit(os.environ.get('PYDEPLOY_CACHE', ''))
+        self.cache_input.setPlaceholderText('folder, share or http:// URL (reuse builds by fingerprint)')
+        cache_row.addWidget(self.cache_input)
+        advanced_layout.addLayout(cache_row)
+        
+        limits_row = QHBoxLayout()
+        limits_row.addWidget(QLabel('Memory cap (MB):'))
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(0, 262144)
+        self.memory_limit_spin.setSingleStep(512)
+        self.memory_limit_spin.setSpecialValueText('off')
+        limits_row.addWidget(self.memory_limit_spin)
+        limits_row.addWidget(QLabel('Nice:'))
+        self.nice_spin = QSpinBox()
+        self.nice_spin.setRange(0, 19)
+        limits_row.addWidget(self.nice_spin)
+        limits_row.addWidget(QLabel('CPUs:'))
+        self.cpus_input = QLineEdit()
+        self.cpus_input.setPlaceholderText('all (e.g. 0-3)')
+        limits_row.addWidget(self.cpus_input)
+        advanced_layout.addLayout(limits_row)
+        
+        profile_row = QHBoxLayout()
+        profile_row.addWidget(QLabel('Build profile:'))
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(list(PROFILES))
+        self.profile_combo.setToolTip('release: -OO bytecode (no docstrings/asserts) and stripped binaries; '
+                                      'release-noarchive: same with loose .pyc files instead of the PYZ')
+        profile_row.addWidget(self.profile_combo)
+        self.compare_profiles_btn = QPushButton('Compare profiles')
+        self.compare_profiles_btn.clicked.connect(self.compare_build_profiles)
+        profile_row.addWidget(self.compare_profiles_btn)
+        advanced_layout.addLayout(profile_row)
+        
+        upx_row = QHBoxLayout()
+        self.upx_cb = QCheckBox('UPX compress')
+        self.upx_cb.setToolTip('Compress binaries in parallel; unchanged binaries are reused from the UPX cache')
+        upx_row.addWidget(self.upx_cb)
+        self.upx_dir_input = QLineEdit()
+        self.upx_dir_input.setPlaceholderText('upx folder (default: PATH)')
+        upx_row.addWidget(self.upx_dir_input)
+        advanced_layout.addLayout(upx_row)
+        self.upx_exclude_input = QLineEdit()
+        self.upx_exclude_input.setPlaceholderText('Never compress: Qt5Core*.dll, libssl*.so* ...')
+        advanced_layout.addWidget(self.upx_exclude_input)
+        
+        lazy_row = QHBoxLayout()
+        lazy_row.addWidget(QLabel('Lazy imports:'))
+        self.lazy_input = QLineEdit()
+        self.lazy_input.setPlaceholderText('pandas, matplotlib.pyplot (deferred in a staged copy)')
+        lazy_row.addWidget(self.lazy_input)
+        lazy_row.addWidget(QLabel('or slower than (ms):'))
+        self.lazy_threshold_spin = QSpinBox()
+        self.lazy_threshold_spin.setRange(0, 10000)
+        self.lazy_threshold_spin.setSingleStep(25)
+        self.lazy_threshold_spin.setSpecialValueText('off')
+        lazy_row.addWidget(self.lazy_threshold_spin)
+        self.lazy_plan_btn = QPushButton('Measure imports')
+        self.lazy_plan_btn.clicked.connect(self.measure_lazy_imports)
+        lazy_row.addWidget(self.lazy_plan_btn)
+        advanced_layout.addLayout(lazy_row)
+        
+        assets_row = QHBoxLayout()
+        assets_row.addWidget(QLabel('Asset folders:'))
+        self.assets_input = QLineEdit()
+        self.assets_input.setPlaceholderText('data, models:weights (packed into <name>.assets, read via pydeploy_assets)')
+        assets_row.addWidget(self.assets_input)
+        self.assets_inside_cb = QCheckBox('Embed in bundle')
+        self.assets_inside_cb.setToolTip('Default: archive placed next to the executable and memory-mapped, never extracted')
+        assets_row.addWidget(self.assets_inside_cb)
+        advanced_layout.addLayout(assets_row)
+        
+        self.startup_hook_cb = QCheckBox('Bundle startup profiling hook')
+        self.startup_hook_cb.setToolTip('Inactive unless launched by "Profile startup"')
+        advanced_layout.addWidget(self.startup_hook_cb)
+        
+        # Nhiều biến thể từ một lần Analysis (spec sinh tự động)
+        advanced_layout.addWidget(QLabel('Variants (one shared analysis):'))
+        variants_row = QHBoxLayout()
+        self.variant_cbs = {}
+        for variant in VARIANTS:
+            cb = QCheckBox(variant)
+            cb.setChecked(variant in ('console-onefile', 'windowed-onefile'))
+            self.variant_cbs[variant] = cb
+            variants_row.addWidget(cb)
+        advanced_layout.addLayout(variants_row)
+        self.variants_btn = QPushButton('Build variants')
+        self.variants_btn.clicked.connect(self.build_selected_variants)
+        advanced_layout.addWidget(self.variants_btn)
+        
         advanced_layout.addStretch()
         advanced_tab.setLayout(advanced_layout)
         self.tabs.addTab(advanced_tab, "Advanced")
@@ -311,8 +694,9 @@ class PyToExeConverter(QMainWindow):
         
         log_layout.addWidget(QLabel('Output Log:'))
         
-        self.log_display = QTextEdit()
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
+        self.log_display.setMaximumBlockCount(LOG_TAIL_LINES)
         log_font = QFont("Courier New", 9)
         self.log_display.setFont(log_font)
         log_layout.addWidget(self.log_display)
@@ -324,14 +708,107 @@ class PyToExeConverter(QMainWindow):
         log_tab.setLayout(log_layout)
         self.tabs.addTab(log_tab, "Log")
         
+        # Tab 5: Batch
+        batch_tab = QWidget()
+        batch_layout = QVBoxLayout()
+        batch_layout.setSpacing(8)
+        batch_layout.setContentsMargins(10, 10, 10, 10)
+        
+        batch_layout.addWidget(QLabel('Build queue (each job keeps the options it was added with):'))
+        
+        self.batch_list = QListWidget()
+        self.batch_list.setMaximumHeight(140)
+        self.batch_list.currentRowChanged.connect(self.show_batch_log)
+        batch_layout.addWidget(self.batch_list)
+        
+        batch_btn_row = QHBoxLayout()
+        add_current_btn = QPushButton('Add current')
+        add_current_btn.clicked.connect(self.add_current_to_batch)
+        batch_btn_row.addWidget(add_current_btn)
+        add_files_btn = QPushButton('Add files...')
+        add_files_btn.clicked.connect(self.add_files_to_batch)
+        batch_btn_row.addWidget(add_files_btn)
+        remove_job_btn = QPushButton('Remove')
+        remove_job_btn.clicked.connect(self.remove_batch_job)
+        batch_btn_row.addWidget(remove_job_btn)
+        clear_jobs_btn = QPushButton('Clear')
+        clear_jobs_btn.clicked.connect(self.clear_batch)
+        batch_btn_row.addWidget(clear_jobs_btn)
+        batch_layout.addLayout(batch_btn_row)
+        
+        workers_row = QHBoxLayout()
+        workers_label = QLabel('Parallel workers:')
+        workers_label.setMinimumWidth(110)
+        workers_row.addWidget(workers_label)
+        self.workers_spin = QSpinBox()
+        cpu_count = os.cpu_count() or 1
+        self.workers_spin.setRange(1, cpu_count)
+        self.workers_spin.setValue(max(1, cpu_count // 2))
+        workers_row.addWidget(self.workers_spin)
+        self.batch_start_btn = QPushButton('Start batch')
+        self.batch_start_btn.clicked.connect(self.start_batch)
+        workers_row.addWidget(self.batch_start_btn)
+        batch_layout.addLayout(workers_row)
+        
+        self.batch_stats_label = QLabel('No jobs queued')
+        batch_layout.addWidget(self.batch_stats_label)
+        
+        self.batch_log_display = QPlainTextEdit()
+        self.batch_log_display.setReadOnly(True)
+        self.batch_log_display.setMaximumBlockCount(LOG_TAIL_LINES)
+        self.batch_log_display.setFont(QFont("Courier New", 9))
+        batch_layout.addWidget(self.batch_log_display)
+        
+        batch_tab.setLayout(batch_layout)
+        self.tabs.addTab(batch_tab, "Batch")
+        
+        # Tab 6: History
+        history_tab = QWidget()
+        history_layout = QVBoxLayout()
+        history_layout.setSpacing(8)
+        history_layout.setContentsMargins(10, 10, 10, 10)
+        
+        self.history_table = QTableWidget(0, 8)
+        self.history_table.setHorizontalHeaderLabels(['#', 'When', 'Mode', 'Time', 'Size', 'Peak RSS',
+                                                      'Modules', 'Status'])
+        self.history_table.verticalHeader().setVisible(False)
+        self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        history_layout.addWidget(self.history_table)
+        
+        self.regression_display = QPlainTextEdit()
+        self.regression_display.setReadOnly(True)
+        self.regression_display.setMaximumHeight(110)
+        history_layout.addWidget(self.regression_display)
+        
+        refresh_history_btn = QPushButton('Refresh')
+        refresh_history_btn.clicked.connect(self.refresh_history)
+        history_layout.addWidget(refresh_history_btn)
+        
+        history_tab.setLayout(history_layout)
+        self.tabs.addTab(history_tab, "History")
+        
+        self.batch_queue = BatchQueue(self)
+        self.batch_queue.job_changed.connect(self.update_batch_item)
+        self.batch_queue.job_output.connect(self.on_batch_output)
+        self.batch_queue.stats_changed.connect(self.batch_stats_label.setText)
+        self.batch_queue.all_finished.connect(self.on_batch_finished)
+        
         main_layout.addWidget(self.tabs)
         
         # Connect signals
-        for widget in [self.onefile_cb, self.noconsole_cb, self.clean_build_cb]:
+        for widget in [self.onefile_cb, self.noconsole_cb, self.clean_build_cb, self.incremental_cb, self.warm_cb,
+                       self.startup_hook_cb, self.upx_cb, self.assets_inside_cb]:
             widget.stateChanged.connect(self.update_command)
-        for widget in [self.name_input, self.icon_input, self.hidden_input, self.custom_exclude_input]:
+        for widget in [self.name_input, self.icon_input, self.hidden_input, self.custom_exclude_input,
+                       self.assets_input, self.daemon_input, self.remote_input, self.cache_input, self.cpus_input,
+                       self.upx_dir_input, self.upx_exclude_input, self.lazy_input]:
             widget.textChanged.connect(self.update_command)
+        for widget in [self.warm_cache_spin, self.memory_limit_spin, self.nice_spin, self.lazy_threshold_spin]:
+            widget.valueChanged.connect(self.update_command)
         self.gui_combo.currentTextChanged.connect(self.update_command)
+        self.profile_combo.currentTextChanged.connect(self.update_command)
+        self.hidden_input.textChanged.connect(self.check_hidden_imports)
         self.exclude_list.itemSelectionChanged.connect(self.update_command)
         
         # Progress group
@@ -343,6 +820,10 @@ class PyToExeConverter(QMainWindow):
         progress_header = QHBoxLayout()
         self.progress_label = QLabel('Ready to convert')
         progress_header.addWidget(self.progress_label)
+        # CPU / RSS / I/O của cây process PyInstaller, cập nhật mỗi mẫu
+        self.resource_label = QLabel('')
+        self.resource_label.setStyleSheet('color: gray;')
+        progress_header.addWidget(self.resource_label)
         self.progress_percent = QLabel('0%')
         self.progress_percent.setAlignment(Qt.AlignRight)
         progress_header.addWidget(self.progress_percent)
@@ -371,6 +852,12 @@ class PyToExeConverter(QMainWindow):
         self.open_folder_btn.setMinimumHeight(32)
         btn_layout.addWidget(self.open_folder_btn, 1)
         
+        self.profile_btn = QPushButton('Profile startup')
+        self.profile_btn.clicked.connect(self.profile_startup)
+        self.profile_btn.setEnabled(False)
+        self.profile_btn.setMinimumHeight(32)
+        btn_layout.addWidget(self.profile_btn, 1)
+        
         main_layout.addLayout(btn_layout)
     
     def copy_command_text(self):
@@ -410,10 +897,113 @@ class PyToExeConverter(QMainWindow):
             name = os.path.splitext(os.path.basename(file_path))[0]
             self.name_input.setText(name)
         
+        self.analyze_btn.setEnabled(False)
+        self.analyze_btn.setText('Analyzing...')
+        self.update_command()
+        
+        self.graph_thread = ImportGraphThread(file_path)
+        self.graph_thread.finished.connect(self.on_import_graph)
+        self.graph_thread.start()
+    
+    def on_import_graph(self, file_path, graph):
+        # Bỏ qua kết quả của file cũ nếu người dùng đã chọn file khác
+        if file_path != self.selected_file:
+            return
+        
+        self.import_graph = graph
+        tooltip = file_path
+        if graph is not None:
+            self.used_modules = set(graph.external)
+            tooltip += f'\n{len(graph.files)} local files ({graph.parsed} parsed, {graph.cached} cached)'
+        else:
+            self.used_modules = self.analyze_imports(file_path)
+        
+        self.env_index = self.graph_thread.env_index or self.env_index
+        if self.env_index:
+            report = import_report(self.used_modules, self.env_index)
+            if report['missing']:
+                tooltip += f"\nNot installed: {', '.join(report['missing'])}"
+                self.log_display.appendPlainText(
+                    f"Warning: imports not installed in this environment: {', '.join(report['missing'])}")
+            if self.gui_combo.currentText() == 'None':
+                self.gui_combo.setCurrentText(detect_gui_framework(self.used_modules))
+            suggestions = suggest_hidden_imports(self.used_modules, self.gui_combo.currentText(), self.env_index)
+            if suggestions:
+                self.hidden_input.setPlaceholderText(', '.join(suggestions))
+            self.apply_dynamic_imports(self.graph_thread.dynamic_imports)
+            self.check_hidden_imports()
+        self.file_label.setToolTip(tooltip)
+        
+        self.analyze_btn.setText('Auto detect')
         self.analyze_btn.setEnabled(True)
-        self.used_modules = self.analyze_imports(file_path)
         self.update_exclude_list_colors()
-        self.update_command()
+        self.refresh_history()
+        if self.watch_cb.isChecked():
+            self.update_watch_paths()
+    
+    def watch_paths(self):
+        files = self.import_graph.files if self.import_graph else [self.selected_file]
+        if self.icon_input.text() and os.path.isfile(self.icon_input.text()):
+            files = files + [self.icon_input.text()]
+        return [os.path.abspath(f) for f in files if os.path.exists(f)]
+    
+    def update_watch_paths(self):
+        """Theo dõi các file trong import closure và thư mục chứa chúng (editor hay lưu bằng rename)"""
+        files = self.watch_paths()
+        dirs = sorted({os.path.dirname(f) for f in files})
+        old = self.file_watcher.files() + self.file_watcher.directories()
+        if old:
+            self.file_watcher.removePaths(old)
+        if files:
+            self.file_watcher.addPaths(files + dirs)
+        self.watched_stamps = self.file_stamps(files)
+    
+    def file_stamps(self, files):
+        stamps = {}
+        for path in files:
+            try:
+                st = os.stat(path)
+                stamps[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamps[path] = None
+        return stamps
+    
+    def toggle_watch(self, enabled):
+        if enabled and self.selected_file:
+            self.update_watch_paths()
+            self.log_display.appendPlainText('Watch mode: rebuilding on save.')
+        else:
+            self.watch_timer.stop()
+            paths = self.file_watcher.files() + self.file_watcher.directories()
+            if paths:
+                self.file_watcher.removePaths(paths)
+    
+    def on_watched_change(self, path):
+        if not self.watch_cb.isChecked():
+            return
+        # Thư mục đổi vì file khác (vd. thư mục build) thì bỏ qua
+        stamps = self.file_stamps(self.watched_stamps)
+        if stamps == self.watched_stamps:
+            return
+        self.watched_stamps = stamps
+        self.watch_timer.start()
+    
+    def on_watch_debounced(self):
+        # File bị thay bằng rename sẽ rơi khỏi watcher nên gắn lại
+        missing = [f for f in self.watch_paths() if f not in self.file_watcher.files()]
+        if missing:
+            self.file_watcher.addPaths(missing)
+        
+        if self.convert_thread and self.convert_thread.isRunning():
+            self.log_display.appendPlainText('Input changed, cancelling in-flight build...')
+            self.rebuild_pending = True
+            self.convert_thread.cancel()
+            return
+        self.convert()
+        # Import mới có thể kéo thêm module local vào closure
+        self.graph_thread = ImportGraphThread(self.selected_file)
+        self.graph_thread.finished.connect(self.on_import_graph)
+        self.graph_thread.start()
     
     def browse_icon(self):
         icon_path, _ = QFileDialog.getOpenFileName(self, 'Select icon', '', 'Icon Files (*.ico)')
@@ -433,41 +1023,104 @@ class PyToExeConverter(QMainWindow):
     
     def update_exclude_list_colors(self):
         """Mark modules that are in use with different text color"""
-        palette = QApplication.palette()
-        
         for i in range(self.exclude_list.count()):
             item = self.exclude_list.item(i)
             module_name = item.data(Qt.UserRole)
+            info = self.env_index.lookup(module_name) if self.env_index else None
+            if info:
+                item.setToolTip(f"{info['distribution']} {info['version']} • {human_size(info['size'])}")
             
             if module_name in self.used_modules:
                 # Red for modules in use
                 item.setForeground(QColor(180, 0, 0))
+            elif self.env_index and not self.env_index.is_available(module_name):
+                # Gray: không cài trong môi trường này, exclude cũng không thay đổi gì
+                item.setForeground(QColor(150, 150, 150))
+                item.setToolTip('Not installed')
             else:
                 # Green for safe to exclude
                 item.setForeground(QColor(0, 120, 0))
     
+    def apply_dynamic_imports(self, suggestions):
+        """Import động confidence cao được thêm thẳng vào hidden imports, phần còn lại chỉ ghi log"""
+        hidden = [h.strip() for h in self.hidden_input.text().split(',') if h.strip()]
+        added = []
+        for suggestion in suggestions:
+            module = suggestion['module']
+            if module in hidden:
+                continue
+            if suggestion['confidence'] == 'high':
+                hidden.append(module)
+                added.append(module)
+            else:
+                self.log_display.appendPlainText(
+                    f"Possible hidden import: {module} ({suggestion['confidence']}, "
+                    f"{suggestion['kind']} at {suggestion['source']})")
+        if added:
+            self.hidden_input.setText(', '.join(hidden))
+            self.log_display.appendPlainText(f"Added dynamic imports: {', '.join(added)}")
+    
+    def check_hidden_imports(self):
+        """Đánh dấu hidden import không có trong môi trường (tra index, không import thử)"""
+        if not self.env_index:
+            return
+        names = [h.strip() for h in self.hidden_input.text().split(',') if h.strip()]
+        missing = [name for name in names if not self.env_index.is_available(name)]
+        if missing:
+            self.hidden_input.setStyleSheet('color: rgb(180, 0, 0);')
+            self.hidden_input.setToolTip(f"Not installed: {', '.join(missing)}")
+        else:
+            self.hidden_input.setStyleSheet('')
+            self.hidden_input.setToolTip('')
+    
     def auto_detect_excludes(self):
         if not self.selected_file:
             return
         
+        # Module graph nằm trong workpath của lần build gần nhất với đúng bộ tuỳ chọn đó
+        options = self.build_options()
+        if self.convert_thread and self.convert_thread.options.script == self.selected_file:
+            options = self.convert_thread.options
+        
+        self.analyze_btn.setEnabled(False)
+        self.analyze_btn.setText('Analyzing...')
+        self.exclude_thread = ExcludeOptimizerThread(options, self.used_modules)
+        self.exclude_thread.finished.connect(self.on_excludes_found)
+        self.exclude_thread.start()
+    
+    def on_excludes_found(self, proposals, error):
+        self.analyze_btn.setText('Auto detect')
+        self.analyze_btn.setEnabled(True)
+        if error:
+            QMessageBox.information(self, 'Info', error)
+            return
+        
         for i in range(self.exclude_list.count()):
             self.exclude_list.item(i).setSelected(False)
         
+        items = {self.exclude_list.item(i).data(Qt.UserRole): self.exclude_list.item(i)
+                 for i in range(self.exclude_list.count())}
         safe_to_exclude = []
-        for i in range(self.exclude_list.count()):
-            item = self.exclude_list.item(i)
-            module_name = item.data(Qt.UserRole)
-            
-            if module_name not in self.used_modules:
-                item.setSelected(True)
-                safe_to_exclude.append(module_name)
+        for proposal in proposals:
+            module_name = proposal['module']
+            item = items.get(module_name)
+            if item is None:
+                item = QListWidgetItem(module_name)
+                item.setData(Qt.UserRole, module_name)
+                self.exclude_list.addItem(item)
+            item.setForeground(QColor(0, 120, 0))
+            item.setToolTip(f"{proposal['reason']} • saves ~{human_size(proposal['bytes_saved'])} "
+                            f"({proposal['modules_removed']} modules)")
+            item.setSelected(True)
+            safe_to_exclude.append(f"{module_name} ({human_size(proposal['bytes_saved'])})")
         
         if safe_to_exclude:
+            total = sum(proposal['bytes_saved'] for proposal in proposals)
             modules_text = ', '.join(safe_to_exclude[:5])
             if len(safe_to_exclude) > 5:
                 modules_text += f'... (+{len(safe_to_exclude) - 5} more)'
             QMessageBox.information(self, 'Complete', 
-                f'Selected {len(safe_to_exclude)} modules:\n{modules_text}')
+                f'Selected {len(safe_to_exclude)} modules, ~{human_size(total)} saved:\n{modules_text}')
         else:
             QMessageBox.information(self, 'Info', 
                 'No safe modules to exclude')
@@ -475,64 +1128,110 @@ class PyToExeConverter(QMainWindow):
         self.update_command()
     
     def get_gui_imports(self, framework):
-        imports_map = {
-            'Tkinter': ['tkinter', 'tkinter.ttk', '_tkinter'],
-            'CustomTkinter': ['customtkinter', 'tkinter', '_tkinter'],
-            'PyQt5': ['PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets'],
-            'PyQt6': ['PyQt6', 'PyQt6.QtCore', 'PyQt6.QtGui', 'PyQt6.QtWidgets'],
-            'PySide2': ['PySide2', 'PySide2.QtCore', 'PySide2.QtGui', 'PySide2.QtWidgets'],
-            'PySide6': ['PySide6', 'PySide6.QtCore', 'PySide6.QtGui', 'PySide6.QtWidgets'],
-            'Kivy': ['kivy', 'kivy.core.window'],
-            'Pygame': ['pygame', 'pygame.mixer', 'pygame.font']
-        }
-        return imports_map.get(framework, [])
+        return get_gui_imports(framework)
     
-    def generate_command(self):
-        if not self.selected_file:
-            return ''
-        
-        cmd = 'pyinstaller '
-        
-        if self.clean_build_cb.isChecked():
-            cmd += '--clean -y '
-        if self.onefile_cb.isChecked():
-            cmd += '--onefile '
-        if self.noconsole_cb.isChecked():
-            cmd += '--noconsole '
-        if self.name_input.text():
-            cmd += f'--name="{self.name_input.text()}" '
-        if self.icon_input.text():
-            cmd += f'--icon="{self.icon_input.text()}" '
-        
-        file_dir = os.path.dirname(self.selected_file)
-        cmd += f'--distpath="{os.path.join(file_dir, "dist")}" '
-        cmd += f'--workpath="{os.path.join(file_dir, "build")}" '
-        cmd += f'--specpath="{file_dir}" '
-        
-        gui_imports = self.get_gui_imports(self.gui_combo.currentText())
-        hidden_imports = [h.strip() for h in self.hidden_input.text().split(',') if h.strip()]
-        
-        for imp in gui_imports + hidden_imports:
-            cmd += f'--hidden-import="{imp}" '
+    def build_options(self, file_path=None, name=None, workpath=None):
+        """Đọc trạng thái widget thành BuildOptions; batch truyền file, name và workpath riêng cho từng job"""
+        file_path = file_path or self.selected_file
+        if not file_path:
+            return None
+        if name is None:
+            name = self.name_input.text()
         
         excluded = []
         for item in self.exclude_list.selectedItems():
             excluded.append(item.data(Qt.UserRole))
-        
         custom_excludes = [e.strip() for e in self.custom_exclude_input.text().split(',') if e.strip()]
         
-        for module in excluded + custom_excludes:
-            cmd += f'--exclude-module={module} '
+        options = BuildOptions(
+            script=file_path,
+            name=name,
+            onefile=self.onefile_cb.isChecked(),
+            noconsole=self.noconsole_cb.isChecked(),
+            clean=self.clean_build_cb.isChecked(),
+            icon=self.icon_input.text(),
+            gui_framework=self.gui_combo.currentText(),
+            hidden_imports=[h.strip() for h in self.hidden_input.text().split(',') if h.strip()],
+            excludes=excluded + custom_excludes,
+            workpath=workpath or '',
+            incremental=self.incremental_cb.isChecked(),
+            warm=self.warm_cb.isChecked(),
+            warm_cache_mb=self.warm_cache_spin.value(),
+            startup_hook=self.startup_hook_cb.isChecked(),
+            daemon=self.daemon_input.text().strip(),
+            remote=self.remote_input.text().strip(),
+            cache=self.cache_input.text().strip(),
+            memory_limit_mb=self.memory_limit_spin.value(),
+            nice=self.nice_spin.value(),
+            cpu_affinity=self.cpu_affinity(),
+            upx=self.upx_cb.isChecked(),
+            upx_dir=self.upx_dir_input.text().strip(),
+            upx_exclude=[p.strip() for p in self.upx_exclude_input.text().split(',') if p.strip()],
+            lazy_imports=[m.strip() for m in self.lazy_input.text().split(',') if m.strip()],
+            lazy_threshold_ms=self.lazy_threshold_spin.value(),
+            asset_dirs=[d.strip() for d in self.assets_input.text().split(',') if d.strip()],
+            assets_inside=self.assets_inside_cb.isChecked()
+        )
+        return apply_profile(options, self.profile_combo.currentText())
+    
+    def refresh_history(self):
+        """Nạp lịch sử build của file đang chọn từ SQLite và kiểm tra regression so với tuần trước"""
+        self.history_table.setRowCount(0)
+        self.regression_display.clear()
+        if not self.selected_file:
+            return
+        name = self.name_input.text() or None
+        try:
+            builds = list_builds(self.selected_file, name, limit=100)
+            report = check_regressions(self.selected_file, name)
+        except Exception as e:
+            self.regression_display.setPlainText(f'History unavailable: {e}')
+            return
         
-        cmd += f'"{self.selected_file}"'
-        return cmd
+        self.history_table.setRowCount(len(builds))
+        for row, build in enumerate(builds):
+            values = [
+                str(build['id']),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(build['started'])),
+                build['mode'],
+                f"{build['duration']:.1f}s",
+                human_size(build['artifact_size']) if build['artifact_size'] else '-',
+                human_size(build['peak_rss']) if build['peak_rss'] else '-',
+                str(build['module_count'] or '-'),
+                'OK' if build['success'] else f"Failed ({build['returncode']})"
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if not build['success']:
+                    item.setForeground(QColor(180, 0, 0))
+                self.history_table.setItem(row, column, item)
+        self.regression_display.setPlainText(format_regressions(report))
+    
+    def cpu_affinity(self):
+        try:
+            return parse_cpu_list(self.cpus_input.text())
+        except ValueError:
+            return []
+    
+    def generate_command(self):
+        options = self.build_options()
+        if not options:
+            return ''
+        return format_command(options)
     
     def update_command(self):
         """Update command display in the Command tab"""
         cmd_text = self.generate_command()
         self.command_display.setPlainText(cmd_text)
     
-    def convert(self):
+    def build_selected_variants(self):
+        variants = [v for v, cb in self.variant_cbs.items() if cb.isChecked()]
+        if not variants:
+            QMessageBox.warning(self, 'Warning', 'Please select at least one variant!')
+            return
+        self.convert(variants)
+    
+    def convert(self, variants=None):
         if not self.selected_file:
             QMessageBox.warning(self, 'Warning', 'Please select a Python file first!')
             return
@@ -542,20 +1241,156 @@ class PyToExeConverter(QMainWindow):
         
         self.progress_bar.setValue(0)
         self.progress_label.setText('Starting conversion...')
+        self.build_status = ''
+        self.resource_label.setText('')
         self.convert_btn.setEnabled(False)
         self.convert_btn.setText('Converting...')
+        self.variants_btn.setEnabled(False)
         self.open_folder_btn.setEnabled(False)
+        self.profile_btn.setEnabled(False)
         self.log_display.clear()
-        self.log_display.append('Starting PyInstaller...\n')
+        self.log_display.appendPlainText('Starting PyInstaller...\n')
         
-        self.convert_thread = ConvertThread(self.generate_command())
+        self.convert_thread = ConvertThread(self.build_options(), variants or None)
         self.convert_thread.output.connect(self.on_output)
         self.convert_thread.progress.connect(self.on_progress)
+        self.convert_thread.status.connect(self.on_status)
+        self.convert_thread.resources.connect(self.on_resources)
         self.convert_thread.finished.connect(self.on_finished)
         self.convert_thread.start()
     
-    def on_output(self, line):
-        self.log_display.append(line)
+    def add_batch_job(self, file_path):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        if file_path == self.selected_file and self.name_input.text():
+            name = self.name_input.text()
+        
+        self.batch_queue.job_counter += 1
+        job_number = self.batch_queue.job_counter
+        workpath = os.path.join(os.path.dirname(file_path), 'build', 'batch', f'{job_number:03d}_{name}')
+        if self.warm_cb.isChecked():
+            # Warm build dùng workpath theo bộ tuỳ chọn để lần sau vẫn còn cache
+            workpath = None
+        options = self.build_options(file_path, name, workpath)
+        job_id = self.batch_queue.add_job(file_path, name, options)
+        self.batch_list.addItem(QListWidgetItem())
+        self.update_batch_item(job_id)
+        self.batch_stats_label.setText(self.batch_queue.stats_text())
+        if self.batch_queue.is_running():
+            self.batch_queue.fill_slots()
+    
+    def add_current_to_batch(self):
+        if not self.selected_file:
+            QMessageBox.warning(self, 'Warning', 'Please select a Python file first!')
+            return
+        self.add_batch_job(self.selected_file)
+    
+    def add_files_to_batch(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, 'Select Python files', '', 'Python Files (*.py)')
+        for file_path in file_paths:
+            self.add_batch_job(file_path)
+    
+    def remove_batch_job(self):
+        row = self.batch_list.currentRow()
+        if row < 0 or self.batch_queue.is_running():
+            return
+        self.batch_queue.remove_job(row)
+        self.batch_list.takeItem(row)
+        self.batch_stats_label.setText(self.batch_queue.stats_text())
+    
+    def clear_batch(self):
+        if self.batch_queue.is_running():
+            QMessageBox.warning(self, 'Warning', 'Batch is running!')
+            return
+        self.batch_queue.clear()
+        self.batch_list.clear()
+        self.batch_log_display.clear()
+        self.batch_stats_label.setText(self.batch_queue.stats_text())
+    
+    def start_batch(self):
+        if not any(job['status'] == 'Queued' for job in self.batch_queue.jobs):
+            QMessageBox.warning(self, 'Warning', 'No queued jobs to build!')
+            return
+        self.batch_start_btn.setEnabled(False)
+        self.batch_start_btn.setText('Running...')
+        self.batch_queue.start(self.workers_spin.value())
+    
+    def update_batch_item(self, job_id):
+        job = self.batch_queue.jobs[job_id]
+        item = self.batch_list.item(job_id)
+        item.setText(f"{job['name']}  —  {job['status']} {job['progress']}%")
+        item.setToolTip(format_command(job['options']))
+        if job['status'] == 'Failed':
+            item.setForeground(QColor(180, 0, 0))
+        elif job['status'] == 'Done':
+            item.setForeground(QColor(0, 120, 0))
+    
+    def show_batch_log(self, row):
+        self.batch_log_display.clear()
+        if 0 <= row < len(self.batch_queue.jobs):
+            self.batch_log_display.setPlainText('\n'.join(self.batch_queue.jobs[row]['log']))
+    
+    def on_batch_output(self, job_id, line):
+        if job_id == self.batch_list.currentRow():
+            self.batch_log_display.appendPlainText(line)
+    
+    def on_batch_finished(self):
+        self.batch_start_btn.setEnabled(True)
+        self.batch_start_btn.setText('Start batch')
+    
+    def profile_startup(self):
+        exe_path = artifact_path(self.convert_thread.options)
+        if not os.path.exists(exe_path):
+            QMessageBox.warning(self, 'Error', 'Built executable not found!')
+            return
+        
+        self.tabs.setCurrentIndex(3)
+        self.profile_btn.setEnabled(False)
+        self.log_display.appendPlainText(f'\nProfiling startup of {exe_path}...')
+        self.profile_thread = StartupProfileThread(exe_path)
+        self.profile_thread.finished.connect(self.on_profile_finished)
+        self.profile_thread.start()
+    
+    def on_profile_finished(self, text):
+        self.profile_btn.setEnabled(True)
+        self.log_display.appendPlainText(text)
+    
+    def compare_build_profiles(self):
+        """Build default và các profile release vào build/profiles, in chênh lệch size/startup"""
+        options = self.build_options()
+        if options is None:
+            QMessageBox.warning(self, 'Warning', 'Please select a Python file first!')
+            return
+        
+        self.tabs.setCurrentIndex(3)
+        self.compare_profiles_btn.setEnabled(False)
+        self.log_display.appendPlainText(f'\nComparing build profiles ({", ".join(PROFILES)})...')
+        self.compare_thread = ProfileCompareThread(options)
+        self.compare_thread.finished.connect(self.on_compare_finished)
+        self.compare_thread.start()
+    
+    def on_compare_finished(self, text):
+        self.compare_profiles_btn.setEnabled(True)
+        self.log_display.appendPlainText(text)
+    
+    def measure_lazy_imports(self):
+        options = self.build_options()
+        if options is None:
+            QMessageBox.warning(self, 'Warning', 'Please select a Python file first!')
+            return
+        
+        self.tabs.setCurrentIndex(3)
+        self.lazy_plan_btn.setEnabled(False)
+        self.log_display.appendPlainText('\nMeasuring import time of external modules...')
+        self.lazy_thread = LazyImportPlanThread(options)
+        self.lazy_thread.finished.connect(self.on_lazy_plan_finished)
+        self.lazy_thread.start()
+    
+    def on_lazy_plan_finished(self, text):
+        self.lazy_plan_btn.setEnabled(True)
+        self.log_display.appendPlainText(text)
+    
+    def on_output(self, text):
+        self.log_display.appendPlainText(text)
         self.log_display.verticalScrollBar().setValue(
             self.log_display.verticalScrollBar().maximum()
         )
@@ -563,6 +1398,8 @@ class PyToExeConverter(QMainWindow):
     def on_progress(self, value):
         self.progress_bar.setValue(value)
         self.progress_percent.setText(f'{value}%')
+        if self.build_status:
+            return
         
         stages = [
             (10, 'Initializing'),
@@ -578,23 +1415,71 @@ class PyToExeConverter(QMainWindow):
                 self.progress_label.setText(label)
                 break
     
+    def on_resources(self, sample):
+        self.resource_label.setText(format_sample(sample))
+    
+    def on_status(self, text):
+        # Phase thật của PyInstaller (kèm ETA nếu project đã có lịch sử build)
+        self.build_status = text
+        self.progress_label.setText(text)
+    
     def on_finished(self, success, message):
         self.convert_btn.setEnabled(True)
         self.convert_btn.setText('Convert to EXE')
+        self.variants_btn.setEnabled(True)
+        
+        if self.rebuild_pending:
+            # Build vừa bị huỷ, rebuild có thể không bắt đầu (file đã bị xoá...): bật lại nút nếu vẫn còn output cũ
+            built = success or os.path.exists(artifact_path(self.convert_thread.options))
+            self.open_folder_btn.setEnabled(built)
+            self.profile_btn.setEnabled(built and not self.convert_thread.variants)
+            self.rebuild_pending = False
+            self.on_watch_debounced()
+            return
+        
+        result = self.convert_thread.result
+        if result and result.log_file:
+            self.log_display.appendPlainText(f'Full log: {result.log_file}')
+        if result and result.phases.get('phases'):
+            timings = ', '.join(f'{name} {seconds:.1f}s' for name, seconds in result.phases['phases'].items())
+            self.log_display.appendPlainText(f'Phase timings: {timings}')
+        if result and result.resources:
+            r = result.resources
+            self.resource_label.setText(f"peak RSS {human_size(r['peak_rss'])} • CPU max {r['max_cpu_percent']:.0f}%")
+            self.log_display.appendPlainText(
+                f"Resources: peak RSS {human_size(r['peak_rss'])}, CPU max {r['max_cpu_percent']:.0f}% "
+                f"mean {r['mean_cpu_percent']:.0f}%, I/O {human_size(r['read_bytes'] + r['write_bytes'])}, "
+                f"{r['max_children']} child processes")
+        if self.convert_thread.size_text:
+            self.log_display.appendPlainText(self.convert_thread.size_text)
+        if result and not result.cached and not self.convert_thread.variants:
+            self.refresh_history()
+            if 'REGRESSION' in self.regression_display.toPlainText():
+                self.log_display.appendPlainText(self.regression_display.toPlainText())
+        savings = self.convert_thread.savings
+        if success and savings:
+            self.log_display.appendPlainText(
+                f"Variants: {savings['variants']} in {savings['duration']:.1f}s, "
+                f"~{savings['estimated_saved_seconds']:.1f}s saved vs separate builds")
         
         if success:
             self.progress_bar.setValue(100)
             self.progress_label.setText('Complete!')
-            self.log_display.append(f'\n{message}')
-            exe_path = f'{self.output_dir}/{self.name_input.text()}.exe'
-            self.log_display.append(f'Output: {exe_path}')
+            self.log_display.appendPlainText(f'\n{message}')
+            exe_path = result.artifact if self.convert_thread.variants else artifact_path(self.convert_thread.options)
+            self.log_display.appendPlainText(f'Output: {exe_path}')
             self.open_folder_btn.setEnabled(True)
-            QMessageBox.information(self, 'Success', 
-                f'Build completed!\n\nOutput: {self.name_input.text()}.exe')
+            self.profile_btn.setEnabled(not self.convert_thread.variants)
+            if not self.watch_cb.isChecked():
+                QMessageBox.information(self, 'Success', 
+                    f'Build completed!\n\nOutput: {os.path.basename(exe_path)}')
         else:
             self.progress_bar.setValue(0)
             self.progress_label.setText('Failed')
-            self.log_display.append(f'\n{message}')
+            self.log_display.appendPlainText(f'\n{message}')
+            if self.watch_cb.isChecked():
+                # Watch mode: lỗi chỉ ghi vào log, không mở hộp thoại sau mỗi lần lưu
+                return
             
             error_box = QMessageBox(self)
             error_box.setIcon(QMessageBox.Critical)
@@ -605,6 +1490,8 @@ class PyToExeConverter(QMainWindow):
 
 
 def main():
+    # ProcessPoolExecutor của import graph cần dòng này khi PyDeploy được đóng gói thành exe
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # Use native Windows style
@@ -0,0 +1,3 @@
+"""Phần lõi của PyDeploy, dùng được cả từ GUI lẫn command line (không import Qt)"""
+from .engine import (BuildOptions, BuildResult, build_args, build_argv,
+                     format_command, artifact_path, run_build)
@@ -0,0 +1,341 @@
+"""Artifact cache địa chỉ hoá theo nội dung: key = fingerprint (nguồn + tuỳ chọn + môi trường), backend thư mục hoặc HTTP"""
+import http.server
+import json
+import os
+import posixpath
+import shutil
+import tarfile
+import time
+import urllib.error
+import urllib.request
+
+from .fingerprint import abi_tag, digest_of, file_digest
+from .fsutil import atomic_write, tmp_name, write_json
+
+
+# Các giá trị phụ thuộc máy build, bỏ khỏi key để cache dùng chung được giữa các máy
+MACHINE_OPTIONS = ('script', 'distpath', 'icon')
+BLOB_SUFFIX = '.tar.gz'
+MANIFEST_SUFFIX = '.json'
+
+
+def cache_key(options, fingerprint):
+    """Key không phụ thuộc máy build: nguồn theo đường dẫn tương đối, asset theo tên trong archive, môi trường theo
+    ABI tag (OS, kiến trúc, libc, phiên bản Python) và package đã cài thay vì đường dẫn interpreter/bản kernel"""
+    from .assets import parse_asset_dir
+
+    root = options.script_dir
+    sources = {os.path.relpath(path, root).replace(os.sep, '/'): digest
+               for path, digest in fingerprint['sources'].items()}
+    values = {key: value for key, value in fingerprint['options'].items() if key not in MACHINE_OPTIONS}
+    values['script'] = os.path.relpath(os.path.abspath(options.script), root).replace(os.sep, '/')
+    # Nội dung asset đã nằm trong fingerprint['assets']; đường dẫn thư mục nguồn có thể là đường dẫn tuyệt đối của máy
+    values['asset_dirs'] = [parse_asset_dir(spec)[1] for spec in values.get('asset_dirs', [])]
+    environment = {'abi': fingerprint['environment'].get('abi') or abi_tag(),
+                   'packages': fingerprint['environment'].get('packages', {})}
+    return digest_of({'sources': sources, 'assets': fingerprint.get('assets', ''), 'options': values,
+                      'environment': environment})
+
+
+class LocalStore:
+    """Cache trên thư mục (local hoặc share mạng): objects/<xx>/<key>.tar.gz + manifest .json, LRU theo mtime manifest"""
+
+    def __init__(self, root, max_bytes=None):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+
+    def paths(self, key):
+        folder = os.path.join(self.root, 'objects', key[:2])
+        return os.path.join(folder, key + BLOB_SUFFIX), os.path.join(folder, key + MANIFEST_SUFFIX)
+
+    def get_manifest(self, key):
+        try:
+            with open(self.paths(key)[1], 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, key, dest):
+        """Copy blob ra dest nếu có và đúng checksum; blob hỏng bị xoá khỏi cache"""
+        manifest = self.get_manifest(key)
+        blob, manifest_path = self.paths(key)
+        if manifest is None or not os.path.isfile(blob):
+            return None
+        shutil.copyfile(blob, dest)
+        if file_digest(dest) != manifest.get('sha256'):
+            self.remove(key)
+            os.remove(dest)
+            raise ValueError(f'corrupted cache entry {key} removed')
+        os.utime(manifest_path)
+        return manifest
+
+    def store(self, key, blob_path, manifest):
+        blob, manifest_path = self.paths(key)
+        with atomic_write(blob, 'wb') as out, open(blob_path, 'rb') as f:
+            shutil.copyfileobj(f, out)
+        # Manifest ghi sau cùng: reader chỉ thấy entry khi blob đã đầy đủ
+        write_json(manifest_path, manifest, indent=2)
+        return self.enforce_limit(keep=key)
+
+    def remove(self, key):
+        for path in self.paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def entries(self):
+        objects = os.path.join(self.root, 'objects')
+        result = []
+        for dirpath, _, filenames in os.walk(objects):
+            for filename in filenames:
+                if not filename.endswith(MANIFEST_SUFFIX):
+                    continue
+                key = filename[:-len(MANIFEST_SUFFIX)]
+                blob, manifest_path = self.paths(key)
+                try:
+                    result.append([os.path.getmtime(manifest_path), os.path.getsize(blob), key])
+                except OSError:
+                    pass
+        return result
+
+    def enforce_limit(self, keep=None):
+        """Xoá entry ít dùng nhất tới khi tổng dung lượng blob <= max_bytes; trả về các key đã xoá"""
+        if not self.max_bytes:
+            return []
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def stats(self):
+        entries = self.entries()
+        return {'root': self.root, 'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes}
+
+
+class HttpStore:
+    """Cache qua HTTP: GET/PUT <url>/<key>.tar.gz và <key>.json (vd. `pydeploy cache serve`)"""
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, name, method='GET', data=None):
+        req = urllib.request.Request(f'{self.url}/{name}', data=data, method=method)
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def get_manifest(self, key):
+        try:
+            with self.request(key + MANIFEST_SUFFIX) as resp:
+                return json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def fetch(self, key, dest):
+        manifest = self.get_manifest(key)
+        if manifest is None:
+            return None
+        try:
+            with self.request(key + BLOB_SUFFIX) as resp, open(dest, 'wb') as f:
+                shutil.copyfileobj(resp, f)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        if file_digest(dest) != manifest.get('sha256'):
+            os.remove(dest)
+            raise ValueError(f'corrupted cache entry {key} from {self.url}')
+        return manifest
+
+    def store(self, key, blob_path, manifest):
+        with open(blob_path, 'rb') as f:
+            self.request(key + BLOB_SUFFIX, 'PUT', f.read()).close()
+        self.request(key + MANIFEST_SUFFIX, 'PUT', json.dumps(manifest).encode('utf-8')).close()
+        return []
+
+
+def open_store(location, max_mb=None):
+    if location.startswith(('http://', 'https://')):
+        return HttpStore(location)
+    if location.startswith('file://'):
+        location = urllib.request.url2pathname(location[len('file://'):])
+    return LocalStore(location, max_mb * 1024 * 1024 if max_mb else None)
+
+
+def pack(artifact, blob_path):
+    """Đóng gói artifact (file onefile hoặc thư mục onedir) thành tar.gz, trả về sha256"""
+    with tarfile.open(blob_path, 'w:gz') as tar:
+        tar.add(artifact, arcname=os.path.basename(artifact))
+    return file_digest(blob_path)
+
+
+def safe_members(tar, name):
+    for member in tar.getmembers():
+        parts = member.name.replace('\\', '/').split('/')
+        if os.path.isabs(member.name) or '..' in parts or parts[0] != name:
+            raise ValueError(f'unsafe path in cache entry: {member.name}')
+        if member.issym() or member.islnk():
+            # Symlink tương đối theo thư mục chứa nó, hardlink theo gốc archive; cả hai phải nằm trong artifact
+            base = posixpath.dirname(member.name) if member.issym() else ''
+            target = posixpath.normpath(posixpath.join(base, member.linkname))
+            if posixpath.isabs(member.linkname) or target.split('/')[0] != name:
+                raise ValueError(f'unsafe link in cache entry: {member.name}')
+        yield member
+
+
+def restore(blob_path, artifact):
+    """Giải nén vào thư mục tạm cạnh dist rồi đổi tên vào chỗ: không bao giờ để lại artifact dở dang"""
+    name = os.path.basename(artifact)
+    parent = os.path.dirname(artifact)
+    os.makedirs(parent, exist_ok=True)
+    staging = tmp_name(os.path.join(parent, f'.{name}.restore'))
+    os.makedirs(staging)
+    try:
+        with tarfile.open(blob_path, 'r:gz') as tar:
+            tar.extractall(staging, members=safe_members(tar, name))
+        restored = os.path.join(staging, name)
+        if os.path.isdir(restored) or os.path.isdir(artifact):
+            # Thư mục không os.replace đè được: đổi tên bản cũ đi rồi mới đưa bản mới vào
+            old = tmp_name(os.path.join(parent, f'.{name}.old'))
+            if os.path.lexists(artifact):
+                os.rename(artifact, old)
+            os.rename(restored, artifact)
+            if os.path.isdir(old):
+                shutil.rmtree(old, ignore_errors=True)
+            elif os.path.lexists(old):
+                os.remove(old)
+        else:
+            os.replace(restored, artifact)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def output_root(options, artifact):
+    """Phần của dist/ được cache: file onefile, hoặc cả thư mục onedir chứa executable"""
+    return artifact if options.onefile else os.path.dirname(artifact)
+
+
+def lookup(options, fingerprint, artifact):
+    """Khôi phục artifact từ cache nếu có; trả về manifest hoặc None"""
+    artifact = output_root(options, artifact)
+    store = open_store(options.cache, options.cache_mb)
+    key = cache_key(options, fingerprint)
+    blob = tmp_name(os.path.join(options.script_dir, 'build', f'.pydeploy-cache-{key[:16]}{BLOB_SUFFIX}'))
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        manifest = store.fetch(key, blob)
+        if manifest is None:
+            return None
+        restore(blob, artifact)
+        return dict(manifest, key=key)
+    finally:
+        if os.path.exists(blob):
+            os.remove(blob)
+
+
+def publish(options, fingerprint, artifact, duration=0.0):
+    """Đẩy artifact vừa build lên cache; trả về (key, danh sách key bị LRU xoá)"""
+    artifact = output_root(options, artifact)
+    store = open_store(options.cache, options.cache_mb)
+    key = cache_key(options, fingerprint)
+    blob = tmp_name(os.path.join(options.script_dir, 'build', f'.pydeploy-cache-{key[:16]}{BLOB_SUFFIX}'))
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        digest = pack(artifact, blob)
+        manifest = {'key': key, 'sha256': digest, 'size': os.path.getsize(blob),
+                    'artifact': os.path.basename(artifact), 'kind': 'dir' if os.path.isdir(artifact) else 'file',
+                    'build_seconds': round(duration, 3), 'created': time.time()}
+        return key, store.store(key, blob, manifest)
+    finally:
+        if os.path.exists(blob):
+            os.remove(blob)
+
+
+class CacheHandler(http.server.BaseHTTPRequestHandler):
+    """GET/PUT/HEAD cho một LocalStore, đủ để giả lập cache server dùng chung"""
+
+    def split(self):
+        name = self.path.strip('/').rsplit('/', 1)[-1]
+        for suffix in (BLOB_SUFFIX, MANIFEST_SUFFIX):
+            key = name[:-len(suffix)]
+            if name.endswith(suffix) and len(key) == 64 and all(c in '0123456789abcdef' for c in key):
+                return key, suffix
+        return None, None
+
+    def do_GET(self):
+        key, suffix = self.split()
+        store = self.server.store
+        path = store.paths(key)[suffix == MANIFEST_SUFFIX] if key else None
+        if not path or not os.path.isfile(path) or store.get_manifest(key) is None:
+            self.send_error(404)
+            return
+        if suffix == MANIFEST_SUFFIX:
+            os.utime(path)
+        self.send_response(200)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.end_headers()
+        if self.command == 'GET':
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+
+    do_HEAD = do_GET
+
+    def do_PUT(self):
+        key, suffix = self.split()
+        if not key:
+            self.send_error(400)
+            return
+        data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        store = self.server.store
+        blob, manifest_path = store.paths(key)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        if suffix == BLOB_SUFFIX:
+            with atomic_write(blob, 'wb') as f:
+                f.write(data)
+        else:
+            try:
+                manifest = json.loads(data.decode('utf-8'))
+                ok = os.path.isfile(blob) and file_digest(blob) == manifest.get('sha256')
+            except ValueError:
+                ok = False
+            if not ok:
+                self.send_error(409, 'blob missing or checksum mismatch')
+                return
+            with atomic_write(manifest_path, 'wb') as f:
+                f.write(data)
+            store.enforce_limit(keep=key)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CacheServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        from .daemon import parse_address
+
+        super().__init__(parse_address(address), CacheHandler)
+        self.store = store
+
+
+def serve(root, address='127.0.0.1:8766', max_mb=None):
+    server = CacheServer(address, LocalStore(root, max_mb * 1024 * 1024 if max_mb else None))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,197 @@
+"""Đóng gói thư mục dữ liệu thành một asset archive có index (dedupe theo hash nội dung) để app đọc bằng mmap"""
+import hashlib
+import json
+import os
+import shutil
+
+from .assets_runtime import HEADER, MAGIC, VERSION
+from .fsutil import atomic_write, tmp_name, write_json
+
+
+RUNTIME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets_runtime.py')
+RUNTIME_MODULE = 'pydeploy_assets'
+
+# Căn lề đầu mỗi file trong archive để memoryview đọc thẳng được thành mảng số (numpy.frombuffer...)
+ALIGN = 64
+
+
+def parse_asset_dir(spec):
+    """'data' -> ('data', 'data'); 'models:weights' -> thư mục models, tên trong archive bắt đầu bằng weights/"""
+    source, sep, prefix = spec.rpartition(':')
+    # 'C:\\data' là ổ đĩa Windows, không phải SRC:PREFIX
+    if not sep or len(source) <= 1 or prefix.startswith(('/', '\\')):
+        source, prefix = spec, os.path.basename(os.path.normpath(spec))
+    return source, prefix.strip('/\\')
+
+
+def collect(options):
+    """{tên trong archive: file nguồn} của mọi thư mục asset; thư mục đi sau ghi đè tên trùng"""
+    files = {}
+    for spec in options.asset_dirs:
+        source, prefix = parse_asset_dir(spec)
+        source = source if os.path.isabs(source) else os.path.join(options.script_dir, source)
+        if os.path.isfile(source):
+            files[prefix or os.path.basename(source)] = source
+            continue
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f'Asset directory not found: {source}')
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != '__pycache__')
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, source).replace(os.sep, '/')
+                files[f'{prefix}/{relative}' if prefix else relative] = path
+    return dict(sorted(files.items()))
+
+
+def work_dir(options):
+    return os.path.join(options.script_dir, 'build', '.pydeploy-assets')
+
+
+def archive_name(options):
+    return f'{options.output_name}.assets'
+
+
+def archive_path(options):
+    return os.path.join(work_dir(options), archive_name(options))
+
+
+def runtime_dir(options):
+    """Thư mục chứa pydeploy_assets.py, thêm vào --paths để Analysis tìm thấy"""
+    return os.path.join(work_dir(options), 'runtime')
+
+
+class DigestCache:
+    """sha256 của file theo (mtime, size), để không phải đọc lại hàng trăm MB asset mỗi lần build"""
+
+    def __init__(self, path):
+        self.path = path
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def digest(self, file_path):
+        st = os.stat(file_path)
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = self.entries.get(file_path)
+        if entry and entry['stamp'] == stamp:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        self.entries[file_path] = {'stamp': stamp, 'sha256': h.hexdigest()}
+        self.dirty = True
+        return h.hexdigest()
+
+    def save(self):
+        if not self.dirty:
+            return
+        write_json(self.path, self.entries)
+        self.dirty = False
+
+
+def asset_digests(options, files=None):
+    """{tên trong archive: sha256}; dùng cho fingerprint và để biết có cần đóng gói lại không"""
+    cache = DigestCache(os.path.join(work_dir(options), 'digests.json'))
+    files = collect(options) if files is None else files
+    digests = {name: cache.digest(path) for name, path in files.items()}
+    cache.save()
+    return digests
+
+
+def read_index(path):
+    try:
+        with open(path, 'rb') as f:
+            magic, version, _, index_offset, index_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            f.seek(index_offset)
+            return json.loads(f.read(index_size).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def pack(files, digests, path):
+    """Ghi archive: mỗi nội dung chỉ lưu một lần, các tên trùng nội dung trỏ cùng offset"""
+    entries, stored = {}, {}
+    with atomic_write(path, 'wb') as out:
+        out.write(b'\0' * HEADER.size)
+        for name, source in files.items():
+            digest = digests[name]
+            if digest not in stored:
+                offset = out.tell()
+                padding = -offset % ALIGN
+                out.write(b'\0' * padding)
+                offset += padding
+                with open(source, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                stored[digest] = (offset, out.tell() - offset)
+            entries[name] = [*stored[digest], digest]
+        index = json.dumps({'entries': entries}, sort_keys=True).encode('utf-8')
+        index_offset = out.tell()
+        out.write(index)
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, VERSION, 0, index_offset, len(index)))
+    return {'files': len(entries), 'unique': len(stored),
+            'bytes': sum(entries[name][1] for name in entries),
+            'stored_bytes': sum(size for _, size in stored.values()),
+            'archive_bytes': os.path.getsize(path)}
+
+
+def prepare(options, on_output=None):
+    """Đóng gói lại archive nếu nội dung asset đổi; chép runtime accessor; trả về đường dẫn archive"""
+    from .sizes import human_size
+
+    on_output = on_output or (lambda line: None)
+    os.makedirs(runtime_dir(options), exist_ok=True)
+    shutil.copyfile(RUNTIME_PATH, os.path.join(runtime_dir(options), f'{RUNTIME_MODULE}.py'))
+
+    path = archive_path(options)
+    files = collect(options)
+    digests = asset_digests(options, files)
+    index = read_index(path)
+    if index and {name: entry[2] for name, entry in index['entries'].items()} == digests:
+        on_output(f'Assets: {len(files)} files unchanged, reusing {os.path.basename(path)}')
+        return path
+    stats = pack(files, digests, path)
+    on_output(f"Assets: packed {stats['files']} files ({stats['unique']} unique) into {os.path.basename(path)}, "
+              f"{human_size(stats['bytes'])} -> {human_size(stats['archive_bytes'])}")
+    return path
+
+
+def place(options, artifact, on_output=None):
+    """Đặt archive cạnh file exe (onefile) hoặc trong thư mục onedir; hardlink khi được"""
+    source = archive_path(options)
+    target = os.path.join(os.path.dirname(artifact), archive_name(options))
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return target
+    tmp_path = tmp_name(target)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+    if on_output:
+        on_output(f'Assets: {target}')
+    return target
+
+
+def absolute_asset_dirs(options):
+    """asset_dirs với đường dẫn tuyệt đối (khi build từ bản staging ở thư mục khác)"""
+    specs = []
+    for spec in options.asset_dirs:
+        source, prefix = parse_asset_dir(spec)
+        specs.append(f'{os.path.join(options.script_dir, source)}:{prefix}')
+    return specs
+
+
+def build_args(options):
+    """Tham số PyInstaller cho runtime accessor (và archive khi nhúng vào bundle)"""
+    args = [f'--paths={runtime_dir(options)}', f'--hidden-import={RUNTIME_MODULE}']
+    if options.assets_inside:
+        args.append(f'--add-data={archive_path(options)}{os.pathsep}.')
+    return args
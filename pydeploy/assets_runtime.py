@@ -0,0 +1,129 @@
+# Runtime đọc asset archive của PyDeploy, được đóng gói vào app với tên module pydeploy_assets.
+# Archive được memory-map: không giải nén ra thư mục tạm, read() trả về memoryview trỏ thẳng vào mmap.
+#
+#     import pydeploy_assets
+#     data = pydeploy_assets.read('models/model.onnx')      # memoryview, zero-copy
+#     with pydeploy_assets.stream('images/logo.png') as f:  # file-like cho API cần file
+#         ...
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+MAGIC = b'PYDASSET'
+HEADER = struct.Struct('<8sIIQQ')
+VERSION = 1
+
+_archive = None
+_lock = threading.Lock()
+
+
+class AssetArchive:
+    """Archive dạng [header][dữ liệu các file, đã dedupe, căn lề][index JSON]"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # File rỗng không mmap được
+            self._file.close()
+            raise ValueError(f'Not an asset archive: {path}')
+        magic, version, _, index_offset, index_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'Not an asset archive: {path}')
+        index = json.loads(self._map[index_offset:index_offset + index_size].decode('utf-8'))
+        self._entries = index['entries']
+        self._view = memoryview(self._map)
+
+    def names(self):
+        return sorted(self._entries)
+
+    def __contains__(self, name):
+        return name.replace('\\', '/') in self._entries
+
+    def size(self, name):
+        return self._entry(name)[1]
+
+    def _entry(self, name):
+        try:
+            return self._entries[name.replace('\\', '/')]
+        except KeyError:
+            raise FileNotFoundError(f'Asset not found: {name}') from None
+
+    def read(self, name):
+        """memoryview chỉ đọc của nội dung file, không copy; dùng bytes(...) nếu cần giữ sau khi close"""
+        offset, size = self._entry(name)[:2]
+        return self._view[offset:offset + size]
+
+    def read_bytes(self, name):
+        return bytes(self.read(name))
+
+    def stream(self, name):
+        return io.BytesIO(self.read(name))
+
+    def close(self):
+        view = getattr(self, '_view', None)
+        if view is not None:
+            view.release()
+            self._view = None
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def find_archive(name=None):
+    """PYDEPLOY_ASSETS, rồi cạnh file exe (onefile/onedir), rồi trong bundle (_MEIPASS), rồi build/ khi chạy từ source"""
+    if os.environ.get('PYDEPLOY_ASSETS'):
+        return os.environ['PYDEPLOY_ASSETS']
+    if name is None:
+        name = os.path.splitext(os.path.basename(sys.executable if getattr(sys, 'frozen', False)
+                                                 else sys.argv[0]))[0] + '.assets'
+    frozen = getattr(sys, 'frozen', False)
+    folders = [os.path.dirname(os.path.abspath(sys.executable if frozen else sys.argv[0]))]
+    if hasattr(sys, '_MEIPASS'):
+        folders.append(sys._MEIPASS)
+    if not frozen:
+        # Chạy từ source: archive PyDeploy đóng gói trong build/ cạnh script
+        folders.append(os.path.join(folders[0], 'build', '.pydeploy-assets'))
+    for folder in folders:
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f'Asset archive {name} not found next to the executable or in the bundle')
+
+
+def open_archive(name=None):
+    """Archive dùng chung của app (mở một lần, giữ mmap tới khi thoát)"""
+    global _archive
+    with _lock:
+        if _archive is None:
+            _archive = AssetArchive(find_archive(name))
+        return _archive
+
+
+def read(name):
+    return open_archive().read(name)
+
+
+def read_bytes(name):
+    return open_archive().read_bytes(name)
+
+
+def stream(name):
+    return open_archive().stream(name)
+
+
+def names():
+    return open_archive().names()
@@ -0,0 +1,195 @@
+"""Benchmark build với các project tổng hợp có kích thước tuỳ chỉnh, kết quả dạng JSON"""
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .engine import BuildOptions, artifact_path, build_args
+from .workcache import dir_size
+
+
+STDLIB_MODULES = [
+    'json', 'csv', 're', 'math', 'random', 'datetime', 'collections', 'itertools',
+    'functools', 'pathlib', 'hashlib', 'base64', 'struct', 'textwrap', 'string',
+    'decimal', 'fractions', 'statistics', 'heapq', 'bisect', 'argparse', 'logging',
+    'configparser', 'sqlite3', 'xml.etree.ElementTree', 'html', 'urllib.parse',
+    'email', 'zipfile', 'tarfile', 'gzip', 'shutil', 'tempfile', 'uuid', 'socket',
+    'threading', 'queue', 'subprocess', 'asyncio', 'unittest', 'difflib', 'pprint'
+]
+
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib', 'PIL', 'requests', 'yaml']
+
+
+def available_heavy_modules():
+    return [name for name in HEAVY_MODULES if importlib.util.find_spec(name) is not None]
+
+
+def generate_project(root, modules, stdlib, heavy=False):
+    """Tạo project gồm main.py + `modules` module local, dùng `stdlib` module chuẩn; trả về path main.py"""
+    stdlib_names = STDLIB_MODULES[:stdlib]
+    heavy_names = available_heavy_modules() if heavy else []
+    os.makedirs(os.path.join(root, 'app'), exist_ok=True)
+
+    with open(os.path.join(root, 'app', '__init__.py'), 'w', encoding='utf-8') as f:
+        f.write('')
+
+    for i in range(modules):
+        imports = [stdlib_names[j % len(stdlib_names)] for j in range(i, i + 3)] if stdlib_names else []
+        lines = [f'import {name}' for name in dict.fromkeys(imports)]
+        if i + 1 < modules:
+            lines.append(f'from app import mod_{i + 1:04d}')
+        lines.append('')
+        for k in range(5):
+            lines.append(f'def func_{k}(value):')
+            lines.append(f'    return [value * {k} + n for n in range(10)]')
+            lines.append('')
+        with open(os.path.join(root, 'app', f'mod_{i:04d}.py'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+    lines = [f'import {name}' for name in stdlib_names + heavy_names]
+    if modules:
+        lines.append('from app import mod_0000')
+    lines += ['', '', "if __name__ == '__main__':", "    print('ok')", '']
+    main_path = os.path.join(root, 'main.py')
+    with open(main_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    return main_path
+
+
+def run_measured(argv):
+    """Chạy argv, trả về (returncode, wall giây, peak RSS KB của process con hoặc None)"""
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+
+    started = time.perf_counter()
+    process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    if hasattr(os, 'wait4'):
+        # Đọc hết stdout rồi mới wait4 để lấy rusage riêng của process build này
+        output = process.stdout.read()
+        process.stdout.close()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak_rss = usage.ru_maxrss
+        if sys.platform == 'darwin':
+            peak_rss //= 1024
+    else:
+        output = process.communicate()[0]
+        peak_rss = None
+    wall = time.perf_counter() - started
+    return process.returncode, wall, peak_rss, output
+
+
+def artifact_size(path):
+    if os.path.isdir(path):
+        return dir_size(path)
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {'min': min(values), 'median': round(statistics.median(values), 3),
+            'mean': round(statistics.mean(values), 3), 'max': max(values)}
+
+
+def bench_case(script, options_kwargs, repeat):
+    runs = []
+    for i in range(repeat):
+        options = BuildOptions(script=script, incremental=False, **options_kwargs)
+        # CLI dùng đúng build_args như GUI nên benchmark đo cùng một đường lệnh. --remote/--cache rỗng để
+        # PYDEPLOY_WORKERS/PYDEPLOY_CACHE không biến phép đo PyInstaller local thành dispatch/khôi phục cache
+        argv = ([sys.executable, '-m', 'pydeploy', 'build', '--quiet', '--force', '--remote=', '--cache=']
+                + cli_flags(options) + [script])
+        returncode, wall, peak_rss, _ = run_measured(argv)
+        artifact = artifact_path(options)
+        runs.append({
+            'run': i + 1,
+            'returncode': returncode,
+            'wall_seconds': round(wall, 3),
+            'peak_rss_kb': peak_rss,
+            # PyInstaller ghi vào workpath/<name>; build/ còn chứa log và cache của PyDeploy
+            'workpath_bytes': dir_size(os.path.join(options.resolved_workpath(), options.output_name)),
+            'artifact_bytes': artifact_size(artifact if options.onefile else os.path.dirname(artifact))
+        })
+    return {
+        'command': build_args(BuildOptions(script=script, **options_kwargs)),
+        'runs': runs,
+        'summary': {key: summarize([run[key] for run in runs if run['returncode'] == 0])
+                    for key in ('wall_seconds', 'peak_rss_kb', 'workpath_bytes', 'artifact_bytes')}
+    }
+
+
+def cli_flags(options):
+    flags = []
+    if not options.onefile:
+        flags.append('--onedir')
+    if options.noconsole:
+        flags.append('--noconsole')
+    if not options.clean:
+        flags.append('--no-clean')
+    if options.warm:
+        flags.append('--warm')
+    return flags
+
+
+def pyinstaller_version():
+    try:
+        from importlib import metadata
+        return metadata.version('pyinstaller')
+    except Exception:
+        return None
+
+
+def run_benchmark(module_counts, stdlib, heavy=False, repeat=3, workdir=None, options_kwargs=None):
+    options_kwargs = options_kwargs or {}
+    workdir = workdir or tempfile.mkdtemp(prefix='pydeploy-bench-')
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'pyinstaller': pyinstaller_version(),
+        'heavy_modules': available_heavy_modules() if heavy else [],
+        'options': options_kwargs,
+        'workdir': workdir,
+        'cases': []
+    }
+    for modules in module_counts:
+        name = f'n{modules}_m{stdlib}' + ('_heavy' if heavy else '')
+        script = generate_project(os.path.join(workdir, name), modules, stdlib, heavy)
+        case = bench_case(script, options_kwargs, repeat)
+        case.update({'name': name, 'modules': modules, 'stdlib': stdlib})
+        results['cases'].append(case)
+    return results
+
+
+def compare(old, new, threshold=0.1):
+    """So median của hai lần benchmark, trả về các dòng mô tả thay đổi vượt ngưỡng"""
+    old_cases = {case['name']: case for case in old.get('cases', [])}
+    lines = []
+    for case in new.get('cases', []):
+        previous = old_cases.get(case['name'])
+        if not previous:
+            continue
+        for key, stats in case['summary'].items():
+            before = (previous['summary'].get(key) or {}).get('median')
+            if not stats or not before:
+                continue
+            change = (stats['median'] - before) / before
+            if abs(change) >= threshold:
+                word = 'slower/larger' if change > 0 else 'faster/smaller'
+                lines.append(f"{case['name']} {key}: {before} -> {stats['median']} ({change:+.0%}, {word})")
+    return lines
+
+
+def write_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,607 @@
+"""Command line cho PyDeploy: build headless không cần import PyQt5"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from .engine import BuildOptions, GUI_FRAMEWORKS, format_command, run_build
+from .monitor import parse_cpu_list
+from .phases import history_path
+from .profiles import PROFILES
+from .sizes import human_size
+from .spec import VARIANTS
+
+
+def add_build_options(parser):
+    parser.add_argument('script', help='Python file to build')
+    parser.add_argument('--name', default='', help='Output name')
+    parser.add_argument('--onedir', action='store_true', help='Build a folder instead of --onefile')
+    parser.add_argument('--noconsole', action='store_true', help='No console window')
+    parser.add_argument('--no-clean', action='store_true', help='Do not pass --clean to PyInstaller')
+    parser.add_argument('--icon', default='', help='Icon file (.ico)')
+    parser.add_argument('--gui', default='None', choices=GUI_FRAMEWORKS, help='GUI framework hidden imports')
+    parser.add_argument('--hidden-import', action='append', default=[], metavar='MODULE')
+    parser.add_argument('--exclude-module', action='append', default=[], metavar='MODULE')
+    parser.add_argument('--distpath', default='')
+    parser.add_argument('--workpath', default='')
+    parser.add_argument('--specpath', default='')
+    parser.add_argument('--warm', action='store_true',
+                        help='Reuse a per-option workpath and skip --clean')
+    parser.add_argument('--warm-cache-mb', type=int, default=2048,
+                        help='Size cap of warm workpaths before LRU eviction')
+    parser.add_argument('--startup-hook', action='store_true',
+                        help='Bundle the runtime hook used by the startup profiler')
+    parser.add_argument('--daemon', default='', metavar='HOST:PORT',
+                        help='Submit the build to a running pydeploy daemon')
+    parser.add_argument('--remote', default=os.environ.get('PYDEPLOY_WORKERS', ''), metavar='HOST:PORT,...',
+                        help='Dispatch the build to pydeploy workers, preferring one with a warm workpath '
+                             '(env PYDEPLOY_WORKERS)')
+    parser.add_argument('--cache', default=os.environ.get('PYDEPLOY_CACHE', ''), metavar='DIR_OR_URL',
+                        help='Artifact cache (directory, file share or http:// URL; env PYDEPLOY_CACHE)')
+    parser.add_argument('--cache-mb', type=int, default=10240, help='Size cap of a directory artifact cache')
+    parser.add_argument('--memory-limit-mb', type=int, default=0,
+                        help='Stop the build when the PyInstaller process tree uses more RSS than this')
+    parser.add_argument('--nice', type=int, default=0, help='Nice level of the build process')
+    parser.add_argument('--cpus', default='', metavar='LIST', help='CPU affinity, e.g. 0-3,6')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if nothing changed')
+    parser.add_argument('--profile', default='default', choices=list(PROFILES),
+                        help='Bytecode optimization / archive / strip settings applied as a set')
+    parser.add_argument('--optimize', type=int, choices=[0, 1, 2], default=None,
+                        help='Override the bytecode optimization level of the profile (-O / -OO)')
+    parser.add_argument('--noarchive', action='store_true', help='Keep .pyc files loose instead of in the PYZ')
+    parser.add_argument('--strip', action='store_true', help='Strip symbols from bundled binaries')
+    parser.add_argument('--upx', action='store_true',
+                        help='UPX-compress bundled binaries in parallel, cached by file hash and UPX version')
+    parser.add_argument('--upx-dir', default='', help='Folder containing upx (default: upx on PATH)')
+    parser.add_argument('--upx-exclude', action='append', default=[], metavar='PATTERN',
+                        help='Binary name or glob never to compress, e.g. "Qt5Core*.dll" (repeatable)')
+    parser.add_argument('--upx-workers', type=int, default=0, help='Parallel UPX processes (default: CPU count)')
+    parser.add_argument('--lazy-import', action='append', default=[], metavar='MODULE',
+                        help='Defer this module-level import until first use (in a staged copy of the project)')
+    parser.add_argument('--lazy-threshold-ms', type=int, default=0, metavar='MS',
+                        help='Also defer every external import that takes at least MS to import')
+    parser.add_argument('--asset-dir', action='append', default=[], metavar='SRC[:PREFIX]',
+                        help='Pack this data directory into <name>.assets, read at runtime via pydeploy_assets '
+                             '(repeatable)')
+    parser.add_argument('--assets-inside', action='store_true',
+                        help='Embed the asset archive in the bundle instead of placing it next to the executable')
+    parser.add_argument('--auto-hidden', default='high', choices=['off', 'high', 'medium', 'low'],
+                        help='Add hidden imports found by the dynamic-import scan at this confidence or above')
+
+
+def resolved_options(args, on_output=None):
+    """options_from_args + hidden import từ các import động quét được trong project"""
+    from .dynamic import with_dynamic_imports
+
+    options = options_from_args(args)
+    if args.auto_hidden == 'off' or not os.path.isfile(options.script):
+        return options
+    return with_dynamic_imports(options, args.auto_hidden, on_output)
+
+
+def options_from_args(args):
+    profile = PROFILES[args.profile]
+    return BuildOptions(
+        script=os.path.abspath(args.script),
+        name=args.name,
+        onefile=not args.onedir,
+        noconsole=args.noconsole,
+        clean=not args.no_clean,
+        icon=args.icon,
+        gui_framework=args.gui,
+        hidden_imports=args.hidden_import,
+        excludes=args.exclude_module,
+        distpath=args.distpath,
+        workpath=args.workpath,
+        specpath=args.specpath,
+        incremental=not args.force,
+        warm=args.warm,
+        warm_cache_mb=args.warm_cache_mb,
+        startup_hook=args.startup_hook,
+        daemon=args.daemon,
+        remote=args.remote,
+        cache=args.cache,
+        cache_mb=args.cache_mb,
+        memory_limit_mb=args.memory_limit_mb,
+        nice=args.nice,
+        cpu_affinity=parse_cpu_list(args.cpus),
+        optimize=profile['optimize'] if args.optimize is None else args.optimize,
+        noarchive=profile['noarchive'] or args.noarchive,
+        strip=profile['strip'] or args.strip,
+        upx=args.upx,
+        upx_dir=args.upx_dir,
+        upx_exclude=args.upx_exclude,
+        upx_workers=args.upx_workers,
+        lazy_imports=args.lazy_import,
+        lazy_threshold_ms=args.lazy_threshold_ms,
+        asset_dirs=args.asset_dir,
+        assets_inside=args.assets_inside
+    )
+
+
+def cmd_build(args):
+    quiet = args.quiet or args.json
+    options = resolved_options(args, None if quiet or args.print_command else print)
+    if args.print_command:
+        print(format_command(options))
+        return 0
+    if not os.path.isfile(options.script):
+        print(f'File not found: {options.script}', file=sys.stderr)
+        return 2
+    if options.optimize and not args.no_import_check:
+        from .profiles import check_imports
+
+        check = check_imports(options)
+        for warning in check['warnings']:
+            print(f'Warning: {warning}', file=sys.stderr)
+        if not check['ok']:
+            for name, error in check['failed'].items():
+                print(f'Import of {name} fails under -{"O" * options.optimize}: {error}', file=sys.stderr)
+            if check['timed_out']:
+                print('Import check timed out', file=sys.stderr)
+            return 1
+
+    result = run_build(options, on_output=None if quiet else print)
+    if args.phases_json:
+        with open(args.phases_json, 'w', encoding='utf-8') as f:
+            json.dump(result.phases, f, indent=2)
+    if args.json:
+        print(json.dumps(result.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(result.message)
+        if result.success:
+            print(f'Output: {result.artifact} ({result.duration:.1f}s)')
+        if result.resources:
+            r = result.resources
+            print(f"Resources: peak RSS {human_size(r['peak_rss'])}, CPU max {r['max_cpu_percent']:.0f}% "
+                  f"mean {r['mean_cpu_percent']:.0f}%, I/O {human_size(r['read_bytes'] + r['write_bytes'])}, "
+                  f"{r['max_children']} child processes")
+        if result.log_file:
+            print(f'Log: {result.log_file}')
+    return 0 if result.success else (result.returncode or 1)
+
+
+def cmd_phases(args):
+    script = os.path.abspath(args.script)
+    try:
+        with open(history_path(script), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    runs = {key: value for key, value in data.items() if key.split('|')[0] == script}
+    print(json.dumps(runs, indent=2))
+    return 0
+
+
+def cmd_bench(args):
+    from .bench import compare, run_benchmark, write_results
+
+    options_kwargs = {'onefile': not args.onedir, 'noconsole': args.noconsole,
+                      'clean': not args.no_clean, 'warm': args.warm}
+    module_counts = [int(n) for n in args.modules.split(',') if n.strip()]
+    results = run_benchmark(module_counts, args.stdlib, args.heavy, args.repeat,
+                            args.workdir, options_kwargs)
+    if args.output:
+        write_results(results, args.output)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        changes = compare(previous, results, args.threshold)
+        for line in changes:
+            print(line, file=sys.stderr)
+        if changes and args.fail_on_regression:
+            return 1
+    return 0
+
+
+def cmd_startup(args):
+    from .startup import compare_modes, format_report, profile_startup
+
+    reports = [profile_startup(artifact, args.runs, args.imports, args.timeout, args.import_timeout)
+               for artifact in args.artifacts]
+    comparison = compare_modes(reports)
+    if args.json:
+        print(json.dumps({'reports': reports, 'comparison': comparison}, indent=2))
+        return 0
+    for report in reports:
+        print(format_report(report))
+    if comparison:
+        print(f"onefile extraction overhead: {comparison['extraction_overhead_seconds']}s")
+    return 0
+
+
+def cmd_sizes(args):
+    from .sizes import format_size_report, size_report
+
+    try:
+        report = size_report(resolved_options(args))
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_size_report(report, args.top))
+    return 0
+
+
+def cmd_excludes(args):
+    from .excludes import optimize_excludes
+
+    try:
+        proposals = optimize_excludes(resolved_options(args))
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(proposals, indent=2))
+        return 0
+    for proposal in proposals:
+        print(f"--exclude-module={proposal['module']:<30} ~{human_size(proposal['bytes_saved']):>10}  "
+              f"{proposal['reason']}, {proposal['modules_removed']} modules")
+    if not proposals:
+        print('No safe modules to exclude')
+    return 0
+
+
+def cmd_daemon(args):
+    from .daemon import TOKEN_ENV, is_loopback, serve, status
+
+    if args.status:
+        print(json.dumps(status(args.address, args.token), indent=2))
+        return 0
+    if not args.token and not is_loopback(args.address):
+        print(f'Refusing to listen on {args.address} without a token: pass --token or set {TOKEN_ENV}',
+              file=sys.stderr)
+        return 2
+    print(f'PyDeploy build daemon on {args.address} with {args.workers} worker(s)')
+    serve(args.address, args.workers, args.max_jobs, args.max_rss_mb, args.token)
+    return 0
+
+
+def cmd_worker(args):
+    from .daemon import is_loopback
+    from .remote import TOKEN_ENV, parse_addresses, probe, serve
+
+    if args.status:
+        addresses = parse_addresses(args.address)
+        statuses = probe(addresses, args.token)
+        print(json.dumps({address: statuses.get(address) for address in addresses}, indent=2))
+        return 0 if len(statuses) == len(addresses) else 1
+    if not args.token and not is_loopback(args.address):
+        print(f'Refusing to listen on {args.address} without a token: pass --token or set {TOKEN_ENV}',
+              file=sys.stderr)
+        return 2
+    print(f'PyDeploy build worker on {args.address} with {args.slots} slot(s)')
+    serve(args.address, args.root or None, args.slots, args.max_mb, args.token)
+    return 0
+
+
+def cmd_watch(args):
+    from .watch import watch
+
+    options = resolved_options(args)
+    if not os.path.isfile(options.script):
+        print(f'File not found: {options.script}', file=sys.stderr)
+        return 2
+
+    def on_finished(result):
+        print(result.message)
+        print('Watching for changes... (Ctrl+C to stop)')
+
+    try:
+        watch(options, args.debounce, on_output=(lambda line: None) if args.quiet else print,
+              on_finished=on_finished)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_variants(args):
+    from .spec import build_variants
+
+    options = resolved_options(args, None if args.quiet else print)
+    result, savings = build_variants(options, args.variant or ['console-onefile', 'windowed-onefile'],
+                                     on_output=None if args.quiet else print)
+    if args.json:
+        print(json.dumps({'result': result.to_dict(), 'savings': savings}, ensure_ascii=False, indent=2))
+    else:
+        print(result.message)
+        if result.success:
+            print(f"Saved ~{savings['estimated_saved_seconds']:.1f}s vs {savings['variants']} separate builds")
+    return 0 if result.success else (result.returncode or 1)
+
+
+def cmd_suite(args):
+    from .suite import build_suite
+
+    options = BuildOptions(
+        script=os.path.abspath(args.scripts[0]),
+        name=args.name,
+        onefile=args.onefile,
+        noconsole=args.noconsole,
+        clean=not args.no_clean,
+        icon=args.icon,
+        gui_framework=args.gui,
+        hidden_imports=args.hidden_import,
+        excludes=args.exclude_module,
+        distpath=args.distpath,
+        workpath=args.workpath
+    )
+    quiet = args.quiet or args.json
+    result, stats = build_suite(args.scripts, options, on_output=None if quiet else print)
+    if args.json:
+        print(json.dumps({'result': result.to_dict(), 'sizes': stats}, ensure_ascii=False, indent=2))
+    else:
+        print(result.message)
+        if result.success:
+            print(f'Output: {result.artifact} ({result.duration:.1f}s)')
+    return 0 if result.success else (result.returncode or 1)
+
+
+def cmd_cache(args):
+    from .artifacts import LocalStore, serve
+
+    if args.serve:
+        print(f'PyDeploy artifact cache on http://{args.address} ({args.dir})')
+        serve(args.dir, args.address, args.max_mb)
+        return 0
+    store = LocalStore(args.dir, args.max_mb * 1024 * 1024)
+    evicted = store.enforce_limit()
+    stats = store.stats()
+    stats['evicted'] = evicted
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+def cmd_env(args):
+    from .envindex import EnvIndex, detect_gui_framework, import_report, index_path
+    from .imports import ParseCache, build_import_graph, import_cache_path
+
+    index = EnvIndex.load(refresh=args.refresh)
+    if not args.script:
+        print(json.dumps({'index': index_path(), 'distributions': len(index.packages()),
+                          'modules': len(index.modules), 'hooks': len(index.hooks)}, indent=2))
+        return 0
+    script = os.path.abspath(args.script)
+    graph = build_import_graph(script, ParseCache(import_cache_path(script)))
+    report = import_report(graph.external, index)
+    report['gui_framework'] = detect_gui_framework(graph.external)
+    print(json.dumps(report, indent=2))
+    return 1 if report['missing'] else 0
+
+
+def cmd_history(args):
+    from .history import check_regressions, format_regressions, list_builds
+
+    script = os.path.abspath(args.script)
+    if args.regressions:
+        report = check_regressions(script, args.name or None, args.since, args.time_pct, args.size_mb)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(format_regressions(report))
+        return 1 if args.fail and report and report['regressions'] else 0
+
+    builds = list_builds(script, args.name or None, args.limit)
+    if args.json:
+        print(json.dumps(builds, indent=2))
+        return 0
+    for build in builds:
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(build['started']))
+        size = human_size(build['artifact_size']) if build['artifact_size'] else '-'
+        rss = human_size(build['peak_rss']) if build['peak_rss'] else '-'
+        status = 'ok' if build['success'] else f"failed ({build['returncode']})"
+        print(f"#{build['id']:<5} {when}  {build['name']:<20} {build['mode']:<8} {build['duration']:7.1f}s  "
+              f"{size:>10}  rss {rss:>10}  {build['module_count'] or '-':>5} modules  {status}")
+    return 0
+
+
+def cmd_profiles(args):
+    from .profiles import compare_profiles, format_comparison
+
+    options = resolved_options(args)
+    if not os.path.isfile(options.script):
+        print(f'File not found: {options.script}', file=sys.stderr)
+        return 2
+    report = compare_profiles(options, args.compare, args.runs, None if args.quiet or args.json else print)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_comparison(report))
+    return 0 if all(entry.get('success') for entry in report['profiles']) else 1
+
+
+def cmd_lazy(args):
+    from .lazy import format_plan, plan
+
+    options = options_from_args(args)
+    if not os.path.isfile(options.script):
+        print(f'File not found: {options.script}', file=sys.stderr)
+        return 2
+    report = plan(options)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_plan(report))
+    return 0
+
+
+def cmd_gui(args):
+    # Chỉ import PyQt5 khi thật sự mở giao diện
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import PyDeloy
+    PyDeloy.main()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m pydeploy',
+                                     description='Python to EXE converter (PyInstaller front-end)')
+    sub = parser.add_subparsers(dest='command')
+
+    build = sub.add_parser('build', help='Build a script without the GUI')
+    add_build_options(build)
+    build.add_argument('--print-command', action='store_true', help='Only print the PyInstaller command')
+    build.add_argument('--json', action='store_true', help='Print the build result as JSON')
+    build.add_argument('--quiet', action='store_true', help='Do not stream PyInstaller output')
+    build.add_argument('--phases-json', metavar='FILE', help='Write the phase timing breakdown to FILE')
+    build.add_argument('--no-import-check', action='store_true',
+                       help='Do not check that the app imports under -O/-OO before an optimized build')
+    build.set_defaults(func=cmd_build)
+
+    phases = sub.add_parser('phases', help='Print recorded phase timings of a project as JSON')
+    phases.add_argument('script', help='Python file of the project')
+    phases.set_defaults(func=cmd_phases)
+
+    bench = sub.add_parser('bench', help='Benchmark builds of synthetic projects')
+    bench.add_argument('--modules', default='10,100', help='Comma separated local module counts')
+    bench.add_argument('--stdlib', type=int, default=20, help='Number of stdlib imports')
+    bench.add_argument('--heavy', action='store_true', help='Also import installed heavy packages')
+    bench.add_argument('--repeat', type=int, default=3)
+    bench.add_argument('--workdir', default=None, help='Where to generate projects (default: temp dir)')
+    bench.add_argument('--onedir', action='store_true')
+    bench.add_argument('--noconsole', action='store_true')
+    bench.add_argument('--no-clean', action='store_true')
+    bench.add_argument('--warm', action='store_true')
+    bench.add_argument('--output', metavar='FILE', help='Write results JSON to FILE')
+    bench.add_argument('--compare', metavar='FILE', help='Previous results JSON to compare against')
+    bench.add_argument('--threshold', type=float, default=0.1, help='Relative change reported by --compare')
+    bench.add_argument('--fail-on-regression', action='store_true')
+    bench.set_defaults(func=cmd_bench)
+
+    startup = sub.add_parser('startup', help='Measure startup latency of built executables')
+    startup.add_argument('artifacts', nargs='+', help='Built executables (pass onefile and onedir to compare)')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--imports', action='store_true', help='Also record per-module import time')
+    startup.add_argument('--timeout', type=float, default=30)
+    startup.add_argument('--import-timeout', type=float, default=5,
+                         help='Seconds the app may run before the import report is written')
+    startup.add_argument('--json', action='store_true')
+    startup.set_defaults(func=cmd_startup)
+
+    sizes = sub.add_parser('sizes', help='Attribute artifact size to packages, binaries and data')
+    add_build_options(sizes)
+    sizes.add_argument('--top', type=int, default=15)
+    sizes.add_argument('--json', action='store_true')
+    sizes.set_defaults(func=cmd_sizes)
+
+    excludes = sub.add_parser('excludes', help='Propose excludes proven unreachable in the module graph')
+    add_build_options(excludes)
+    excludes.add_argument('--json', action='store_true')
+    excludes.set_defaults(func=cmd_excludes)
+
+    daemon = sub.add_parser('daemon', help='Run a warm build daemon that keeps PyInstaller imported')
+    daemon.add_argument('--address', default='127.0.0.1:8765', help='Local address to listen on')
+    daemon.add_argument('--workers', type=int, default=1)
+    daemon.add_argument('--max-jobs', type=int, default=20, help='Recycle a worker after this many builds')
+    daemon.add_argument('--max-rss-mb', type=float, default=None,
+                        help='Recycle a worker once its peak RSS exceeds this')
+    daemon.add_argument('--token', default=os.environ.get('PYDEPLOY_DAEMON_TOKEN', ''),
+                        help='Shared secret clients must send (default: $PYDEPLOY_DAEMON_TOKEN; '
+                             'required unless listening on loopback)')
+    daemon.add_argument('--status', action='store_true', help='Query a running daemon instead')
+    daemon.set_defaults(func=cmd_daemon)
+
+    worker = sub.add_parser('worker', help='Run a build worker node that accepts builds dispatched with --remote')
+    worker.add_argument('--address', default='127.0.0.1:8767',
+                        help='Address to listen on (with --status: comma-separated workers to query)')
+    worker.add_argument('--root', default='', help='Folder for project sources and warm workpaths '
+                                                   '(default: user cache dir)')
+    worker.add_argument('--slots', type=int, default=1, help='Builds run at the same time')
+    worker.add_argument('--max-mb', type=int, default=20480,
+                        help='Size cap of the project folders before LRU eviction')
+    worker.add_argument('--token', default=os.environ.get('PYDEPLOY_WORKER_TOKEN', ''),
+                        help='Shared secret clients must send (default: $PYDEPLOY_WORKER_TOKEN; '
+                             'required unless listening on loopback)')
+    worker.add_argument('--status', action='store_true', help='Query running workers instead')
+    worker.set_defaults(func=cmd_worker)
+
+    watch = sub.add_parser('watch', help='Rebuild whenever the script or its local imports change')
+    add_build_options(watch)
+    watch.add_argument('--debounce', type=float, default=0.5, help='Seconds of quiet before rebuilding')
+    watch.add_argument('--quiet', action='store_true', help='Do not stream PyInstaller output')
+    watch.set_defaults(func=cmd_watch)
+
+    variants = sub.add_parser('variants', help='Build several variants from one shared Analysis')
+    add_build_options(variants)
+    variants.add_argument('--variant', action='append', choices=VARIANTS,
+                          help='Variant to build (repeatable, default console-onefile + windowed-onefile)')
+    variants.add_argument('--json', action='store_true')
+    variants.add_argument('--quiet', action='store_true')
+    variants.set_defaults(func=cmd_variants)
+
+    suite = sub.add_parser('suite', help='Build several scripts sharing one set of dependencies')
+    suite.add_argument('scripts', nargs='+', help='Python files, one executable each')
+    suite.add_argument('--name', default='', help='Suite folder name (onedir)')
+    suite.add_argument('--onefile', action='store_true',
+                       help='One file per tool, shared dependencies via MERGE')
+    suite.add_argument('--noconsole', action='store_true')
+    suite.add_argument('--no-clean', action='store_true')
+    suite.add_argument('--icon', default='')
+    suite.add_argument('--gui', default='None', choices=GUI_FRAMEWORKS)
+    suite.add_argument('--hidden-import', action='append', default=[], metavar='MODULE')
+    suite.add_argument('--exclude-module', action='append', default=[], metavar='MODULE')
+    suite.add_argument('--distpath', default='')
+    suite.add_argument('--workpath', default='')
+    suite.add_argument('--json', action='store_true')
+    suite.add_argument('--quiet', action='store_true')
+    suite.set_defaults(func=cmd_suite)
+
+    cache = sub.add_parser('cache', help='Inspect, trim or serve a directory artifact cache')
+    cache.add_argument('dir', help='Cache directory')
+    cache.add_argument('--max-mb', type=int, default=10240)
+    cache.add_argument('--serve', action='store_true', help='Serve the directory over HTTP for build agents')
+    cache.add_argument('--address', default='127.0.0.1:8766')
+    cache.set_defaults(func=cmd_cache)
+
+    env = sub.add_parser('env', help='Show the installed-distribution index, or what a script imports from it')
+    env.add_argument('script', nargs='?', help='Python file to check against the environment')
+    env.add_argument('--refresh', action='store_true', help='Rebuild the index even if site-packages is unchanged')
+    env.set_defaults(func=cmd_env)
+
+    history = sub.add_parser('history', help='List recorded builds of a project or check for regressions')
+    history.add_argument('script', help='Python file the builds were made from')
+    history.add_argument('--name', default='', help='Only builds with this output name')
+    history.add_argument('--limit', type=int, default=20)
+    history.add_argument('--regressions', action='store_true',
+                         help='Compare the latest successful build with one from --since days earlier')
+    history.add_argument('--since', type=float, default=7, metavar='DAYS')
+    history.add_argument('--time-pct', type=float, default=40, help='Flag build time increases above this percent')
+    history.add_argument('--size-mb', type=float, default=20, help='Flag artifact growth above this many MB')
+    history.add_argument('--fail', action='store_true', help='Exit with status 1 when a regression is found')
+    history.add_argument('--json', action='store_true')
+    history.set_defaults(func=cmd_history)
+
+    profiles = sub.add_parser('profiles', help='Build with each profile and compare size and startup time')
+    add_build_options(profiles)
+    profiles.add_argument('--compare', action='append', choices=[p for p in PROFILES if p != 'default'],
+                          help='Profile to compare with default (repeatable, default all)')
+    profiles.add_argument('--runs', type=int, default=3, help='Startup runs per artifact')
+    profiles.add_argument('--json', action='store_true')
+    profiles.add_argument('--quiet', action='store_true')
+    profiles.set_defaults(func=cmd_profiles)
+
+    lazy = sub.add_parser('lazy', help='Measure import cost and show which imports --lazy-import would defer')
+    add_build_options(lazy)
+    lazy.add_argument('--json', action='store_true')
+    lazy.set_defaults(func=cmd_lazy)
+
+    gui = sub.add_parser('gui', help='Open the GUI (default)')
+    gui.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.command:
+        return cmd_gui(args)
+    return args.func(args)
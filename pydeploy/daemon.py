@@ -0,0 +1,301 @@
+"""Daemon build giữ PyInstaller đã import sẵn trong các worker process, nhận job qua socket local"""
+import hmac
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+from .procs import terminate_tree
+
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+SENTINEL = '\x00PYDEPLOY '
+# Token chung giữa client và daemon: daemon chạy argv (kể cả file .spec là code Python) nên không nhận request lạ
+TOKEN_ENV = 'PYDEPLOY_DAEMON_TOKEN'
+
+
+def parse_address(address):
+    host, _, port = (address or DEFAULT_ADDRESS).rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def is_loopback(address):
+    host = parse_address(address)[0]
+    return host == 'localhost' or host == '::1' or host.startswith('127.')
+
+
+def token_matches(token, expected):
+    """So token trong request với token của server, thời gian không phụ thuộc nội dung"""
+    return isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8'))
+
+
+def daemon_token():
+    return os.environ.get(TOKEN_ENV, '')
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def forward_output(read_fd, conn):
+    """Chuyển từng dòng stdout/stderr của worker về server; dòng SENTINEL là message điều khiển"""
+    with os.fdopen(read_fd, 'r', encoding='utf-8', errors='replace') as stream:
+        for line in stream:
+            line = line.rstrip('\n')
+            if line.startswith(SENTINEL):
+                conn.send(json.loads(line[len(SENTINEL):]))
+            else:
+                conn.send({'type': 'output', 'line': line})
+
+
+def worker_main(conn):
+    """Process worker: chuyển fd 1/2 vào pipe, import PyInstaller một lần rồi chạy job theo argv"""
+    if hasattr(os, 'setsid'):
+        # Group riêng để huỷ job là dừng được cả các process con PyInstaller sinh ra
+        os.setsid()
+    read_fd, write_fd = os.pipe()
+    os.dup2(write_fd, 1)
+    os.dup2(write_fd, 2)
+    os.close(write_fd)
+    sys.stdout = os.fdopen(1, 'w', buffering=1, encoding='utf-8', closefd=False)
+    sys.stderr = os.fdopen(2, 'w', buffering=1, encoding='utf-8', closefd=False)
+    threading.Thread(target=forward_output, args=(read_fd, conn), daemon=True).start()
+
+    def control(message):
+        sys.stdout.flush()
+        sys.stderr.write(SENTINEL + json.dumps(message) + '\n')
+        sys.stderr.flush()
+
+    try:
+        import PyInstaller.__main__
+    except ImportError as e:
+        control({'type': 'failed', 'message': f'PyInstaller not importable: {e}'})
+        return
+    control({'type': 'ready', 'pid': os.getpid()})
+
+    while True:
+        args = conn.recv()
+        if args is None:
+            break
+        try:
+            PyInstaller.__main__.run(args)
+            returncode = 0
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if not isinstance(e.code, (int, type(None))):
+                print(e.code, file=sys.stderr)
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        control({'type': 'done', 'returncode': returncode, 'rss_mb': peak_rss_mb()})
+
+
+class Worker:
+    def __init__(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        # Chỉ process con giữ đầu kia của pipe: worker chết thì recv() báo EOFError thay vì chờ mãi
+        child_conn.close()
+        self.jobs = 0
+        self.ready = self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class WorkerPool:
+    """Pool worker; worker bị thay mới sau max_jobs job hoặc khi RSS vượt max_rss_mb"""
+
+    def __init__(self, size=1, max_jobs=20, max_rss_mb=None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.idle = queue.Queue()
+        self.stats = {'jobs': 0, 'recycled': 0, 'spawn_failures': 0}
+        for _ in range(size):
+            self.idle.put(self.spawn())
+
+    def spawn(self):
+        worker = Worker()
+        if worker.ready.get('type') != 'ready':
+            raise RuntimeError(worker.ready.get('message', 'worker failed to start'))
+        return worker
+
+    def run(self, args, send, gone=None):
+        """Chạy một job trên worker rảnh, gọi send(message) cho từng dòng output và kết quả.
+        gone là threading.Event được set khi client ngắt kết nối (huỷ build)"""
+        worker = self.idle.get()
+        message = None
+        try:
+            worker.conn.send(args)
+            while True:
+                # Analysis có thể im lặng rất lâu: không chỉ dựa vào send() lỗi để biết client đã đi
+                if not worker.conn.poll(0.5):
+                    if gone is not None and gone.is_set():
+                        terminate_tree(worker.process.pid)
+                        worker = None
+                        break
+                    continue
+                message = worker.conn.recv()
+                try:
+                    send(message)
+                except OSError:
+                    # Client đóng kết nối (huỷ build): dừng worker cùng cây process của nó
+                    terminate_tree(worker.process.pid)
+                    worker = None
+                    break
+                if message['type'] == 'done':
+                    break
+        except (EOFError, OSError):
+            try:
+                send({'type': 'done', 'returncode': -1, 'rss_mb': None})
+            except OSError:
+                pass
+            terminate_tree(worker.process.pid)
+            worker = None
+        finally:
+            self.stats['jobs'] += 1
+            self.release(worker, message)
+
+    def release(self, worker, message):
+        if worker is not None:
+            worker.jobs += 1
+            rss = message.get('rss_mb') if message else None
+            if worker.jobs < self.max_jobs and not (self.max_rss_mb and rss and rss > self.max_rss_mb):
+                self.idle.put(worker)
+                return
+            worker.stop()
+        self.stats['recycled'] += 1
+        # Khởi động worker thay thế ở thread riêng: job hiện tại trả kết quả ngay, pool không bao giờ nhỏ đi
+        threading.Thread(target=self.replace_worker, daemon=True).start()
+
+    def replace_worker(self):
+        """Thử khởi động worker mới cho tới khi được (backoff tới 30s), báo lỗi mỗi lần thất bại"""
+        delay = 1
+        while True:
+            try:
+                self.idle.put(self.spawn())
+                return
+            except Exception as e:
+                self.stats['spawn_failures'] += 1
+                print(f'PyDeploy daemon: replacement worker failed to start: {e}; retrying in {delay}s',
+                      file=sys.stderr)
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().stop()
+
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline() or '{}')
+        lock = threading.Lock()
+
+        def send(message):
+            with lock:
+                self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+        if not token_matches(request.get('token'), self.server.token):
+            send({'type': 'error', 'message': 'unauthorized: wrong daemon token'})
+        elif request.get('op') == 'build':
+            gone = threading.Event()
+
+            def watch_client():
+                # Client không gửi gì thêm sau request: đọc được EOF nghĩa là client đã ngắt kết nối
+                try:
+                    self.rfile.read(1)
+                except OSError:
+                    pass
+                gone.set()
+            threading.Thread(target=watch_client, daemon=True).start()
+            self.server.pool.run(request['args'], send, gone)
+        elif request.get('op') == 'status':
+            send(dict(self.server.pool.stats, type='status', workers=self.server.pool.size))
+        else:
+            send({'type': 'error', 'message': f"unknown op {request.get('op')!r}"})
+
+
+class BuildServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, pool, token=''):
+        super().__init__(parse_address(address), BuildHandler)
+        self.pool = pool
+        self.token = token
+
+
+def serve(address=DEFAULT_ADDRESS, workers=1, max_jobs=20, max_rss_mb=None, token=''):
+    pool = WorkerPool(workers, max_jobs, max_rss_mb)
+    server = BuildServer(address, pool, token)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool.close()
+
+
+def submit(address, args):
+    """Gửi job tới daemon; trả về (iterator các dòng output, hàm lấy returncode) giống Popen"""
+    sock = socket.create_connection(parse_address(address))
+    stream = sock.makefile('rwb')
+    stream.write((json.dumps({'op': 'build', 'token': daemon_token(), 'args': args}) + '\n').encode('utf-8'))
+    stream.flush()
+    state = {'returncode': -1}
+
+    def stop():
+        # Đóng socket: daemon thấy client ngắt kết nối và dừng worker đang chạy job
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def lines():
+        try:
+            for raw in stream:
+                message = json.loads(raw)
+                if message['type'] == 'output':
+                    yield message['line']
+                elif message['type'] == 'done':
+                    state['returncode'] = message['returncode']
+                    break
+                elif message['type'] == 'error':
+                    yield message['message']
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+            sock.close()
+
+    return lines(), lambda: state['returncode'], stop
+
+
+def status(address, token=None):
+    with socket.create_connection(parse_address(address)) as sock:
+        stream = sock.makefile('rwb')
+        message = {'op': 'status', 'token': daemon_token() if token is None else token}
+        stream.write((json.dumps(message) + '\n').encode('utf-8'))
+        stream.flush()
+        return json.loads(stream.readline())
@@ -0,0 +1,299 @@
+"""Tìm import động (import_module, __import__, bảng plugin, pkgutil, entry point) để thêm --hidden-import trước khi build"""
+import ast
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from .imports import PARALLEL_THRESHOLD, ParseCache, build_import_graph, import_cache_path, resolve_module
+
+
+CONFIDENCE = {'low': 1, 'medium': 2, 'high': 3}
+
+IMPORT_CALLS = {'importlib.import_module', '__import__', 'importlib.__import__'}
+PKGUTIL_CALLS = {'pkgutil.iter_modules', 'pkgutil.walk_packages'}
+ENTRY_POINT_CALLS = {'pkg_resources.iter_entry_points', 'importlib.metadata.entry_points',
+                     'importlib_metadata.entry_points'}
+
+MODULE_PATH_RE = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)+(:[A-Za-z_][\w.]*)?$')
+TABLE_NAME_RE = re.compile(r'plugin|backend|handler|driver|entry_?point|extension|loader|module|command',
+                           re.IGNORECASE)
+
+
+def dynamic_cache_path(script):
+    return os.path.join(os.path.dirname(os.path.abspath(script)), 'build', '.pydeploy-dynamic.json')
+
+
+def constant_strings(node):
+    """Các chuỗi hằng trong list/tuple/set/dict (value hoặc key) hoặc một chuỗi hằng"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = node.elts
+    elif isinstance(node, ast.Dict):
+        items = list(node.values) + [k for k in node.keys if k is not None]
+    else:
+        return []
+    return [item.value for item in items if isinstance(item, ast.Constant) and isinstance(item.value, str)]
+
+
+def string_prefix(node):
+    """Phần đầu cố định của "pkg." + name hoặc f"pkg.{name}", None nếu không có"""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = node.left
+        while isinstance(left, ast.BinOp) and isinstance(left.op, ast.Add):
+            left = left.left
+        if isinstance(left, ast.Constant) and isinstance(left.value, str):
+            return left.value
+    if isinstance(node, ast.JoinedStr) and node.values:
+        first = node.values[0]
+        if isinstance(first, ast.Constant) and isinstance(first.value, str):
+            return first.value
+    return None
+
+
+class DynamicImportVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.aliases = {}
+        self.constants = {}
+        self.loops = []
+        self.found = []
+
+    def add(self, module, kind, confidence, node):
+        module = module.strip()
+        if module:
+            self.found.append((module, kind, confidence, getattr(node, 'lineno', 0)))
+
+    def qualified(self, node):
+        """Tên đầy đủ của hàm được gọi, theo alias của các câu import trong file"""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(self.aliases.get(node.id, node.id))
+        return '.'.join(reversed(parts))
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                self.aliases.setdefault(alias.name.split('.')[0], alias.name.split('.')[0])
+
+    def visit_ImportFrom(self, node):
+        if node.module and not node.level:
+            for alias in node.names:
+                self.aliases[alias.asname or alias.name] = f'{node.module}.{alias.name}'
+
+    def visit_Assign(self, node):
+        strings = constant_strings(node.value)
+        for target in node.targets:
+            if not isinstance(target, ast.Name) or not strings:
+                continue
+            self.constants[target.id] = strings
+            # Bảng plugin/backend dạng "pkg.module" hoặc "pkg.module:attr"
+            if TABLE_NAME_RE.search(target.id):
+                for value in strings:
+                    if MODULE_PATH_RE.match(value):
+                        confidence = 'medium' if ':' in value else 'low'
+                        self.add(value.split(':')[0], 'string-table', confidence, node)
+        self.generic_visit(node)
+
+    def visit_For(self, node):
+        strings = []
+        if isinstance(node.target, ast.Name):
+            strings = constant_strings(node.iter)
+            if not strings and isinstance(node.iter, ast.Name):
+                strings = self.constants.get(node.iter.id, [])
+        self.loops.append((node.target.id if isinstance(node.target, ast.Name) else None, strings))
+        self.generic_visit(node)
+        self.loops.pop()
+
+    def loop_values(self, name):
+        for target, strings in reversed(self.loops):
+            if target == name:
+                return strings
+        return []
+
+    def visit_Call(self, node):
+        name = self.qualified(node.func)
+        if name in IMPORT_CALLS and node.args:
+            self.import_call(node, name)
+        elif name in PKGUTIL_CALLS and node.args:
+            # pkgutil.iter_modules(pkg.__path__): mọi submodule của pkg được load lúc chạy
+            arg = node.args[0]
+            if isinstance(arg, ast.Attribute) and arg.attr == '__path__':
+                package = self.qualified(arg.value)
+                if package:
+                    self.add(package, 'pkgutil', 'medium', node)
+        elif name in ENTRY_POINT_CALLS or self.is_entry_points_select(node.func):
+            group = node.args[0] if node.args else None
+            for keyword in node.keywords:
+                if keyword.arg == 'group':
+                    group = keyword.value
+            if isinstance(group, ast.Constant) and isinstance(group.value, str):
+                self.add(group.value, 'entry-point-group', 'medium', node)
+        self.generic_visit(node)
+
+    def is_entry_points_select(self, func):
+        # entry_points().select(group='...')
+        return (isinstance(func, ast.Attribute) and func.attr == 'select' and isinstance(func.value, ast.Call)
+                and self.qualified(func.value.func) in ENTRY_POINT_CALLS)
+
+    def import_call(self, node, name):
+        arg = node.args[0]
+        package = None
+        for keyword in node.keywords:
+            if keyword.arg == 'package' and isinstance(keyword.value, ast.Constant):
+                package = keyword.value.value
+        if len(node.args) > 1 and isinstance(node.args[1], ast.Constant):
+            package = node.args[1].value if name.endswith('import_module') else None
+
+        def absolute(module):
+            if module.startswith('.') and isinstance(package, str):
+                return package + module if module.count('.') == 1 else None
+            return None if module.startswith('.') else module
+
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            module = absolute(arg.value)
+            if module:
+                self.add(module, 'import-call', 'high', node)
+            return
+        if isinstance(arg, ast.Name):
+            values = self.loop_values(arg.id) or self.constants.get(arg.id, [])
+            for value in values:
+                module = absolute(value)
+                if module and (module.isidentifier() or MODULE_PATH_RE.match(module)):
+                    self.add(module, 'import-call', 'high', node)
+            if values:
+                return
+        prefix = string_prefix(arg)
+        if prefix and prefix.endswith('.') and len(prefix) > 1:
+            self.add(prefix.rstrip('.'), 'import-prefix', 'low', node)
+
+
+def find_dynamic_imports(file_path):
+    """Danh sách (module, kind, confidence, line) của các import động có tham số hằng trong file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=file_path)
+    visitor = DynamicImportVisitor()
+    visitor.visit(tree)
+    return visitor.found
+
+
+def safe_find_dynamic_imports(file_path):
+    try:
+        return find_dynamic_imports(file_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+
+def local_submodules(package, root_dir):
+    """Submodule của một package local (cho pkgutil / import theo prefix)"""
+    init = resolve_module(package, root_dir)
+    if not init or not init.endswith('__init__.py'):
+        return []
+    folder = os.path.dirname(init)
+    names = []
+    for entry in sorted(os.listdir(folder)):
+        path = os.path.join(folder, entry)
+        if entry.endswith('.py') and entry != '__init__.py':
+            names.append(f'{package}.{entry[:-3]}')
+        elif os.path.isfile(os.path.join(path, '__init__.py')):
+            names.append(f'{package}.{entry}')
+    return names
+
+
+def entry_point_modules(group):
+    from importlib import metadata
+
+    modules = []
+    for dist in metadata.distributions():
+        for ep in dist.entry_points:
+            if ep.group == group:
+                modules.append(ep.value.split(':')[0].strip())
+    return modules
+
+
+def scan_project(script, cache=None, workers=None, graph=None):
+    """Quét mọi file local của project (song song khi nhiều file), trả về {file: [finding...]}"""
+    script = os.path.abspath(script)
+    graph = graph or build_import_graph(script, ParseCache(import_cache_path(script)))
+    cache = cache if cache is not None else ParseCache(dynamic_cache_path(script))
+
+    results = {}
+    to_scan = []
+    for file_path in graph.files:
+        found = cache.get(file_path)
+        if found is None:
+            to_scan.append(file_path)
+        else:
+            results[file_path] = found
+    if len(to_scan) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scanned = list(executor.map(safe_find_dynamic_imports, to_scan, chunksize=16))
+    else:
+        scanned = [safe_find_dynamic_imports(path) for path in to_scan]
+    for file_path, found in zip(to_scan, scanned):
+        cache.put(file_path, found)
+        results[file_path] = found
+    cache.save()
+    return results
+
+
+def dynamic_hidden_imports(script, min_confidence='medium', index=None, graph=None):
+    """Gộp kết quả quét thành danh sách hidden import: module, confidence, nguồn (file:line), kind"""
+    from .envindex import EnvIndex
+
+    root_dir = os.path.dirname(os.path.abspath(script))
+    index = index or EnvIndex.load()
+    suggestions = {}
+
+    def suggest(module, confidence, where, kind):
+        local = resolve_module(module, root_dir) is not None
+        if not (local or index.is_available(module)):
+            return
+        current = suggestions.get(module)
+        if current is None or CONFIDENCE[confidence] > CONFIDENCE[current['confidence']]:
+            suggestions[module] = {'module': module, 'confidence': confidence, 'kind': kind,
+                                   'source': where, 'local': local}
+
+    for file_path, found in scan_project(script, graph=graph).items():
+        for module, kind, confidence, line in found:
+            where = f'{os.path.relpath(file_path, root_dir)}:{line}'
+            if kind == 'entry-point-group':
+                for target in entry_point_modules(module):
+                    suggest(target, confidence, where, kind)
+                continue
+            if kind in ('pkgutil', 'import-prefix'):
+                submodules = local_submodules(module, root_dir)
+                for submodule in submodules:
+                    suggest(submodule, 'medium', where, kind)
+                if submodules:
+                    continue
+            suggest(module, confidence, where, kind)
+
+    threshold = CONFIDENCE[min_confidence]
+    return sorted((s for s in suggestions.values() if CONFIDENCE[s['confidence']] >= threshold),
+                  key=lambda s: (-CONFIDENCE[s['confidence']], s['module']))
+
+
+def with_dynamic_imports(options, min_confidence='high', on_output=None):
+    """BuildOptions kèm các hidden import phát hiện được từ mức confidence min_confidence trở lên"""
+    from dataclasses import replace
+
+    try:
+        suggestions = dynamic_hidden_imports(options.script, min_confidence)
+    except Exception as e:
+        if on_output:
+            on_output(f'Dynamic import scan failed: {e}')
+        return options
+    hidden = list(options.hidden_imports)
+    for suggestion in suggestions:
+        if suggestion['module'] not in hidden:
+            hidden.append(suggestion['module'])
+            if on_output:
+                on_output(f"Hidden import {suggestion['module']} ({suggestion['confidence']}, "
+                          f"{suggestion['kind']} at {suggestion['source']})")
+    return replace(options, hidden_imports=hidden)
@@ -0,0 +1,489 @@
+"""Build engine không phụ thuộc Qt: options -> argv -> chạy PyInstaller -> kết quả"""
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+
+from .fingerprint import check_build, save_fingerprint
+from . import artifacts, workcache
+from .history import record_build
+from .monitor import ResourceMonitor, apply_limits, sampling_available
+from .phases import PHASE_LABELS, PhaseHistory, PhaseTracker
+from .procs import popen_group, terminate_tree
+
+
+GUI_FRAMEWORKS = ['None', 'Tkinter', 'CustomTkinter',
+                  'PyQt5', 'PyQt6', 'PySide2', 'PySide6',
+                  'Kivy', 'Pygame']
+
+GUI_IMPORTS = {
+    'Tkinter': ['tkinter', 'tkinter.ttk', '_tkinter'],
+    'CustomTkinter': ['customtkinter', 'tkinter', '_tkinter'],
+    'PyQt5': ['PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets'],
+    'PyQt6': ['PyQt6', 'PyQt6.QtCore', 'PyQt6.QtGui', 'PyQt6.QtWidgets'],
+    'PySide2': ['PySide2', 'PySide2.QtCore', 'PySide2.QtGui', 'PySide2.QtWidgets'],
+    'PySide6': ['PySide6', 'PySide6.QtCore', 'PySide6.QtGui', 'PySide6.QtWidgets'],
+    'Kivy': ['kivy', 'kivy.core.window'],
+    'Pygame': ['pygame', 'pygame.mixer', 'pygame.font']
+}
+
+COMMON_EXCLUDES = [
+    'unittest', 'test', 'doctest', 'pydoc',
+    'tkinter', 'PyQt5', 'PyQt6', 'PySide2',
+    'PySide6', 'matplotlib', 'scipy', 'pandas',
+    'numpy', 'PIL', 'wx', 'sqlite3', 'email'
+]
+
+# Số dòng log cuối giữ trong bộ nhớ; log đầy đủ nằm trong file build/logs
+LOG_TAIL_LINES = 2000
+
+PROGRESS_KEYWORDS = {
+    'building': 15, 'analyzing': 25, 'running': 35,
+    'processing': 45, 'collecting': 55, 'copying': 65,
+    'building exe': 75, 'building pyz': 80,
+    'appending': 85, 'completed successfully': 100
+}
+
+
+@dataclass
+class BuildOptions:
+    """Toàn bộ tuỳ chọn của một lần build, không đọc gì từ widget"""
+    script: str
+    name: str = ''
+    onefile: bool = True
+    noconsole: bool = False
+    clean: bool = True
+    icon: str = ''
+    gui_framework: str = 'None'
+    hidden_imports: list = field(default_factory=list)
+    excludes: list = field(default_factory=list)
+    distpath: str = ''
+    workpath: str = ''
+    specpath: str = ''
+    incremental: bool = True
+    warm: bool = False
+    warm_cache_mb: int = 2048
+    startup_hook: bool = False
+    daemon: str = ''
+    remote: str = ''
+    cache: str = ''
+    cache_mb: int = 10240
+    memory_limit_mb: int = 0
+    nice: int = 0
+    cpu_affinity: list = field(default_factory=list)
+    optimize: int = 0
+    noarchive: bool = False
+    strip: bool = False
+    upx: bool = False
+    upx_dir: str = ''
+    upx_exclude: list = field(default_factory=list)
+    upx_workers: int = 0
+    lazy_imports: list = field(default_factory=list)
+    lazy_threshold_ms: int = 0
+    asset_dirs: list = field(default_factory=list)
+    assets_inside: bool = False
+
+    @property
+    def script_dir(self):
+        return os.path.dirname(os.path.abspath(self.script))
+
+    @property
+    def output_name(self):
+        return self.name or os.path.splitext(os.path.basename(self.script))[0]
+
+    def resolved_distpath(self):
+        return self.distpath or os.path.join(self.script_dir, 'dist')
+
+    def resolved_workpath(self):
+        if self.workpath:
+            return self.workpath
+        if self.warm:
+            return workcache.warm_workpath(self)
+        return os.path.join(self.script_dir, 'build')
+
+    def resolved_specpath(self):
+        # Workpath riêng thì spec cũng đặt trong đó để các build song song không ghi đè nhau
+        if self.specpath:
+            return self.specpath
+        if self.workpath or self.warm:
+            return self.resolved_workpath()
+        return self.script_dir
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class BuildResult:
+    success: bool
+    returncode: int
+    message: str
+    argv: list
+    artifact: str = ''
+    duration: float = 0.0
+    output_tail: list = field(default_factory=list)
+    cached: bool = False
+    invalidated_by: list = field(default_factory=list)
+    log_file: str = ''
+    phases: dict = field(default_factory=dict)
+    cancelled: bool = False
+    resources: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class BuildLog:
+    """Ghi log đầy đủ ra file, chỉ giữ phần đuôi và các dòng lỗi gần nhất trong bộ nhớ"""
+
+    def __init__(self, path, tail_lines=LOG_TAIL_LINES):
+        self.path = path
+        self.tail = deque(maxlen=tail_lines)
+        self.errors = deque(maxlen=5)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'w', encoding='utf-8', errors='replace')
+
+    def write(self, line):
+        self.file.write(line + '\n')
+        self.tail.append(line)
+        line_lower = line.lower()
+        if 'error' in line_lower or 'failed' in line_lower:
+            self.errors.append(line)
+
+    def last(self, count):
+        return list(self.tail)[-count:]
+
+    def close(self):
+        self.file.close()
+
+
+def get_gui_imports(framework):
+    return list(GUI_IMPORTS.get(framework, []))
+
+
+def build_args(options):
+    """Chuyển BuildOptions thành danh sách tham số PyInstaller (chưa có tên chương trình)"""
+    if options.upx:
+        # UPX do PyDeploy nén song song có cache trong spec sinh ra (run_build ghi spec trước khi chạy)
+        from .spec import build_spec_path, spec_args
+        return spec_args(options, build_spec_path(options))
+    args = []
+    if options.warm:
+        # Warm build giữ analysis cache trong workpath nên không bao giờ --clean
+        args.append('-y')
+    elif options.clean:
+        args += ['--clean', '-y']
+    if options.onefile:
+        args.append('--onefile')
+    if options.noconsole:
+        args.append('--noconsole')
+    if options.name:
+        args.append(f'--name={options.name}')
+    if options.icon:
+        args.append(f'--icon={options.icon}')
+    if options.optimize:
+        # Mức tối ưu bytecode của module được đóng gói và cờ -O của interpreter lúc chạy (PyInstaller >= 6.6)
+        args.append(f'--optimize={options.optimize}')
+    if options.noarchive:
+        args.append('--noarchive')
+    if options.strip:
+        args.append('--strip')
+
+    args.append(f'--distpath={options.resolved_distpath()}')
+    args.append(f'--workpath={options.resolved_workpath()}')
+    args.append(f'--specpath={options.resolved_specpath()}')
+
+    for imp in get_gui_imports(options.gui_framework) + list(options.hidden_imports):
+        args.append(f'--hidden-import={imp}')
+    for module in options.excludes:
+        args.append(f'--exclude-module={module}')
+    if options.startup_hook:
+        # Hook không làm gì khi chạy bình thường, chỉ bật khi `pydeploy startup` đặt biến môi trường
+        from .startup import HOOK_PATH
+        args.append(f'--runtime-hook={HOOK_PATH}')
+    if options.asset_dirs:
+        from .assets import build_args as asset_args
+        args += asset_args(options)
+
+    args.append(options.script)
+    return args
+
+
+def pyinstaller_command():
+    """Lệnh gọi PyInstaller: ưu tiên script `pyinstaller` trên PATH, không thì `python -m PyInstaller`"""
+    exe = shutil.which('pyinstaller')
+    if exe:
+        return [exe]
+    return [sys.executable, '-m', 'PyInstaller']
+
+
+def build_argv(options):
+    return pyinstaller_command() + build_args(options)
+
+
+def format_command(options):
+    """Chuỗi lệnh để hiển thị/copy, quote theo shell của hệ điều hành"""
+    args = ['pyinstaller'] + build_args(options)
+    if sys.platform == 'win32':
+        return subprocess.list2cmdline(args)
+    return shlex.join(args)
+
+
+def artifact_path(options):
+    name = options.output_name
+    if sys.platform == 'win32':
+        exe_name = name + '.exe'
+    else:
+        exe_name = name
+    if options.onefile:
+        return os.path.join(options.resolved_distpath(), exe_name)
+    return os.path.join(options.resolved_distpath(), name, exe_name)
+
+
+def start_process(options, args):
+    """Khởi chạy build; trả về (iterator các dòng output, hàm chờ lấy returncode, hàm huỷ, pid hoặc None)"""
+    if options.daemon:
+        # Daemon chạy PyInstaller trong worker đã import sẵn, không tốn khởi động interpreter
+        from .daemon import submit
+        return submit(options.daemon, args) + (None,)
+
+    process = popen_group(
+        pyinstaller_command() + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    )
+    return process.stdout, process.wait, lambda: terminate_tree(process.pid), process.pid
+
+
+def log_file_path(options):
+    now = time.time()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f'{now % 1:.3f}'[1:]
+    return os.path.join(options.script_dir, 'build', 'logs', f'{options.output_name}-{stamp}.log')
+
+
+def format_eta(seconds):
+    return f'{int(seconds // 60)}m {int(seconds % 60):02d}s'
+
+
+def run_build(options, on_output=None, on_progress=None, on_status=None, cancel=None, args=None,
+              on_resources=None):
+    """Chạy PyInstaller cho options, gọi callback theo từng dòng log / mức tiến độ / phase + ETA.
+    cancel là procs.CancelToken tuỳ chọn để dừng build (cả cây process) từ thread khác.
+    args thay cho build_args(options) khi build từ file .spec (vd. nhiều biến thể).
+    on_resources nhận từng mẫu CPU/RSS/I/O của cây process trong lúc build."""
+    on_output = on_output or (lambda line: None)
+    on_progress = on_progress or (lambda value: None)
+    on_status = on_status or (lambda text: None)
+    from_spec = args is not None
+    if options.remote and not from_spec:
+        # Build trên worker node (pydeploy worker); staging, asset, fingerprint đều do worker làm
+        from .remote import dispatch_build
+        return dispatch_build(options, on_output, on_progress, on_status, cancel)
+    if (options.lazy_imports or options.lazy_threshold_ms) and not from_spec:
+        # Import nặng được trì hoãn trong bản staging của project, không bao giờ sửa file gốc
+        from .lazy import staged_options
+        try:
+            staged, _ = staged_options(options, on_output)
+        except Exception as e:
+            staged = None
+            on_output(f'Lazy import staging failed, building the original sources: {e}')
+        options = staged or options
+    args = args if from_spec else build_args(options)
+    argv = pyinstaller_command() + args
+    artifact = options.resolved_distpath() if from_spec else artifact_path(options)
+    started = time.time()
+
+    if options.asset_dirs:
+        # Archive phải có trước cả khi kiểm tra fingerprint (bản build cũ dùng lại vẫn cần archive bên cạnh)
+        from . import assets
+        try:
+            assets.prepare(options, on_output)
+        except Exception as e:
+            return BuildResult(False, -1, f"Lỗi: {str(e)}", argv, '', time.time() - started)
+
+    def place_assets():
+        if options.asset_dirs and not options.assets_inside and not from_spec:
+            try:
+                assets.place(options, artifact_path(options), on_output)
+            except OSError as e:
+                on_output(f'Assets: could not place archive next to the build: {e}')
+
+    fingerprint, changes = None, []
+    if (options.incremental or options.cache) and not from_spec:
+        try:
+            fingerprint, changes = check_build(options, artifact_path(options))
+        except Exception as e:
+            changes = [f'fingerprint unavailable: {e}']
+        if options.incremental and fingerprint and not changes:
+            on_output('Nguồn, tuỳ chọn và môi trường không đổi, dùng lại bản build trước.')
+            place_assets()
+            on_progress(100)
+            return BuildResult(True, 0, "Không có thay đổi, dùng lại bản build trước!", argv,
+                               artifact_path(options), time.time() - started, cached=True)
+    if options.cache and options.incremental and fingerprint:
+        # Artifact cache: cùng fingerprint đã được build ở đâu đó thì chỉ cần khôi phục dist/
+        try:
+            manifest = artifacts.lookup(options, fingerprint, artifact_path(options))
+        except Exception as e:
+            manifest = None
+            on_output(f'Artifact cache unavailable: {e}')
+        if manifest:
+            save_fingerprint(options, fingerprint)
+            on_output(f"Artifact cache hit {manifest['key'][:12]} ({manifest['size']} bytes), "
+                      f"PyInstaller not run.")
+            place_assets()
+            on_progress(100)
+            return BuildResult(True, 0, "Khôi phục từ artifact cache!", argv, artifact_path(options),
+                               time.time() - started, cached=True, invalidated_by=changes)
+    log = None
+    warm_lock = None
+    # Lỗi bất ngờ giữa chừng (ghi log, history, asset...) cũng phải dừng monitor và cây process PyInstaller
+    monitor = None
+    stop = None
+    exited = False
+    try:
+        log = BuildLog(log_file_path(options))
+
+        def emit(line):
+            log.write(line)
+            on_output(line)
+
+        for change in changes:
+            emit(f'Rebuild: {change}')
+        if options.upx and not from_spec:
+            from .spec import write_build_spec
+            write_build_spec(options)
+
+        def finish(result):
+            if not from_spec:
+                try:
+                    record_build(options, result, fingerprint)
+                except Exception as e:
+                    emit(f'Build history not recorded: {e}')
+            return result
+
+        if options.warm:
+            # Build khác chạy song song (batch queue) có thể evict trong lúc này: giữ lock tới khi build xong
+            warm_lock = workcache.lock(options.resolved_workpath())
+        lines, wait, stop, pid = start_process(options, args)
+        if cancel:
+            cancel.register(stop)
+        if pid:
+            try:
+                applied = apply_limits(pid, options.nice, options.cpu_affinity)
+                if applied:
+                    emit(f"Limits: {', '.join(applied)}")
+            except OSError as e:
+                emit(f'Limits not applied: {e}')
+            if sampling_available():
+                def on_limit(sample):
+                    emit(f'Memory limit {options.memory_limit_mb} MB exceeded, stopping build.')
+                    stop()
+                monitor = ResourceMonitor(pid, memory_limit_mb=options.memory_limit_mb,
+                                          on_sample=on_resources, on_limit=on_limit).start()
+        elif options.memory_limit_mb or options.nice or options.cpu_affinity:
+            emit('Limits are not applied to daemon builds.')
+
+        current_progress = 5
+        on_progress(5)
+        tracker = PhaseTracker()
+        history = PhaseHistory(options)
+
+        for line in lines:
+            line = line.strip()
+            line_lower = line.lower()
+            emit(line)
+
+            tracker.feed(line)
+            estimate = history.estimate(tracker)
+            if estimate:
+                # Có lịch sử của project: tiến độ theo thời gian thật của từng phase
+                percent, eta = estimate
+                if percent > current_progress:
+                    current_progress = percent
+                    on_progress(current_progress)
+                if tracker.current:
+                    on_status(f'{PHASE_LABELS[tracker.current]} • ETA {format_eta(eta)}')
+                continue
+
+            if tracker.current:
+                on_status(PHASE_LABELS[tracker.current])
+
+            for keyword, progress_value in PROGRESS_KEYWORDS.items():
+                if keyword in line_lower:
+                    if progress_value > current_progress:
+                        current_progress = progress_value
+                        on_progress(current_progress)
+                    break
+
+            if current_progress < 90 and line:
+                current_progress = min(current_progress + 1, 90)
+                on_progress(current_progress)
+
+        returncode = wait()
+        exited = True
+        duration = time.time() - started
+        tracker.finish()
+        breakdown = tracker.to_dict()
+        resources = monitor.stop() if monitor else {}
+
+        if cancel and cancel.cancelled:
+            emit('Build cancelled.')
+            return BuildResult(False, returncode, "Đã huỷ build.", argv, '', duration,
+                               log.last(10), log_file=log.path, cancelled=True, resources=resources)
+        if resources.get('memory_limit_hit'):
+            return finish(BuildResult(False, returncode,
+                                      f"Vượt giới hạn bộ nhớ ({options.memory_limit_mb} MB), đã dừng build.",
+                                      argv, '', duration, log.last(10), log_file=log.path,
+                                      phases=breakdown, resources=resources))
+
+        if options.warm:
+            workpath = options.resolved_workpath()
+            workcache.touch(workpath)
+            evicted = workcache.enforce_limit(os.path.dirname(workpath),
+                                              options.warm_cache_mb * 1024 * 1024, keep=workpath)
+            for path in evicted:
+                emit(f'Warm cache: evicted {path}')
+
+        if returncode == 0:
+            place_assets()
+            if fingerprint:
+                save_fingerprint(options, fingerprint)
+            if options.cache and fingerprint:
+                try:
+                    key, evicted = artifacts.publish(options, fingerprint, artifact, duration)
+                    emit(f'Artifact cache: stored {key[:12]}' + (f', evicted {len(evicted)}' if evicted else ''))
+                except Exception as e:
+                    emit(f'Artifact cache: store failed: {e}')
+            if tracker.events and not from_spec:
+                history.record(breakdown)
+            on_progress(100)
+            return finish(BuildResult(True, 0, "Chuyển đổi thành công!", argv,
+                                      artifact, duration, log.last(10),
+                                      invalidated_by=changes, log_file=log.path,
+                                      phases=breakdown, resources=resources))
+
+        error_msg = '\n'.join(log.errors) if log.errors else '\n'.join(log.last(10))
+        return finish(BuildResult(False, returncode,
+                                  f"PyInstaller lỗi (code {returncode}):\n\n{error_msg}",
+                                  argv, '', duration, log.last(10), invalidated_by=changes,
+                                  log_file=log.path, phases=breakdown, resources=resources))
+
+    except Exception as e:
+        return BuildResult(False, -1, f"Lỗi: {str(e)}", argv, '', time.time() - started,
+                           log_file=log.path if log else '')
+    finally:
+        if monitor:
+            monitor.stop()
+        if stop and not exited:
+            stop()
+        if warm_lock:
+            workcache.unlock(warm_lock)
+        if log:
+            log.close()
@@ -0,0 +1,217 @@
+"""Index của môi trường Python đang dùng: tên import cấp cao nhất -> distribution, version, dung lượng, hook PyInstaller"""
+import hashlib
+import importlib.util
+import json
+import os
+import site
+import sys
+import threading
+from importlib import metadata
+
+from .engine import GUI_IMPORTS
+from .fsutil import write_json
+
+
+INDEX_VERSION = 1
+
+# Tên import cấp cao nhất -> GUI framework trong combobox
+GUI_MODULES = {imports[0]: framework for framework, imports in GUI_IMPORTS.items()}
+
+
+def cache_dir():
+    if os.environ.get('PYDEPLOY_CACHE_DIR'):
+        return os.environ['PYDEPLOY_CACHE_DIR']
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'pydeploy')
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'pydeploy')
+
+
+def index_path():
+    tag = hashlib.sha256(os.path.abspath(sys.executable).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir(), f'envindex-{sys.implementation.cache_tag}-{tag}.json')
+
+
+def site_dirs():
+    """Các thư mục cài package: site-packages hệ thống, user và venv đang nằm trên sys.path"""
+    dirs = list(site.getsitepackages()) if hasattr(site, 'getsitepackages') else []
+    dirs.append(site.getusersitepackages())
+    dirs += [p for p in sys.path if os.path.basename(p) in ('site-packages', 'dist-packages')]
+    return [d for d in dict.fromkeys(os.path.abspath(d) for d in dirs) if os.path.isdir(d)]
+
+
+def hook_dirs():
+    """Thư mục chứa hook-*.py của PyInstaller và pyinstaller-hooks-contrib, tìm mà không import"""
+    dirs = []
+    for package, subdirs in (('PyInstaller', ['hooks']),
+                             ('_pyinstaller_hooks_contrib', ['hooks/stdhooks', 'stdhooks'])):
+        try:
+            spec = importlib.util.find_spec(package)
+        except (ImportError, ValueError):
+            spec = None
+        for location in (spec.submodule_search_locations or []) if spec else []:
+            for sub in subdirs:
+                path = os.path.join(location, *sub.split('/'))
+                if os.path.isdir(path):
+                    dirs.append(path)
+    return dirs
+
+
+def directory_stamps(dirs):
+    stamps = {}
+    for path in dirs:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+def scan_hooks(dirs):
+    hooked = set()
+    for path in dirs:
+        for filename in os.listdir(path):
+            if filename.startswith('hook-') and filename.endswith('.py'):
+                hooked.add(filename[len('hook-'):-len('.py')])
+    return hooked
+
+
+def top_level_names(dist):
+    """top_level.txt nếu có, không thì suy ra từ RECORD"""
+    text = dist.read_text('top_level.txt')
+    if text:
+        return [name.strip() for name in text.split() if name.strip()]
+    names = set()
+    for file in dist.files or []:
+        parts = file.parts
+        if not parts or parts[0] in ('..', '__pycache__') or parts[0].endswith(('.dist-info', '.egg-info', '.data')):
+            continue
+        name = parts[0]
+        if len(parts) == 1:
+            if not name.endswith(('.py', '.so', '.pyd')):
+                continue
+            name = name.split('.')[0]
+        if name.isidentifier():
+            names.add(name)
+    return sorted(names)
+
+
+def build_index(dirs, hooks):
+    hooked = scan_hooks(hooks)
+    hooked_top = {name.split('.')[0] for name in hooked}
+    modules = {}
+    packages = {}
+    for dist in metadata.distributions(path=dirs):
+        name = dist.metadata['Name']
+        if not name:
+            continue
+        key = name.lower()
+        # Distribution trùng tên (vd. cài cả user lẫn venv): bản đứng trước trên path được import
+        if key in packages:
+            continue
+        packages[key] = dist.version
+        size = sum(file.size or 0 for file in dist.files or [])
+        for top in top_level_names(dist):
+            modules.setdefault(top, {
+                'distribution': name,
+                'version': dist.version,
+                'size': size,
+                'hook': top in hooked_top
+            })
+    return {'modules': modules, 'packages': dict(sorted(packages.items())), 'hooks': sorted(hooked)}
+
+
+class EnvIndex:
+    """Index đã cache trên đĩa, chỉ dựng lại khi mtime của site-packages / thư mục hook đổi"""
+
+    _lock = threading.Lock()
+    _loaded = None
+
+    def __init__(self, data):
+        self.data = data
+        self.modules = data['modules']
+        self.hooks = set(data['hooks'])
+        self.stdlib = set(getattr(sys, 'stdlib_module_names', ())) | set(sys.builtin_module_names)
+
+    @classmethod
+    def load(cls, refresh=False):
+        with cls._lock:
+            dirs, hooks = site_dirs(), hook_dirs()
+            stamps = directory_stamps(dirs + hooks)
+            current = cls._loaded
+            if not refresh and current and current.data['stamps'] == stamps:
+                return current
+
+            path = index_path()
+            data = None
+            if not refresh:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = None
+                if data and (data.get('version') != INDEX_VERSION or data.get('stamps') != stamps):
+                    data = None
+            if data is None:
+                data = build_index(dirs, hooks)
+                data['version'] = INDEX_VERSION
+                data['stamps'] = stamps
+                try:
+                    write_json(path, data)
+                except OSError:
+                    pass
+            cls._loaded = cls(data)
+            return cls._loaded
+
+    def lookup(self, module):
+        """Thông tin distribution của module (theo tên cấp cao nhất), None nếu không cài"""
+        return self.modules.get(module.split('.')[0])
+
+    def is_stdlib(self, module):
+        return module.split('.')[0] in self.stdlib
+
+    def is_available(self, module):
+        return self.is_stdlib(module) or module.split('.')[0] in self.modules
+
+    def has_hook(self, module):
+        info = self.lookup(module)
+        return module in self.hooks or bool(info and info['hook'])
+
+    def packages(self):
+        return dict(self.data['packages'])
+
+    def installed_modules(self):
+        return sorted(self.modules)
+
+
+def detect_gui_framework(modules):
+    """GUI framework từ các import cấp cao nhất; CustomTkinter thắng Tkinter vì nó import tkinter"""
+    found = [GUI_MODULES[name] for name in modules if name in GUI_MODULES]
+    if 'CustomTkinter' in found:
+        return 'CustomTkinter'
+    return sorted(found)[0] if found else 'None'
+
+
+def import_report(modules, index=None):
+    """Phân loại các import cấp cao nhất của app: stdlib / đã cài (kèm hook?) / thiếu"""
+    index = index or EnvIndex.load()
+    report = {'stdlib': [], 'installed': [], 'missing': []}
+    for name in sorted(modules):
+        if index.is_stdlib(name):
+            report['stdlib'].append(name)
+        elif index.lookup(name):
+            info = index.lookup(name)
+            report['installed'].append(dict(info, module=name, hook=index.has_hook(name)))
+        else:
+            report['missing'].append(name)
+    return report
+
+
+def suggest_hidden_imports(modules, gui_framework='None', index=None):
+    """Hidden import nên thêm: import của GUI framework phát hiện được mà chưa có trong lựa chọn hiện tại"""
+    from .engine import get_gui_imports
+
+    index = index or EnvIndex.load()
+    detected = detect_gui_framework(modules)
+    if detected in ('None', gui_framework):
+        return []
+    return [name for name in get_gui_imports(detected) if index.is_available(name)]
@@ -0,0 +1,220 @@
+"""Đề xuất --exclude-module an toàn dựa trên module graph mà PyInstaller đã tính (xref-<name>.html)"""
+import ast
+import html
+import os
+import re
+
+from .imports import build_import_graph
+from .sizes import build_dir, owner_of, read_toc
+
+
+NAME_RE = re.compile(r'<a name="([^"]+)"')
+TYPE_RE = re.compile(r'<span class="moduletype">([^<]+)</span>')
+IMPORTS_RE = re.compile(r'<div class="import">\s*imports:(.*?)</div>', re.S)
+HREF_RE = re.compile(r'href="#([^"]+)"')
+
+TEST_NAMES = {'test', 'tests', 'testing', '_testing', 'conftest'}
+TEST_PACKAGES = {'unittest', 'doctest', 'pytest', '_pytest', 'test'}
+QT_BINDINGS = {'PyQt5', 'PyQt6', 'PySide2', 'PySide6'}
+GUARD_EXCEPTIONS = {'ImportError', 'ModuleNotFoundError', 'Exception', 'BaseException'}
+
+
+def parse_xref(path):
+    """Đọc xref html: trả về (kiểu module, dict module -> tập module nó import)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+
+    types, edges = {}, {}
+    for block in re.split(r'<div class="node">', text)[1:]:
+        name_match = NAME_RE.search(block)
+        if not name_match:
+            continue
+        name = html.unescape(name_match.group(1))
+        type_match = TYPE_RE.search(block)
+        types[name] = type_match.group(1).strip() if type_match else ''
+        imports_match = IMPORTS_RE.search(block)
+        targets = HREF_RE.findall(imports_match.group(1)) if imports_match else []
+        edges[name] = {html.unescape(t) for t in targets}
+    return types, edges
+
+
+def in_subtree(module, prefix):
+    return module == prefix or module.startswith(prefix + '.')
+
+
+def reachable(edges, roots, blocked=None):
+    """Các module đi tới được từ roots, không đi vào subtree `blocked`"""
+    seen = set()
+    pending = [root for root in roots if not (blocked and in_subtree(root, blocked))]
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        for target in edges.get(module, ()):
+            if target not in seen and not (blocked and in_subtree(target, blocked)):
+                pending.append(target)
+    return seen
+
+
+def candidate_subtrees(modules, app_imports):
+    """Test package, Qt binding thay thế, backend tuỳ chọn và package cấp cao không được app import"""
+    candidates = {}
+    app_qt = QT_BINDINGS & app_imports
+    for module in modules:
+        parts = module.split('.')
+        top = parts[0]
+        if top in app_imports:
+            for i, part in enumerate(parts[1:], start=1):
+                prefix = '.'.join(parts[:i + 1])
+                if part in TEST_NAMES:
+                    candidates.setdefault(prefix, 'test package')
+                    break
+                if parts[i - 1] == 'backends' and i == len(parts) - 1:
+                    candidates.setdefault(prefix, 'optional backend')
+            continue
+        if top in TEST_PACKAGES:
+            candidates.setdefault(top, 'test package')
+        elif top in QT_BINDINGS and app_qt:
+            candidates.setdefault(top, 'alternate Qt binding')
+        else:
+            candidates.setdefault(top, 'not imported by the app')
+    return candidates
+
+
+def is_guard(handler):
+    """Handler của try có bắt được ImportError không"""
+    if handler.type is None:
+        return True
+    names = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(isinstance(n, ast.Name) and n.id in GUARD_EXCEPTIONS or
+               isinstance(n, ast.Attribute) and n.attr in GUARD_EXCEPTIONS for n in names)
+
+
+def imported_names(node, importer, is_package):
+    if isinstance(node, ast.Import):
+        return [alias.name for alias in node.names]
+    if node.level:
+        base = importer.split('.')
+        if not is_package:
+            base = base[:-1]
+        base = base[:len(base) - (node.level - 1)] if node.level > 1 else base
+        module = '.'.join(base + ([node.module] if node.module else []))
+    else:
+        module = node.module or ''
+    return [module] + [f'{module}.{alias.name}' for alias in node.names if alias.name != '*']
+
+
+def references_guarded(source_path, importer, prefix, cache):
+    """True nếu mọi câu import subtree `prefix` trong file đều nằm trong try/except ImportError
+    hoặc `if TYPE_CHECKING`; False nếu có import không được bảo vệ hoặc không đọc được file"""
+    key = (source_path, importer)
+    if key not in cache:
+        try:
+            with open(source_path, 'r', encoding='utf-8') as f:
+                cache[key] = ast.parse(f.read(), filename=source_path)
+        except (OSError, SyntaxError, ValueError):
+            cache[key] = None
+    tree = cache[key]
+    if tree is None:
+        return False
+
+    is_package = os.path.basename(source_path).startswith('__init__.')
+    found = False
+
+    def visit(node, guarded):
+        nonlocal found
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if any(in_subtree(name, prefix) for name in imported_names(node, importer, is_package)):
+                found = True
+                if not guarded:
+                    return False
+            return True
+        if isinstance(node, ast.Try) and any(is_guard(h) for h in node.handlers):
+            return (all(visit(child, True) for child in node.body) and
+                    all(visit(child, guarded) for child in node.handlers + node.orelse + node.finalbody))
+        if isinstance(node, ast.If) and 'TYPE_CHECKING' in ast.dump(node.test):
+            return (all(visit(child, True) for child in node.body) and
+                    all(visit(child, guarded) for child in node.orelse))
+        return all(visit(child, guarded) for child in ast.iter_child_nodes(node))
+
+    return visit(tree, False) and found
+
+
+def module_sizes(workdir):
+    """Bytes của từng module Python và của binary/data theo package cấp cao"""
+    sources, sizes, package_bytes = {}, {}, {}
+    for filename in os.listdir(workdir):
+        if not filename.endswith('.toc') or filename.split('-')[0] not in ('PYZ', 'PKG', 'COLLECT'):
+            continue
+        for name, path, typecode in read_toc(os.path.join(workdir, filename)):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if typecode in ('PYMODULE', 'PYSOURCE'):
+                sources[name] = path
+                sizes[name] = size
+            elif typecode in ('EXTENSION', 'BINARY', 'DATA', 'ZIPFILE'):
+                kind, owner = owner_of(name, typecode)
+                if kind == 'package':
+                    package_bytes[owner] = package_bytes.get(owner, 0) + size
+    return sources, sizes, package_bytes
+
+
+def optimize_excludes(options, app_imports=None):
+    """Danh sách exclude chứng minh được là an toàn, kèm số bytes ước tính tiết kiệm được"""
+    workdir = build_dir(options)
+    xref_path = os.path.join(workdir, f'xref-{options.output_name}.html')
+    if not os.path.isfile(xref_path):
+        raise FileNotFoundError(f'PyInstaller module graph not found (build once first): {xref_path}')
+
+    types, edges = parse_xref(xref_path)
+    graph = build_import_graph(options.script)
+    local_files = set(graph.files)
+    app_imports = set(graph.external if app_imports is None else app_imports)
+    roots = [name for name, kind in types.items() if kind == 'Script']
+    full = reachable(edges, roots)
+    sources, sizes, package_bytes = module_sizes(workdir)
+    importers_of = {}
+    for module in full:
+        for target in edges.get(module, ()):
+            importers_of.setdefault(target, set()).add(module)
+
+    ast_cache = {}
+    proposals = []
+    for prefix, reason in sorted(candidate_subtrees(full, app_imports).items()):
+        subtree = [module for module in full if in_subtree(module, prefix)]
+        # Không bao giờ đề xuất loại script gốc hay module local của chính project
+        if any(in_subtree(root, prefix) for root in roots):
+            continue
+        if any(os.path.abspath(sources[module]) in local_files for module in subtree if module in sources):
+            continue
+
+        remaining = reachable(edges, roots, blocked=prefix)
+        # Chỉ các import từ module vẫn còn được dùng mới quyết định subtree có cần hay không
+        importers = {importer for module in subtree
+                     for importer in importers_of.get(module, ())
+                     if importer in remaining}
+        if any(importer in roots for importer in importers):
+            continue
+        if not all(importer in sources and
+                   references_guarded(sources[importer], importer, prefix, ast_cache)
+                   for importer in importers):
+            continue
+
+        removed = full - remaining
+        saved = sum(sizes.get(module, 0) for module in removed)
+        if '.' not in prefix:
+            saved += package_bytes.get(prefix, 0)
+        if not saved:
+            # Builtin/missing module: exclude không tiết kiệm được gì
+            continue
+        proposals.append({'module': prefix, 'reason': reason, 'bytes_saved': saved,
+                          'modules_removed': len(removed), 'guarded_importers': sorted(importers)})
+
+    # Subtree con của một đề xuất lớn hơn là thừa
+    selected = {p['module'] for p in proposals}
+    proposals = [p for p in proposals
+                 if not any(other != p['module'] and in_subtree(p['module'], other) for other in selected)]
+    return sorted(proposals, key=lambda p: p['bytes_saved'], reverse=True)
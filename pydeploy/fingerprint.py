@@ -0,0 +1,146 @@
+"""Fingerprint của một build: nguồn + tuỳ chọn + môi trường Python, lưu cạnh thư mục dist"""
+import hashlib
+import json
+import os
+import platform
+import sys
+
+from .fsutil import write_json
+from .imports import ParseCache, import_cache_path, local_closure
+
+
+# Các tuỳ chọn không ảnh hưởng tới artifact đầu ra
+NON_OUTPUT_OPTIONS = {'clean', 'incremental', 'warm', 'warm_cache_mb', 'workpath', 'specpath', 'daemon', 'remote',
+                      'cache', 'cache_mb', 'memory_limit_mb', 'nice', 'cpu_affinity', 'upx_dir', 'upx_workers'}
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_digests(options):
+    sources = {}
+    for path in local_closure(options.script, ParseCache(import_cache_path(options.script))):
+        sources[path] = file_digest(path)
+    if options.icon and os.path.isfile(options.icon):
+        sources[os.path.abspath(options.icon)] = file_digest(options.icon)
+    return sources
+
+
+def assets_digest(options):
+    """Một digest cho cả archive asset (theo tên trong archive): đổi/thêm/xoá asset nào cũng là một thay đổi"""
+    if not options.asset_dirs:
+        return ''
+    from .assets import asset_digests
+    return digest_of(asset_digests(options))
+
+
+def option_values(options):
+    return {key: value for key, value in options.to_dict().items()
+            if key not in NON_OUTPUT_OPTIONS}
+
+
+def environment_info():
+    """Phiên bản interpreter và các distribution đang cài trong site-packages"""
+    from .envindex import EnvIndex
+
+    return {
+        'python': sys.version,
+        'executable': sys.executable,
+        'platform': platform.platform(),
+        'abi': abi_tag(),
+        'packages': EnvIndex.load().packages()
+    }
+
+
+def abi_tag():
+    """Những gì quyết định artifact chạy được ở đâu; khác với platform.platform() không chứa bản kernel/build
+    của máy nên hai agent cùng OS, kiến trúc và libc cho cùng một tag"""
+    libc, version = platform.libc_ver()
+    return {
+        'implementation': platform.python_implementation(),
+        'python': platform.python_version(),
+        'system': sys.platform,
+        'machine': platform.machine().lower(),
+        'libc': f'{libc} {version}'.strip()
+    }
+
+
+def digest_of(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def compute_fingerprint(options, environment=None):
+    fingerprint = {
+        'sources': source_digests(options),
+        'assets': assets_digest(options),
+        'options': option_values(options),
+        'environment': environment or environment_info()
+    }
+    fingerprint['digest'] = digest_of(fingerprint)
+    return fingerprint
+
+
+def fingerprint_path(options):
+    return os.path.join(options.resolved_distpath(), f'.{options.output_name}.pydeploy.json')
+
+
+def load_fingerprint(options):
+    try:
+        with open(fingerprint_path(options), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_fingerprint(options, fingerprint):
+    write_json(fingerprint_path(options), fingerprint, indent=2)
+
+
+def diff_fingerprints(old, new):
+    """Liệt kê những input đã thay đổi giữa hai fingerprint"""
+    if old is None:
+        return ['no previous build fingerprint']
+    if old.get('digest') == new['digest']:
+        return []
+
+    changes = []
+    old_sources, new_sources = old.get('sources', {}), new['sources']
+    for path in sorted(set(old_sources) | set(new_sources)):
+        if path not in old_sources:
+            changes.append(f'source added: {path}')
+        elif path not in new_sources:
+            changes.append(f'source removed: {path}')
+        elif old_sources[path] != new_sources[path]:
+            changes.append(f'source changed: {path}')
+    if old.get('assets', '') != new.get('assets', ''):
+        changes.append('assets changed')
+
+    old_options, new_options = old.get('options', {}), new['options']
+    for key in sorted(set(old_options) | set(new_options)):
+        if old_options.get(key) != new_options.get(key):
+            changes.append(f'option {key}: {old_options.get(key)!r} -> {new_options.get(key)!r}')
+
+    old_env, new_env = old.get('environment', {}), new['environment']
+    for key in ('python', 'executable', 'platform'):
+        if old_env.get(key) != new_env.get(key):
+            changes.append(f'{key} changed: {old_env.get(key)} -> {new_env.get(key)}')
+    old_packages, new_packages = old_env.get('packages', {}), new_env.get('packages', {})
+    for name in sorted(set(old_packages) | set(new_packages)):
+        if old_packages.get(name) != new_packages.get(name):
+            changes.append(f'package {name}: {old_packages.get(name)} -> {new_packages.get(name)}')
+
+    return changes or ['fingerprint changed']
+
+
+def check_build(options, artifact):
+    """So fingerprint hiện tại với lần build trước; trả về (fingerprint, danh sách thay đổi)"""
+    fingerprint = compute_fingerprint(options)
+    changes = diff_fingerprints(load_fingerprint(options), fingerprint)
+    if not changes and not os.path.exists(artifact):
+        changes = [f'artifact missing: {artifact}']
+    return fingerprint, changes
@@ -0,0 +1,29 @@
+"""Ghi file nguyên tử: ghi vào file tạm cạnh file đích rồi os.replace, reader không bao giờ thấy file dở dang"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def tmp_name(path):
+    """File tạm riêng cho từng process/thread, cùng thư mục với path để os.replace không vượt filesystem"""
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8'):
+    """open() vào file tạm; path chỉ bị thay khi khối with kết thúc không lỗi"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = tmp_name(path)
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_json(path, data, **kwargs):
+    with atomic_write(path) as f:
+        json.dump(data, f, **kwargs)
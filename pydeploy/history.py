@@ -0,0 +1,195 @@
+"""Lịch sử build trong SQLite cạnh project: tuỳ chọn, fingerprint, thời gian, phase, bộ nhớ, dung lượng; phát hiện regression"""
+import json
+import os
+import sqlite3
+import time
+
+from .fingerprint import compute_fingerprint, diff_fingerprints
+from .sizes import build_dir, human_size, read_toc
+
+
+MODULE_TYPES = {'PYMODULE', 'PYSOURCE', 'EXTENSION'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    returncode INTEGER,
+    digest TEXT,
+    options TEXT,
+    fingerprint TEXT,
+    phases TEXT,
+    peak_rss INTEGER,
+    artifact_size INTEGER,
+    module_count INTEGER,
+    log_file TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_project ON builds (project, name, mode, started);
+"""
+
+
+def history_db_path(script):
+    return os.path.join(os.path.dirname(os.path.abspath(script)), 'build', '.pydeploy-history.sqlite')
+
+
+def connect(script):
+    path = history_db_path(script)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def module_count(options):
+    """Số module Python/extension PyInstaller đã đóng gói, đếm từ TOC trong workpath"""
+    workdir = build_dir(options)
+    if not os.path.isdir(workdir):
+        return None
+    names = set()
+    for filename in os.listdir(workdir):
+        if filename.endswith('.toc') and filename.split('-')[0] in ('PYZ', 'PKG', 'COLLECT'):
+            for entry_name, _, typecode in read_toc(os.path.join(workdir, filename)):
+                if typecode in MODULE_TYPES:
+                    names.add(entry_name)
+    return len(names)
+
+
+def record_build(options, result, fingerprint=None):
+    """Ghi một lần build (thành công hoặc lỗi) vào lịch sử; trả về id bản ghi"""
+    if fingerprint is None:
+        try:
+            fingerprint = compute_fingerprint(options)
+        except Exception:
+            fingerprint = None
+    from .bench import artifact_size
+
+    size = artifact_size(os.path.dirname(result.artifact) if result.artifact and not options.onefile
+                         else result.artifact) if result.success else None
+    conn = connect(options.script)
+    try:
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO builds (project, name, mode, started, duration, success, returncode, digest, '
+                'options, fingerprint, phases, peak_rss, artifact_size, module_count, log_file) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (os.path.abspath(options.script), options.output_name,
+                 'onefile' if options.onefile else 'onedir', time.time() - result.duration,
+                 result.duration, int(result.success), result.returncode,
+                 fingerprint['digest'] if fingerprint else None,
+                 json.dumps(options.to_dict()), json.dumps(fingerprint) if fingerprint else None,
+                 json.dumps(result.phases.get('phases', {})), result.resources.get('peak_rss'),
+                 size, module_count(options) if result.success else None, result.log_file))
+            return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def row_dict(row):
+    data = dict(row)
+    for key in ('options', 'fingerprint', 'phases'):
+        data[key] = json.loads(data[key]) if data[key] else None
+    return data
+
+
+def list_builds(script, name=None, limit=50):
+    conn = connect(script)
+    try:
+        query = 'SELECT * FROM builds WHERE project = ?'
+        params = [os.path.abspath(script)]
+        if name:
+            query += ' AND name = ?'
+            params.append(name)
+        rows = conn.execute(query + ' ORDER BY started DESC LIMIT ?', params + [limit]).fetchall()
+        return [row_dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def find_baseline(conn, latest, since_days):
+    """Bản build thành công gần nhất cũ hơn since_days ngày; không có thì bản thành công cũ nhất trước latest"""
+    base_query = ('SELECT * FROM builds WHERE project = ? AND name = ? AND mode = ? AND success = 1 '
+                  'AND id != ? AND started < ?')
+    params = [latest['project'], latest['name'], latest['mode'], latest['id']]
+    row = conn.execute(base_query + ' ORDER BY started DESC LIMIT 1',
+                       params + [latest['started'] - since_days * 86400]).fetchone()
+    if row is None:
+        row = conn.execute(base_query + ' ORDER BY started ASC LIMIT 1', params + [latest['started']]).fetchone()
+    return row
+
+
+def check_regressions(script, name=None, since_days=7, time_pct=40, size_mb=20, rss_pct=50):
+    """So bản build thành công mới nhất với mốc ~since_days trước; trả về dict kèm danh sách regression và nguyên nhân"""
+    conn = connect(script)
+    try:
+        query = 'SELECT * FROM builds WHERE project = ? AND success = 1'
+        params = [os.path.abspath(script)]
+        if name:
+            query += ' AND name = ?'
+            params.append(name)
+        latest = conn.execute(query + ' ORDER BY started DESC LIMIT 1', params).fetchone()
+        if latest is None:
+            return None
+        baseline = find_baseline(conn, latest, since_days)
+        if baseline is None:
+            return {'latest': latest['id'], 'baseline': None, 'regressions': [], 'causes': []}
+        latest, baseline = row_dict(latest), row_dict(baseline)
+    finally:
+        conn.close()
+
+    regressions = []
+    if baseline['duration'] and latest['duration'] > baseline['duration'] * (1 + time_pct / 100):
+        regressions.append(f"build time {baseline['duration']:.1f}s -> {latest['duration']:.1f}s "
+                           f"(+{(latest['duration'] / baseline['duration'] - 1) * 100:.0f}%)")
+    if latest['artifact_size'] and baseline['artifact_size'] is not None:
+        delta = latest['artifact_size'] - baseline['artifact_size']
+        if delta > size_mb * 1024 * 1024:
+            regressions.append(f"artifact size {human_size(baseline['artifact_size'])} -> "
+                               f"{human_size(latest['artifact_size'])} (+{human_size(delta)})")
+    if latest['peak_rss'] and baseline['peak_rss'] and latest['peak_rss'] > baseline['peak_rss'] * (1 + rss_pct / 100):
+        regressions.append(f"peak memory {human_size(baseline['peak_rss'])} -> {human_size(latest['peak_rss'])}")
+    if latest['module_count'] and baseline['module_count'] and latest['module_count'] > baseline['module_count'] * 1.1:
+        regressions.append(f"modules {baseline['module_count']} -> {latest['module_count']}")
+
+    # Phase nào chậm đi nhiều nhất
+    phases = []
+    for phase, seconds in (latest['phases'] or {}).items():
+        before = (baseline['phases'] or {}).get(phase)
+        if before and seconds > before * (1 + time_pct / 100) and seconds - before > 1:
+            phases.append(f'{phase} {before:.1f}s -> {seconds:.1f}s')
+
+    causes = []
+    if regressions:
+        # Mọi tuỳ chọn (kể cả clean/warm không nằm trong fingerprint) + nguồn / môi trường / package
+        old_options, new_options = baseline['options'] or {}, latest['options'] or {}
+        for key in sorted(set(old_options) | set(new_options)):
+            if old_options.get(key) != new_options.get(key):
+                causes.append(f'option {key}: {old_options.get(key)!r} -> {new_options.get(key)!r}')
+        if latest['fingerprint'] and baseline['fingerprint']:
+            causes += [c for c in diff_fingerprints(baseline['fingerprint'], latest['fingerprint'])
+                       if c != 'fingerprint changed' and not c.startswith('option ')]
+    return {'latest': latest['id'], 'baseline': baseline['id'],
+            'baseline_age_days': round((latest['started'] - baseline['started']) / 86400, 1),
+            'regressions': regressions, 'slower_phases': phases if regressions else [], 'causes': causes}
+
+
+def format_regressions(report):
+    if report is None:
+        return 'No successful builds recorded.'
+    if report['baseline'] is None:
+        return 'Only one successful build recorded, nothing to compare.'
+    header = f"Build #{report['latest']} vs #{report['baseline']} ({report['baseline_age_days']} days earlier)"
+    if not report['regressions']:
+        return f'{header}: no regressions'
+    lines = [f'{header}: REGRESSION'] + [f'  {r}' for r in report['regressions']]
+    if report['slower_phases']:
+        lines.append('  slower phases: ' + ', '.join(report['slower_phases']))
+    if report['causes']:
+        lines.append('  changed since baseline:')
+        lines += [f'    {c}' for c in report['causes'][:20]]
+    return '\n'.join(lines)
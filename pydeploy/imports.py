@@ -0,0 +1,205 @@
+"""Phân tích import của script và các module local mà nó kéo theo"""
+import ast
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from .fsutil import write_json
+
+
+# Ít file cần parse hơn ngưỡng này thì parse ngay trong process hiện tại
+PARALLEL_THRESHOLD = 32
+
+
+def parse_imports(file_path):
+    """Trả về danh sách (module, level) của mọi câu lệnh import trong file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=file_path)
+
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                found.append((alias.name, 0))
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ''
+            found.append((module, node.level))
+            # `from pkg import sub` có thể là submodule local
+            for alias in node.names:
+                if alias.name != '*':
+                    found.append((f'{module}.{alias.name}' if module else alias.name, node.level))
+    return found
+
+
+def top_level_imports(file_path):
+    """Tên package cấp cao nhất được import trực tiếp (tuyệt đối) trong file"""
+    return {module.split('.')[0] for module, level in parse_imports(file_path)
+            if level == 0 and module}
+
+
+def resolve_module(module, base_dir):
+    """Tìm file .py của module trong base_dir, None nếu không phải module local"""
+    if not module:
+        return None
+    path = os.path.join(base_dir, *module.split('.'))
+    if os.path.isfile(path + '.py'):
+        return path + '.py'
+    init = os.path.join(path, '__init__.py')
+    if os.path.isfile(init):
+        return init
+    return None
+
+
+def resolve_import(module, level, importer, root_dir):
+    """Resolve một import (kể cả relative) về file local, kèm các __init__.py của package cha"""
+    if level:
+        base_dir = os.path.dirname(importer)
+        for _ in range(level - 1):
+            base_dir = os.path.dirname(base_dir)
+    else:
+        base_dir = root_dir
+
+    files = []
+    parts = module.split('.') if module else []
+    for i in range(1, len(parts)):
+        init = resolve_module('.'.join(parts[:i]), base_dir)
+        if init and init.endswith('__init__.py'):
+            files.append(init)
+    target = resolve_module(module, base_dir) if module else None
+    if not module and level:
+        init = os.path.join(base_dir, '__init__.py')
+        target = init if os.path.isfile(init) else None
+    if target:
+        files.append(target)
+    return files
+
+
+def import_cache_path(script):
+    """File cache parse của project, đặt trong thư mục build cạnh script"""
+    return os.path.join(os.path.dirname(os.path.abspath(script)), 'build', '.pydeploy-imports.json')
+
+
+class ParseCache:
+    """Cache kết quả parse_imports theo path + mtime + size, có thể lưu ra file JSON"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if path:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        write_json(self.path, self.entries)
+        self.dirty = False
+
+    @staticmethod
+    def stamp(file_path):
+        st = os.stat(file_path)
+        return [st.st_mtime_ns, st.st_size]
+
+    def get(self, file_path):
+        entry = self.entries.get(file_path)
+        try:
+            if entry and entry['stamp'] == self.stamp(file_path):
+                return [tuple(item) for item in entry['imports']]
+        except OSError:
+            pass
+        return None
+
+    def put(self, file_path, imports):
+        try:
+            self.entries[file_path] = {'stamp': self.stamp(file_path), 'imports': imports}
+            self.dirty = True
+        except OSError:
+            pass
+
+
+def safe_parse_imports(file_path):
+    try:
+        return parse_imports(file_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+
+@dataclass
+class ImportGraph:
+    script: str
+    edges: dict = field(default_factory=dict)
+    external: set = field(default_factory=set)
+    parsed: int = 0
+    cached: int = 0
+
+    @property
+    def files(self):
+        return sorted(self.edges)
+
+
+def build_import_graph(script, cache=None, workers=None):
+    """Duyệt đệ quy các module local theo từng lớp, parse song song những file chưa có trong cache"""
+    script = os.path.abspath(script)
+    root_dir = os.path.dirname(script)
+    cache = cache if cache is not None else ParseCache()
+    graph = ImportGraph(script)
+    frontier = [script]
+    executor = None
+
+    try:
+        while frontier:
+            results = {}
+            to_parse = []
+            for file_path in frontier:
+                imports = cache.get(file_path)
+                if imports is None:
+                    to_parse.append(file_path)
+                else:
+                    results[file_path] = imports
+                    graph.cached += 1
+
+            if len(to_parse) >= PARALLEL_THRESHOLD:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                parsed = executor.map(safe_parse_imports, to_parse, chunksize=16)
+            else:
+                parsed = map(safe_parse_imports, to_parse)
+            for file_path, imports in zip(to_parse, parsed):
+                cache.put(file_path, imports)
+                results[file_path] = imports
+                graph.parsed += 1
+
+            next_frontier = set()
+            for file_path, imports in results.items():
+                deps = set()
+                for module, level in imports:
+                    local = resolve_import(module, level, file_path, root_dir)
+                    if local:
+                        deps.update(os.path.abspath(dep) for dep in local)
+                    elif level == 0 and module:
+                        top = module.split('.')[0]
+                        # `from pkg import func` với pkg local không phải import bên ngoài
+                        if not resolve_module(top, root_dir):
+                            graph.external.add(top)
+                graph.edges[file_path] = sorted(deps)
+                next_frontier.update(dep for dep in deps if dep not in graph.edges)
+            frontier = sorted(next_frontier - set(results))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    cache.save()
+    return graph
+
+
+def local_closure(script, cache=None):
+    """Tập file local (script + các module local import đệ quy) mà build phụ thuộc vào"""
+    return build_import_graph(script, cache).files
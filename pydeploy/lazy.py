@@ -0,0 +1,385 @@
+"""Đo chi phí import của app và viết lại bản staging của project để import nặng ở cấp module được trì hoãn"""
+import ast
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+from .fsutil import atomic_write, tmp_name, write_json
+from .imports import resolve_module
+
+
+RUNTIME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lazy_runtime.py')
+RUNTIME_MODULE = '_pydeploy_lazy'
+HELPER_NAME = '_pydeploy_lazy_import'
+
+SKIP_DIRS = {'build', 'dist', '__pycache__', 'node_modules', 'site-packages'}
+
+
+def cost_cache_path(script):
+    return os.path.join(os.path.dirname(os.path.abspath(script)), 'build', '.pydeploy-importcost.json')
+
+
+def plan_cache_path(options):
+    return os.path.join(options.script_dir, 'build', '.pydeploy-lazyplan.json')
+
+
+def staging_dir(options):
+    return os.path.join(options.script_dir, 'build', 'lazy', options.output_name)
+
+
+def parse_importtime(stderr):
+    """[(tên, cumulative µs)] của các import cấp cao nhất trong output của -X importtime"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2]
+        if len(name) - len(name.lstrip()) == 1:
+            entries.append((name.strip(), int(parts[1])))
+    return entries
+
+
+def importtime(modules, timeout=120):
+    """Tổng thời gian (µs) import các module trong một interpreter mới; None nếu import lỗi"""
+    code = '\n'.join(f'import {module}' for module in modules) or 'pass'
+    try:
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True,
+                                 text=True, stdin=subprocess.DEVNULL, timeout=timeout,
+                                 env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    except subprocess.TimeoutExpired:
+        return None
+    if process.returncode != 0:
+        return None
+    return parse_importtime(process.stderr)
+
+
+_startup_names = None
+
+
+def startup_names():
+    """Module interpreter tự import khi khởi động (site, encodings...), không tính vào chi phí của app"""
+    global _startup_names
+    if _startup_names is None:
+        _startup_names = {name for name, _ in importtime([]) or []}
+    return _startup_names
+
+
+def import_cost(modules, timeout=120):
+    """Thời gian import (ms) của một nhóm module, bỏ phần khởi động interpreter"""
+    entries = importtime(modules, timeout)
+    if entries is None:
+        return None
+    baseline = startup_names()
+    return round(sum(us for name, us in entries if name not in baseline) / 1000, 1)
+
+
+def module_version(module, index):
+    info = index.lookup(module)
+    return info['version'] if info else sys.version.split()[0]
+
+
+def measure_costs(script, modules, index, workers=None):
+    """{module: ms} đo song song, mỗi module một interpreter; cache theo version distribution"""
+    path = cost_cache_path(script)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    key = f'{sys.executable}|{sys.version}'
+    entries = cache.setdefault(key, {})
+
+    costs, to_measure = {}, []
+    for module in modules:
+        entry = entries.get(module)
+        if entry and entry['version'] == module_version(module, index):
+            costs[module] = entry['ms']
+        else:
+            to_measure.append(module)
+    if to_measure:
+        startup_names()
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            for module, ms in zip(to_measure, executor.map(lambda m: import_cost([m]), to_measure)):
+                costs[module] = ms
+                entries[module] = {'version': module_version(module, index), 'ms': ms}
+        try:
+            write_json(path, cache)
+        except OSError:
+            pass
+    return costs
+
+
+def project_tree(root_dir):
+    """Mọi file của project, bỏ qua build/dist, thư mục ẩn và virtualenv"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')
+                             and not os.path.isfile(os.path.join(dirpath, d, 'pyvenv.cfg')))
+        found += [os.path.join(dirpath, f) for f in sorted(filenames)]
+    return found
+
+
+def project_files(root_dir):
+    """Mọi file .py của project"""
+    return [path for path in project_tree(root_dir) if path.endswith('.py')]
+
+
+def module_imports(tree):
+    """Câu `import x` / `import x.y as z` nằm trực tiếp ở cấp module: [(node, [(module, bind, tên gán)])]"""
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            aliases = []
+            for alias in node.names:
+                if alias.asname:
+                    aliases.append((alias.name, alias.name, alias.asname))
+                else:
+                    top = alias.name.split('.')[0]
+                    aliases.append((alias.name, top, top))
+            found.append((node, aliases))
+    return found
+
+
+def deferred_sites(root_dir, files):
+    """{module: ['file:line']} của các import có thể trì hoãn (không phải module local)"""
+    sites = {}
+    for path in files:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node, aliases in module_imports(tree):
+            for module, _, _ in aliases:
+                if not resolve_module(module.split('.')[0], root_dir):
+                    sites.setdefault(module, []).append(f'{os.path.relpath(path, root_dir)}:{node.lineno}')
+    return sites
+
+
+def insert_line(tree):
+    """Dòng (đếm từ 0) để chèn import helper: sau docstring và các `from __future__ import`"""
+    line = 0
+    for index, node in enumerate(tree.body):
+        is_docstring = (index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+                        and isinstance(node.value.value, str))
+        if is_docstring or isinstance(node, ast.ImportFrom) and node.module == '__future__':
+            line = node.end_lineno
+        else:
+            break
+    return line
+
+
+def transform_source(source, selected):
+    """Viết lại các import cấp module của `selected` thành lazy_import; trả về (source mới, số chỗ đổi)"""
+    tree = ast.parse(source)
+    lines = source.splitlines(keepends=True)
+    body_lines = {}
+    for node in tree.body:
+        for line in range(node.lineno, node.end_lineno + 1):
+            body_lines[line] = body_lines.get(line, 0) + 1
+
+    # Tên được gán bởi nhiều câu import (vd. `import a.b` và `import a.c` cùng gán a): proxy sẽ che nhau
+    binds = {}
+    for _, aliases in module_imports(tree):
+        for _, _, name in aliases:
+            binds[name] = binds.get(name, 0) + 1
+
+    changed = 0
+    # Thay từ cuối file lên để số dòng phía trên không đổi
+    for node, aliases in reversed(module_imports(tree)):
+        lazy = [(module, bind, name) for module, bind, name in aliases if module in selected and binds[name] == 1]
+        if not lazy:
+            continue
+        if any(body_lines[line] > 1 for line in range(node.lineno, node.end_lineno + 1)):
+            # Nhiều câu lệnh trên cùng dòng (`import x; y()`), giữ nguyên
+            continue
+        kept = [alias for alias, entry in zip(node.names, aliases) if entry not in lazy]
+        new = [f'import {", ".join(ast.unparse(alias) for alias in kept)}\n'] if kept else []
+        new += [f'{name} = {HELPER_NAME}({module!r}, {bind!r})\n' for module, bind, name in lazy]
+        lines[node.lineno - 1:node.end_lineno] = new
+        changed += 1
+    if changed:
+        at = insert_line(tree)
+        lines[at:at] = [f'from {RUNTIME_MODULE} import lazy_import as {HELPER_NAME}\n']
+    return ''.join(lines), changed
+
+
+def write_if_changed(path, content):
+    """Chỉ ghi khi nội dung khác, để mtime (và cache parse / fingerprint) của bản staging ổn định"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return
+    except OSError:
+        pass
+    with atomic_write(path) as f:
+        f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, f.name)
+
+
+def plan(options, index=None):
+    """Chọn import trì hoãn: danh sách lazy_imports + import ngoài tốn >= lazy_threshold_ms; kèm ước tính tiết kiệm.
+    Kết quả được cache: build không đổi gì không phải khởi động interpreter nào để đo lại"""
+    from .envindex import EnvIndex
+    from .fingerprint import digest_of
+
+    index = index or EnvIndex.load()
+    root_dir = options.script_dir
+    sites = deferred_sites(root_dir, project_files(root_dir))
+    key = digest_of({'python': f'{sys.executable}|{sys.version}', 'packages': index.packages(), 'sites': sites,
+                     'lazy_imports': sorted(options.lazy_imports), 'threshold_ms': options.lazy_threshold_ms})
+    path = plan_cache_path(options)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['report']
+    except (OSError, ValueError):
+        pass
+
+    report = measure_plan(options, sites, index)
+    try:
+        write_json(path, {'key': key, 'report': report})
+    except OSError:
+        pass
+    return report
+
+
+def measure_plan(options, sites, index):
+    """Phần tốn kém của plan(): đo chi phí import từng module và của cả nhóm trước/sau khi trì hoãn"""
+    candidates = sorted(m for m in sites if index.is_available(m))
+    costs = measure_costs(options.script, candidates, index) if candidates else {}
+
+    selected = set()
+    modules = []
+    for module in candidates:
+        cost = costs.get(module)
+        explicit = module in options.lazy_imports or module.split('.')[0] in options.lazy_imports
+        auto = bool(options.lazy_threshold_ms) and cost is not None and cost >= options.lazy_threshold_ms
+        if cost is None:
+            reason = 'import fails in this environment'
+        elif explicit or auto:
+            selected.add(module)
+            reason = 'selected' if explicit else f'>= {options.lazy_threshold_ms} ms'
+        else:
+            reason = 'below threshold'
+        modules.append({'module': module, 'cost_ms': cost, 'deferred': module in selected,
+                        'sites': sites[module], 'reason': reason})
+    missing = [m for m in options.lazy_imports if not any(e['module'].split('.')[0] == m.split('.')[0]
+                                                          for e in modules)]
+
+    # Dependency dùng chung được tính một lần: đo cả nhóm, rồi nhóm còn lại sau khi trì hoãn
+    measurable = [m for m in candidates if costs.get(m) is not None]
+    total = import_cost(measurable) if measurable else 0
+    kept = [m for m in measurable if m not in selected]
+    remaining = (import_cost(kept) if kept else 0) if selected else total
+    saving = round(total - remaining, 1) if total is not None and remaining is not None else None
+    modules.sort(key=lambda m: -(m['cost_ms'] or 0))
+    return {'modules': modules, 'selected': sorted(selected), 'not_found': missing,
+            'import_ms': total, 'expected_saving_ms': saving}
+
+
+def mirror_file(source, target):
+    """Hardlink (hoặc copy giữ mtime) file không phải .py vào staging, bỏ qua nếu đã giống"""
+    try:
+        src, dst = os.stat(source), os.stat(target)
+        if (src.st_size, src.st_mtime_ns) == (dst.st_size, dst.st_mtime_ns):
+            return
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = tmp_name(target)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def remove_stale(target, expected):
+    """Xoá khỏi staging các file không còn trong project (module cũ không được đóng gói nhầm)"""
+    for dirpath, dirnames, filenames in os.walk(target, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if path not in expected and '__pycache__' not in os.path.relpath(path, target).split(os.sep):
+                os.remove(path)
+        if dirpath != target and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def stage(options, selected):
+    """Dựng bản sao đầy đủ của project trong build/lazy/<name> (extension, package data, file đọc qua __file__),
+    viết lại import của `selected` trong các file .py; trả về (script staging, số câu import đã đổi)"""
+    root_dir = options.script_dir
+    target = staging_dir(options)
+    rewritten = 0
+    expected = set()
+    for path in project_tree(root_dir):
+        staged = os.path.join(target, os.path.relpath(path, root_dir))
+        expected.add(staged)
+        if not path.endswith('.py'):
+            mirror_file(path, staged)
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except ValueError:
+            # Không phải UTF-8: không viết lại được, chép nguyên
+            mirror_file(path, staged)
+            continue
+        try:
+            source, changed = transform_source(source, selected)
+        except (SyntaxError, ValueError):
+            changed = 0
+        rewritten += changed
+        write_if_changed(staged, source)
+    runtime = os.path.join(target, f'{RUNTIME_MODULE}.py')
+    expected.add(runtime)
+    with open(RUNTIME_PATH, 'r', encoding='utf-8') as f:
+        write_if_changed(runtime, f.read())
+    remove_stale(target, expected)
+    return os.path.join(target, os.path.relpath(os.path.abspath(options.script), root_dir)), rewritten
+
+
+def staged_options(options, on_output=None):
+    """BuildOptions build từ bản staging (output, workpath như cũ); None nếu không có import nào để trì hoãn"""
+    on_output = on_output or (lambda line: None)
+    report = plan(options)
+    for module in report['not_found']:
+        on_output(f'Lazy import {module}: no module-level `import {module}` found')
+    if not report['selected']:
+        on_output('Lazy imports: nothing to defer')
+        return None, report
+    script, rewritten = stage(options, set(report['selected']))
+    hidden = list(options.hidden_imports)
+    # Analysis của PyInstaller không thấy import trong lazy_import(), nên thêm thành hidden import
+    hidden += [m for m in report['selected'] if m not in hidden]
+    on_output(format_plan(report) + f'\n{rewritten} import statement(s) rewritten in {staging_dir(options)}')
+    staged = replace(options, script=script, name=options.output_name,
+                     distpath=options.resolved_distpath(), workpath=options.resolved_workpath(),
+                     specpath=options.resolved_specpath(), hidden_imports=hidden,
+                     lazy_imports=[], lazy_threshold_ms=0)
+    if options.asset_dirs:
+        from .assets import absolute_asset_dirs
+        staged = replace(staged, asset_dirs=absolute_asset_dirs(options))
+    return staged, report
+
+
+def format_plan(report):
+    lines = [f"Import time of external modules: {report['import_ms']} ms"]
+    for entry in report['modules']:
+        cost = f"{entry['cost_ms']:.1f} ms" if entry['cost_ms'] is not None else 'n/a'
+        mark = 'lazy' if entry['deferred'] else '    '
+        lines.append(f"  {mark} {entry['module']:<30} {cost:>10}  {entry['reason']} ({', '.join(entry['sites'][:3])})")
+    if report['expected_saving_ms'] is not None and report['selected']:
+        lines.append(f"Expected startup saving: ~{report['expected_saving_ms']} ms "
+                     f"(until the deferred modules are first used)")
+    return '\n'.join(lines)
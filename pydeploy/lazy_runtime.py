@@ -0,0 +1,55 @@
+# Module runtime của PyDeploy cho import trì hoãn, được chép vào bản staging với tên _pydeploy_lazy.py.
+# `import pandas as pd` được viết lại thành `pd = lazy_import('pandas', 'pandas')`: pandas chỉ thật sự
+# được import ở lần đầu truy cập thuộc tính của pd.
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Đứng thay module thật cho tới lần truy cập thuộc tính đầu tiên"""
+
+    def __init__(self, target, bind):
+        super().__init__(bind)
+        self.__dict__['_lazy_target'] = target
+        self.__dict__['_lazy_bind'] = bind
+        self.__dict__['_lazy_module'] = None
+
+    def _lazy_load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    importlib.import_module(self.__dict__['_lazy_target'])
+                    # `import a.b` gán tên a, `import a.b as c` gán a.b
+                    module = sys.modules[self.__dict__['_lazy_bind']]
+                    # Các lần truy cập sau đọc thẳng từ __dict__, không qua __getattr__
+                    self.__dict__.update(module.__dict__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        if self.__dict__['_lazy_module'] is None:
+            return f"<lazy module {self.__dict__['_lazy_target']!r}>"
+        return repr(self.__dict__['_lazy_module'])
+
+
+def lazy_import(target, bind):
+    """Module đã import rồi thì trả về luôn, không thì một LazyModule"""
+    if target in sys.modules:
+        return sys.modules[bind]
+    return LazyModule(target, bind)
@@ -0,0 +1,200 @@
+"""Theo dõi tài nguyên của cây process build (CPU%, RSS, I/O, số process con) và áp giới hạn nice/affinity/bộ nhớ"""
+import os
+import threading
+import time
+
+from .sizes import human_size
+
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def read_proc_stat(pid):
+    """(ppid, pgrp, utime+stime giây, rss bytes) từ /proc/<pid>/stat"""
+    with open(f'/proc/{pid}/stat', 'rb') as f:
+        data = f.read().decode('utf-8', 'replace')
+    # Tên process nằm trong ngoặc và có thể chứa dấu cách
+    fields = data[data.rindex(')') + 2:].split()
+    cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    return int(fields[1]), int(fields[2]), cpu, int(fields[21]) * PAGE_SIZE
+
+
+def read_proc_io(pid):
+    try:
+        with open(f'/proc/{pid}/io', 'r') as f:
+            values = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(values.get('read_bytes', 0)), int(values.get('write_bytes', 0))
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def proc_tree(group):
+    """Mọi process thuộc process group của build (PyInstaller chạy trong session riêng)"""
+    tree = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            _, pgrp, cpu, rss = read_proc_stat(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+        if pgrp == group:
+            tree[int(entry)] = (cpu, rss) + read_proc_io(int(entry))
+    return tree
+
+
+def psutil_tree(pid):
+    tree = {}
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return tree
+    for process in processes:
+        try:
+            with process.oneshot():
+                times = process.cpu_times()
+                rss = process.memory_info().rss
+                try:
+                    io = process.io_counters()
+                    read, write = io.read_bytes, io.write_bytes
+                except (AttributeError, psutil.Error):
+                    read, write = 0, 0
+            tree[process.pid] = (times.user + times.system, rss, read, write)
+        except psutil.Error:
+            pass
+    return tree
+
+
+def sampling_available():
+    return os.path.isdir('/proc/self') or psutil is not None
+
+
+class ResourceMonitor:
+    """Thread lấy mẫu cây process theo chu kỳ; vượt memory_limit_mb thì gọi on_limit (thường là huỷ build)"""
+
+    def __init__(self, pid, interval=0.5, memory_limit_mb=0, on_sample=None, on_limit=None):
+        self.pid = pid
+        self.interval = interval
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.on_sample = on_sample
+        self.on_limit = on_limit
+        self.samples = []
+        self.limit_hit = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        # CPU/IO của process đã thoát vẫn được cộng vào tổng
+        self.finished = {}
+        self.last = {}
+
+    def start(self):
+        self.started = time.monotonic()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+        return self.summary()
+
+    def snapshot(self):
+        if os.path.isdir('/proc/self'):
+            return proc_tree(self.pid)
+        if psutil is not None:
+            return psutil_tree(self.pid)
+        return {}
+
+    def run(self):
+        previous_cpu, previous_time = 0.0, time.monotonic()
+        while not self.stopped.is_set():
+            tree = self.snapshot()
+            now = time.monotonic()
+            for pid in set(self.last) - set(tree):
+                self.finished[pid] = self.last[pid]
+            self.last = tree
+            processes = list(tree.values()) + list(self.finished.values())
+            cpu = sum(p[0] for p in processes)
+            sample = {
+                't': round(now - self.started, 2),
+                'cpu_percent': round(max(cpu - previous_cpu, 0) / max(now - previous_time, 1e-6) * 100, 1),
+                'rss': sum(p[1] for p in tree.values()),
+                'read_bytes': sum(p[2] for p in processes),
+                'write_bytes': sum(p[3] for p in processes),
+                'children': max(len(tree) - 1, 0)
+            }
+            previous_cpu, previous_time = cpu, now
+            if tree:
+                self.samples.append(sample)
+                if self.on_sample:
+                    self.on_sample(sample)
+                if self.memory_limit and sample['rss'] > self.memory_limit and not self.limit_hit:
+                    self.limit_hit = True
+                    if self.on_limit:
+                        self.on_limit(sample)
+            self.stopped.wait(self.interval)
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        cpu = [s['cpu_percent'] for s in self.samples]
+        return {
+            'samples': len(self.samples),
+            'peak_rss': max(s['rss'] for s in self.samples),
+            'max_cpu_percent': max(cpu),
+            'mean_cpu_percent': round(sum(cpu) / len(cpu), 1),
+            'read_bytes': self.samples[-1]['read_bytes'],
+            'write_bytes': self.samples[-1]['write_bytes'],
+            'max_children': max(s['children'] for s in self.samples),
+            'memory_limit_hit': self.limit_hit,
+            # Giữ tối đa 200 mẫu trong bản ghi build
+            'timeline': self.samples[::max(1, len(self.samples) // 200)]
+        }
+
+
+def apply_limits(pid, nice=0, cpu_affinity=None):
+    """Đặt nice và CPU affinity cho process build ngay sau khi khởi động; process con kế thừa"""
+    applied = []
+    if nice:
+        if hasattr(os, 'setpriority'):
+            os.setpriority(os.PRIO_PROCESS, pid, nice)
+            applied.append(f'nice {nice}')
+        elif psutil is not None:
+            priority = psutil.BELOW_NORMAL_PRIORITY_CLASS if nice > 0 else psutil.ABOVE_NORMAL_PRIORITY_CLASS
+            psutil.Process(pid).nice(priority)
+            applied.append('priority below normal' if nice > 0 else 'priority above normal')
+    if cpu_affinity:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(pid, cpu_affinity)
+            applied.append(f'cpus {",".join(map(str, cpu_affinity))}')
+        elif psutil is not None and hasattr(psutil.Process, 'cpu_affinity'):
+            psutil.Process(pid).cpu_affinity(list(cpu_affinity))
+            applied.append(f'cpus {",".join(map(str, cpu_affinity))}')
+    return applied
+
+
+def parse_cpu_list(text):
+    """'0-3,6' -> [0, 1, 2, 3, 6]"""
+    cpus = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def format_sample(sample):
+    return (f"CPU {sample['cpu_percent']:.0f}% • RSS {human_size(sample['rss'])} • "
+            f"I/O {human_size(sample['read_bytes'] + sample['write_bytes'])} • {sample['children']} child")
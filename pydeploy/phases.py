@@ -0,0 +1,149 @@
+"""Nhận diện các phase thật của PyInstaller từ log, đo thời gian và ước lượng ETA từ lịch sử"""
+import json
+import os
+import re
+import threading
+import time
+
+from .fsutil import write_json
+
+
+# Thứ tự phase và các dòng log PyInstaller đánh dấu lúc bắt đầu phase
+PHASES = [
+    ('analysis', 'Analysis', [r'initializing module dependency graph', r'analyzing base_library',
+                              r'analyzing .*\.py', r'running analysis']),
+    ('hooks', 'Hook collection', [r'processing module hooks', r'processing pre-safe.import',
+                                  r'looking for dynamic libraries', r'analyzing run-time hooks',
+                                  r'looking for ctypes dlls']),
+    ('pyz', 'Building PYZ', [r'building pyz']),
+    ('pkg', 'Building PKG', [r'building pkg']),
+    ('exe', 'Building EXE', [r'building exe']),
+    ('upx', 'UPX compression', [r'executing.*\bupx\b', r'\bupx\b.*compress']),
+    ('collect', 'COLLECT', [r'building collect']),
+]
+
+PHASE_NAMES = [name for name, _, _ in PHASES]
+PHASE_LABELS = {name: label for name, label, _ in PHASES}
+PHASE_PATTERNS = [(name, [re.compile(p) for p in patterns]) for name, _, patterns in PHASES]
+
+HISTORY_RUNS = 10
+
+
+class PhaseTracker:
+    """Theo dõi phase hiện tại; phase chỉ đi tới, không quay lại"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = clock()
+        self.current = None
+        self.events = []
+        self.ended = None
+
+    def feed(self, line):
+        """Trả về tên phase mới nếu dòng log này mở một phase sau phase hiện tại"""
+        line_lower = line.lower()
+        current_index = PHASE_NAMES.index(self.current) if self.current else -1
+        for index, (name, patterns) in enumerate(PHASE_PATTERNS):
+            if index <= current_index:
+                continue
+            if any(p.search(line_lower) for p in patterns):
+                self.current = name
+                self.events.append((name, self.clock() - self.started))
+                return name
+        return None
+
+    def finish(self):
+        self.ended = self.clock() - self.started
+        return self.durations()
+
+    def elapsed(self):
+        if self.ended is not None:
+            return self.ended
+        return self.clock() - self.started
+
+    def phase_elapsed(self):
+        if not self.events:
+            return self.elapsed()
+        return self.elapsed() - self.events[-1][1]
+
+    def durations(self):
+        """Thời gian (giây) của từng phase đã đi qua, kể cả phần khởi động trước analysis"""
+        end = self.elapsed()
+        durations = {}
+        if self.events:
+            durations['startup'] = round(self.events[0][1], 3)
+        for i, (name, start) in enumerate(self.events):
+            stop = self.events[i + 1][1] if i + 1 < len(self.events) else end
+            durations[name] = round(stop - start, 3)
+        return durations
+
+    def to_dict(self):
+        return {
+            'total': round(self.elapsed(), 3),
+            'phases': self.durations(),
+            'events': [{'phase': name, 'start': round(start, 3)} for name, start in self.events]
+        }
+
+
+def history_path(script):
+    return os.path.join(os.path.dirname(os.path.abspath(script)), 'build', '.pydeploy-phases.json')
+
+
+def history_key(options):
+    return f'{os.path.abspath(options.script)}|{"onefile" if options.onefile else "onedir"}'
+
+
+class PhaseHistory:
+    """Lưu thời gian phase của các build gần nhất theo project, dùng để ước lượng tiến độ"""
+
+    lock = threading.Lock()
+
+    def __init__(self, options):
+        self.path = history_path(options.script)
+        self.key = history_key(options)
+        self.runs = self.load().get(self.key, [])
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, breakdown):
+        with self.lock:
+            data = self.load()
+            runs = data.get(self.key, []) + [dict(breakdown, finished_at=time.time())]
+            data[self.key] = runs[-HISTORY_RUNS:]
+            write_json(self.path, data, indent=2)
+            self.runs = data[self.key]
+
+    def averages(self):
+        if not self.runs:
+            return {}
+        totals = {}
+        for run in self.runs:
+            for name, seconds in run['phases'].items():
+                totals.setdefault(name, []).append(seconds)
+        return {name: sum(values) / len(values) for name, values in totals.items()}
+
+    def estimate(self, tracker):
+        """(phần trăm 0-99, ETA giây) dựa trên lịch sử; None nếu chưa có lịch sử"""
+        averages = self.averages()
+        expected_total = sum(averages.values())
+        if not expected_total:
+            return None
+
+        passed = [name for name, _ in tracker.events]
+        done = averages.get('startup', 0) if passed else min(tracker.elapsed(), averages.get('startup', 0))
+        for name in passed[:-1]:
+            done += averages.get(name, 0)
+        if passed:
+            done += min(tracker.phase_elapsed(), averages.get(passed[-1], 0))
+        # Phase bị bỏ qua (vd. không có UPX) không còn được tính vào phần còn lại
+        skipped = sum(averages.get(name, 0) for name in PHASE_NAMES
+                      if name not in passed and passed and
+                      PHASE_NAMES.index(name) < PHASE_NAMES.index(passed[-1]))
+        total = max(expected_total - skipped, done)
+        percent = min(int(done / total * 100), 99) if total else 0
+        return percent, max(total - done, 0)
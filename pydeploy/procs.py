@@ -0,0 +1,64 @@
+"""Khởi chạy PyInstaller trong process group riêng để huỷ được cả cây process con"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+
+def popen_group(argv, **kwargs):
+    """Popen trong session/process group mới để terminate_tree dừng được mọi process con"""
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = kwargs.get('creationflags', 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    return subprocess.Popen(argv, **kwargs)
+
+
+def terminate_tree(pid, timeout=5):
+    """Dừng process pid cùng toàn bộ process con: SIGTERM cả group, sau timeout thì SIGKILL"""
+    if sys.platform == 'win32':
+        subprocess.run(['taskkill', '/T', '/F', '/PID', str(pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return
+
+    try:
+        pgid = os.getpgid(pid)
+    except ProcessLookupError:
+        return
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    def kill_later():
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    timer = threading.Timer(timeout, kill_later)
+    timer.daemon = True
+    timer.start()
+
+
+class CancelToken:
+    """Cho phép thread khác huỷ build đang chạy; engine đăng ký hàm dừng khi process đã khởi động"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.stop = None
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            stop = self.stop
+        if stop:
+            stop()
+
+    def register(self, stop):
+        with self.lock:
+            self.stop = stop
+            cancelled = self.cancelled
+        if cancelled:
+            stop()
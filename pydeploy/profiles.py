@@ -0,0 +1,212 @@
+"""Profile build (mức tối ưu bytecode, PYZ hay noarchive, strip), kiểm tra app còn import được và so size/startup"""
+import ast
+import json
+import os
+import subprocess
+import sys
+from dataclasses import replace
+
+from .bench import artifact_size
+from .engine import artifact_path, run_build
+from .imports import ParseCache, build_import_graph, import_cache_path
+from .sizes import human_size
+
+
+PROFILE_SETTINGS = ('optimize', 'noarchive', 'strip')
+
+PROFILES = {
+    'default': {'optimize': 0, 'noarchive': False, 'strip': False},
+    # -OO: bỏ docstring + assert; module vẫn nằm trong PYZ nén; strip symbol của binary (không có trên Windows)
+    'release': {'optimize': 2, 'noarchive': False, 'strip': sys.platform != 'win32'},
+    # Như release nhưng .pyc để rời trong thư mục (onedir), không giải nén PYZ lúc import
+    'release-noarchive': {'optimize': 2, 'noarchive': True, 'strip': sys.platform != 'win32'},
+}
+
+# Package cần docstring lúc chạy nên hỏng dưới -OO
+DOCSTRING_PACKAGES = {
+    'docopt': 'parses its usage text from __doc__',
+    'ply': 'reads grammar rules from docstrings',
+}
+
+IMPORT_CHECK_CODE = '''
+import importlib, json, sys
+sys.path.insert(0, sys.argv[1])
+failed = {}
+for name in sys.argv[2:]:
+    try:
+        importlib.import_module(name)
+    except BaseException as e:
+        failed[name] = f"{type(e).__name__}: {e}"
+print("PYDEPLOY-IMPORTS " + json.dumps({"failed": failed}))
+'''
+
+
+def apply_profile(options, profile):
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown profile: {profile}')
+    return replace(options, **PROFILES[profile])
+
+
+def profile_of(options):
+    """Tên profile khớp với tuỳ chọn hiện tại, 'custom' nếu đã chỉnh tay"""
+    current = {key: getattr(options, key) for key in PROFILE_SETTINGS}
+    for name, settings in PROFILES.items():
+        if settings == current:
+            return name
+    return 'custom'
+
+
+def module_name(file_path, root_dir):
+    parts = os.path.splitext(os.path.relpath(file_path, root_dir))[0].split(os.sep)
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    return '.'.join(parts)
+
+
+def optimization_warnings(file_path, optimize):
+    """Code dựa vào docstring (mất ở -OO) hoặc assert có lời gọi hàm (bị bỏ qua từ -O)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=file_path)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    warnings = []
+    for node in ast.walk(tree):
+        if optimize >= 2 and (isinstance(node, ast.Attribute) and node.attr == '__doc__'
+                              or isinstance(node, ast.Name) and node.id == '__doc__'):
+            warnings.append((node.lineno, 'reads __doc__, which is None under -OO'))
+        elif optimize >= 1 and isinstance(node, ast.Assert) and any(
+                isinstance(child, ast.Call) for child in ast.walk(node.test)):
+            warnings.append((node.lineno, 'assert with a call is skipped under -O'))
+    return warnings
+
+
+def check_imports(options, timeout=120):
+    """Import mọi module local (trừ script chính) và package ngoài của app bằng python -O/-OO"""
+    script = os.path.abspath(options.script)
+    root_dir = os.path.dirname(script)
+    graph = build_import_graph(script, ParseCache(import_cache_path(script)))
+    report = {'optimize': options.optimize, 'ok': True, 'failed': {}, 'warnings': [], 'timed_out': False}
+
+    for file_path in graph.files:
+        for line, message in optimization_warnings(file_path, options.optimize):
+            report['warnings'].append(f'{os.path.relpath(file_path, root_dir)}:{line}: {message}')
+    if options.optimize >= 2:
+        for name in sorted(graph.external & set(DOCSTRING_PACKAGES)):
+            report['warnings'].append(f'{name} {DOCSTRING_PACKAGES[name]}')
+
+    names = [module_name(path, root_dir) for path in graph.files if path != script]
+    names += sorted(graph.external)
+    if not names:
+        return report
+    failed = run_import_check(root_dir, names, options.optimize, timeout)
+    if failed is None:
+        report.update(ok=False, timed_out=True)
+        return report
+    if failed and options.optimize:
+        # Chỉ tính module hỏng vì profile: bỏ những module cũng lỗi khi chạy không tối ưu
+        # (module chỉ có trên hệ điều hành khác, package ngoài chưa cài...)
+        plain = run_import_check(root_dir, list(failed), 0, timeout) or {}
+        failed = {name: error for name, error in failed.items() if name not in plain}
+    report['failed'] = failed
+    report['ok'] = not failed
+    return report
+
+
+def run_import_check(root_dir, names, optimize, timeout):
+    """{module: lỗi} của các module import hỏng trong python -O*optimize, None nếu quá thời gian"""
+    flags = ['-' + 'O' * optimize] if optimize else []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    try:
+        process = subprocess.run([sys.executable] + flags + ['-c', IMPORT_CHECK_CODE, root_dir] + names,
+                                 cwd=root_dir, env=env, stdin=subprocess.DEVNULL, capture_output=True,
+                                 text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith('PYDEPLOY-IMPORTS '):
+            return json.loads(line[len('PYDEPLOY-IMPORTS '):])['failed']
+    return {'<interpreter>': (process.stderr.strip().splitlines() or ['no output'])[-1]}
+
+
+def profile_dirs(options, profile):
+    root = os.path.join(options.script_dir, 'build', 'profiles', profile)
+    return os.path.join(root, 'dist'), os.path.join(root, 'work')
+
+
+def measure_profile(options, profile, runs=3, on_output=None, check=True):
+    """Build app với profile vào thư mục riêng, rồi đo dung lượng + startup (kèm hook đo thời gian)"""
+    from .startup import profile_startup
+
+    distpath, workpath = profile_dirs(options, profile)
+    profiled = replace(apply_profile(options, profile), distpath=distpath, workpath=workpath,
+                       specpath=workpath, warm=False, startup_hook=True)
+    entry = {'profile': profile, 'settings': dict(PROFILES[profile])}
+    if check and profiled.optimize:
+        entry['import_check'] = check_imports(profiled)
+        if not entry['import_check']['ok']:
+            entry['success'] = False
+            entry['message'] = 'Import check failed under -' + 'O' * profiled.optimize
+            return entry
+
+    result = run_build(profiled, on_output=on_output)
+    entry.update(success=result.success, message=result.message, duration=round(result.duration, 3))
+    if not result.success:
+        return entry
+    artifact = artifact_path(profiled)
+    entry['size_bytes'] = artifact_size(artifact if profiled.onefile else os.path.dirname(artifact))
+    startup = profile_startup(artifact, runs)
+    entry['startup'] = {'first_run': startup['first_run'], 'warm': startup['warm']}
+    return entry
+
+
+def startup_seconds(entry, which):
+    timing = entry['startup'][which]
+    return timing['time_to_python'] if timing['time_to_python'] is not None else timing['wall_seconds']
+
+
+def compare_profiles(options, profiles=None, runs=3, on_output=None):
+    """Đo 'default' và từng profile, kèm chênh lệch size / lần chạy đầu / warm start so với default"""
+    profiles = [p for p in profiles or PROFILES if p != 'default']
+    entries = [measure_profile(options, 'default', runs, on_output)]
+    entries += [measure_profile(options, profile, runs, on_output) for profile in profiles]
+
+    base = entries[0]
+    for entry in entries[1:]:
+        if not (base.get('success') and entry.get('success')):
+            continue
+        size_delta = entry['size_bytes'] - base['size_bytes']
+        entry['delta'] = {
+            'size_bytes': size_delta,
+            'size_percent': round(size_delta / base['size_bytes'] * 100, 1) if base['size_bytes'] else None,
+            'first_run_seconds': round(startup_seconds(entry, 'first_run') - startup_seconds(base, 'first_run'), 4),
+            'warm_seconds': round(startup_seconds(entry, 'warm') - startup_seconds(base, 'warm'), 4)
+        }
+    return {'script': options.script, 'mode': 'onefile' if options.onefile else 'onedir', 'profiles': entries}
+
+
+def format_comparison(report):
+    lines = [f"{os.path.basename(report['script'])} ({report['mode']})"]
+    for entry in report['profiles']:
+        settings = entry['settings']
+        label = (f"{entry['profile']:<18} optimize={settings['optimize']} "
+                 f"{'noarchive' if settings['noarchive'] else 'PYZ'}{' strip' if settings['strip'] else ''}")
+        if not entry.get('success'):
+            lines.append(f"  {label}: {entry.get('message', 'failed')}")
+        else:
+            line = (f"  {label}: {human_size(entry['size_bytes']):>10}  "
+                    f"first run {startup_seconds(entry, 'first_run'):.3f}s  warm {startup_seconds(entry, 'warm'):.3f}s")
+            delta = entry.get('delta')
+            if delta:
+                sign = '+' if delta['size_bytes'] >= 0 else '-'
+                line += (f"  ({sign}{human_size(abs(delta['size_bytes']))}, first run {delta['first_run_seconds']:+.3f}s, "
+                         f"warm {delta['warm_seconds']:+.3f}s)")
+            lines.append(line)
+        check = entry.get('import_check')
+        if check:
+            for name, error in check['failed'].items():
+                lines.append(f'      import {name}: {error}')
+            if check['timed_out']:
+                lines.append('      import check timed out')
+            lines += [f'      warning: {w}' for w in check['warnings']]
+    return '\n'.join(lines)
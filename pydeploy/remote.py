@@ -0,0 +1,584 @@
+"""Build phân tán: gửi nguồn + tuỳ chọn tới worker node qua socket, nhận log/tiến độ và artifact về.
+Mỗi message là một dòng JSON; message có 'size' được theo sau bởi đúng chừng đó byte (tar.gz)."""
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import socketserver
+import tarfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+
+from . import artifacts, workcache
+from .daemon import parse_address, token_matches
+from .fsutil import tmp_name, write_json
+from .engine import BuildLog, BuildOptions, BuildResult, artifact_path, log_file_path, run_build
+from .procs import CancelToken
+
+
+DEFAULT_ADDRESS = '127.0.0.1:8767'
+PROTOCOL = 1
+CONNECT_TIMEOUT = 5
+STATUS_TIMEOUT = 3
+CHUNK = 1 << 20
+
+# Thư mục không gửi cho worker (ngoài thư mục ẩn và virtualenv)
+SKIP_DIRS = {'build', 'dist', '__pycache__', 'node_modules', 'site-packages'}
+# Trong bundle nguồn: chỗ đặt icon / thư mục asset nằm ngoài project
+EXTERNAL_DIR = '.pydeploy-remote'
+KEY_PATTERN = re.compile(r'[0-9a-f]{16}')
+# Token chung giữa client và worker; worker từ chối mọi request không mang đúng token
+TOKEN_ENV = 'PYDEPLOY_WORKER_TOKEN'
+
+# Số build máy này đang gửi tới từng worker, để các build song song (suite, nhiều cửa sổ) trải đều ra
+_inflight = Counter()
+_inflight_lock = threading.Lock()
+
+
+class WorkerLost(Exception):
+    """Worker không kết nối được hoặc mất kết nối giữa chừng: thử lại trên worker khác"""
+
+
+def write_message(stream, message, payload=None):
+    """Ghi một message; payload là đường dẫn file gửi kèm ngay sau dòng JSON"""
+    if payload is not None:
+        message = dict(message, size=os.path.getsize(payload))
+    stream.write((json.dumps(message) + '\n').encode('utf-8'))
+    if payload is not None:
+        with open(payload, 'rb') as f:
+            shutil.copyfileobj(f, stream, CHUNK)
+    stream.flush()
+
+
+def read_message(stream):
+    line = stream.readline()
+    if not line:
+        raise EOFError('connection closed')
+    return json.loads(line)
+
+
+def read_payload(stream, size, path):
+    """Đọc đúng size byte của payload vào path"""
+    remaining = size
+    with open(path, 'wb') as f:
+        while remaining:
+            chunk = stream.read(min(CHUNK, remaining))
+            if not chunk:
+                raise EOFError('connection closed during transfer')
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+def pack_files(files, blob_path):
+    """tar.gz nén nhanh của {tên trong archive: file}; mạng LAN nhanh hơn gzip -9 nhiều"""
+    with tarfile.open(blob_path, 'w:gz', compresslevel=1) as tar:
+        for name, path in files.items():
+            tar.add(path, arcname=name)
+
+
+def worker_token():
+    return os.environ.get(TOKEN_ENV, '')
+
+
+def source_path(source, name):
+    """Đường dẫn của file name (tên trong manifest) trong bản sao nguồn; ném ValueError nếu name là đường dẫn
+    tuyệt đối, có ổ đĩa, '..' hoặc (qua symlink) trỏ ra ngoài source"""
+    parts = name.replace('\\', '/').split('/')
+    if not name or os.path.isabs(name) or parts[0] == '' or ':' in name or '..' in parts:
+        raise ValueError(f'unsafe path in source bundle: {name}')
+    root = os.path.realpath(source)
+    path = os.path.realpath(os.path.join(root, *parts))
+    if os.path.commonpath([path, root]) != root or path == root:
+        raise ValueError(f'unsafe path in source bundle: {name}')
+    return path
+
+
+def parse_addresses(spec):
+    return [address.strip() for address in spec.split(',') if address.strip()]
+
+
+def project_key(options):
+    """Định danh project trên worker: cùng máy, cùng script, cùng tên output thì dùng lại thư mục (và workpath) cũ"""
+    data = [socket.gethostname(), os.path.abspath(options.script), options.output_name]
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()[:16]
+
+
+def source_files(options):
+    """({đường dẫn tương đối: file} của cả thư mục project, dict tuỳ chọn đã đổi sang đường dẫn tương đối)"""
+    from .assets import parse_asset_dir
+
+    root = options.script_dir
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')
+                             and not os.path.isfile(os.path.join(dirpath, d, 'pyvenv.cfg')))
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            files[os.path.relpath(path, root).replace(os.sep, '/')] = path
+
+    def relative(path, external):
+        """Đường dẫn tương đối với project; file/thư mục nằm ngoài được gửi kèm dưới EXTERNAL_DIR"""
+        path = os.path.abspath(os.path.join(root, path))
+        try:
+            inside = os.path.commonpath([path, root]) == root
+        except ValueError:
+            # Khác ổ đĩa trên Windows
+            inside = False
+        if inside:
+            return os.path.relpath(path, root).replace(os.sep, '/')
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    source = os.path.join(dirpath, filename)
+                    files[f'{external}/{os.path.relpath(source, path).replace(os.sep, "/")}'] = source
+        else:
+            files[external] = path
+        return external
+
+    values = options.to_dict()
+    values['script'] = relative(options.script, f'{EXTERNAL_DIR}/{os.path.basename(options.script)}')
+    if options.icon:
+        values['icon'] = relative(options.icon, f'{EXTERNAL_DIR}/icon{os.path.splitext(options.icon)[1]}')
+    specs = []
+    for i, spec in enumerate(options.asset_dirs):
+        source, prefix = parse_asset_dir(spec)
+        specs.append(f'{relative(source, f"{EXTERNAL_DIR}/assets{i}")}:{prefix}')
+    values['asset_dirs'] = specs
+    # Worker tự quyết định đường dẫn build; không gửi tiếp cho daemon/worker khác
+    values.update(distpath='', workpath='', specpath='', daemon='', remote='')
+    return files, values
+
+
+def source_manifest(options, files):
+    from .assets import DigestCache
+
+    cache = DigestCache(os.path.join(options.script_dir, 'build', '.pydeploy-remote', 'digests.json'))
+    manifest = {name: cache.digest(path) for name, path in files.items()}
+    cache.save()
+    return manifest
+
+
+def state_path(options):
+    """Artifact lần trước nhận từ worker: để worker không gửi lại khi không đổi"""
+    return os.path.join(options.script_dir, 'build', '.pydeploy-remote', f'{options.output_name}.json')
+
+
+def load_state(options):
+    try:
+        with open(state_path(options), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(options, state):
+    write_json(state_path(options), state, indent=2)
+
+
+def status(address, timeout=STATUS_TIMEOUT, token=None):
+    """Trạng thái worker; ném ValueError nếu worker từ chối (sai token, protocol khác)"""
+    with socket.create_connection(parse_address(address), timeout=timeout) as sock:
+        stream = sock.makefile('rwb')
+        write_message(stream, {'op': 'status', 'token': worker_token() if token is None else token})
+        reply = read_message(stream)
+    if reply.get('type') != 'status':
+        raise ValueError(reply.get('message', 'unexpected reply'))
+    return reply
+
+
+def probe(addresses, token=None):
+    """{address: status} của các worker trả lời được, hỏi song song"""
+    def ask(address):
+        try:
+            return address, status(address, token=token)
+        except (OSError, ValueError, EOFError):
+            return address, None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(addresses))) as executor:
+        return {address: info for address, info in executor.map(ask, addresses) if info}
+
+
+def rank(statuses, key):
+    """Worker rảnh trước worker bận; trong cùng nhóm, worker đang giữ workpath warm của project đứng trước,
+    rồi tới worker còn nhiều slot trống nhất. Gọi khi đang giữ _inflight_lock"""
+    def score(address):
+        info = statuses[address]
+        free = info['slots'] - max(info['busy'], _inflight[address])
+        return (free <= 0, key not in info['projects'], -free, address)
+    return sorted(statuses, key=score)
+
+
+def claim(statuses, key, failed):
+    """Chọn worker tốt nhất chưa hỏng và tính nó là đang bận ngay, để build song song kế tiếp chọn worker khác"""
+    with _inflight_lock:
+        candidates = [address for address in rank(statuses, key) if address not in failed]
+        if not candidates:
+            return None
+        _inflight[candidates[0]] += 1
+        return candidates[0]
+
+
+def dispatch_build(options, on_output=None, on_progress=None, on_status=None, cancel=None):
+    """Build options trên worker tốt nhất trong options.remote; worker hỏng thì thử lại trên worker kế tiếp"""
+    on_output = on_output or (lambda line: None)
+    on_progress = on_progress or (lambda value: None)
+    on_status = on_status or (lambda text: None)
+    started = time.time()
+    addresses = parse_addresses(options.remote)
+    argv = ['pydeploy-remote'] + addresses
+
+    on_status('Contacting build workers')
+    statuses = probe(addresses)
+    for address in addresses:
+        if address not in statuses:
+            on_output(f'Worker {address}: unreachable or rejected the token (set {TOKEN_ENV})')
+    if not statuses:
+        return BuildResult(False, -1, f"Lỗi: no build worker reachable ({', '.join(addresses)})", argv,
+                           duration=time.time() - started)
+    try:
+        files, values = source_files(options)
+        manifest = source_manifest(options, files)
+    except OSError as e:
+        return BuildResult(False, -1, f"Lỗi: {str(e)}", argv, duration=time.time() - started)
+
+    key = project_key(options)
+    log = BuildLog(log_file_path(options))
+    try:
+        def emit(line):
+            log.write(line)
+            on_output(line)
+
+        failed = set()
+        while not (cancel and cancel.cancelled):
+            address = claim(statuses, key, failed)
+            if address is None:
+                break
+            warm = 'warm' if key in statuses[address]['projects'] else 'cold'
+            emit(f"Dispatching to worker {address} ({statuses[address]['name']}, {warm})")
+            try:
+                result = run_on_worker(address, options, key, values, manifest, files,
+                                       emit, on_progress, on_status, cancel)
+            except (WorkerLost, OSError, ValueError, EOFError) as e:
+                failed.add(address)
+                if not (cancel and cancel.cancelled):
+                    emit(f'Worker {address} failed: {e}; retrying on the next worker')
+                continue
+            finally:
+                with _inflight_lock:
+                    _inflight[address] -= 1
+            result.duration = time.time() - started
+            result.log_file = log.path
+            return result
+
+        if cancel and cancel.cancelled:
+            emit('Build cancelled.')
+            return BuildResult(False, -1, "Đã huỷ build.", argv, '', time.time() - started,
+                               log.last(10), log_file=log.path, cancelled=True)
+        return BuildResult(False, -1, "Lỗi: every build worker failed", argv, '', time.time() - started,
+                           log.last(10), log_file=log.path)
+    finally:
+        log.close()
+
+
+def run_on_worker(address, options, key, values, manifest, files, emit, on_progress, on_status, cancel):
+    """Một lần build trên một worker; ném WorkerLost nếu worker chết hoặc ngắt kết nối trước khi có kết quả"""
+    state = load_state(options)
+    artifact = artifacts.output_root(options, artifact_path(options))
+    have = state.get('sha256', '') if state.get('worker') == address and os.path.exists(artifact) else ''
+    try:
+        sock = socket.create_connection(parse_address(address), timeout=CONNECT_TIMEOUT)
+    except OSError as e:
+        raise WorkerLost(e)
+    sock.settimeout(None)
+
+    def stop():
+        # Đóng socket: worker thấy client ngắt kết nối và dừng build
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    if cancel:
+        cancel.register(stop)
+    blob = tmp_name(os.path.join(options.script_dir, 'build', '.pydeploy-remote', f'{key}.tar.gz'))
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        stream = sock.makefile('rwb')
+        write_message(stream, {'op': 'build', 'protocol': PROTOCOL, 'token': worker_token(), 'project': key,
+                               'options': values, 'manifest': manifest, 'have': have})
+        reply = read_message(stream)
+        if reply['type'] == 'error':
+            raise WorkerLost(reply['message'])
+        # Worker đã có các file cùng nội dung từ lần trước: chỉ gửi file mới/đổi
+        needed = {name: files[name] for name in reply['files']}
+        pack_files(needed, blob)
+        emit(f'Sending {len(needed)} of {len(files)} source files')
+        write_message(stream, {'type': 'files'}, blob)
+
+        while True:
+            message = read_message(stream)
+            if message['type'] == 'output':
+                emit(message['line'])
+            elif message['type'] == 'progress':
+                on_progress(message['value'])
+            elif message['type'] == 'status':
+                on_status(message['text'])
+            elif message['type'] == 'result':
+                break
+            elif message['type'] == 'error':
+                raise WorkerLost(message['message'])
+
+        known = {f.name for f in fields(BuildResult)}
+        result = BuildResult(**{k: v for k, v in message['result'].items() if k in known})
+        if not result.success:
+            return result
+        meta = message['artifact']
+        if message.get('size'):
+            read_payload(stream, message['size'], blob)
+            artifacts.restore(blob, artifact)
+            emit(f"Received {meta['name']} from {address}")
+        else:
+            emit(f"{meta['name']} unchanged on {address}, not transferred")
+        save_state(options, {'worker': address, 'sha256': meta['sha256']})
+    finally:
+        if os.path.exists(blob):
+            os.remove(blob)
+        sock.close()
+
+    if options.asset_dirs and not options.assets_inside:
+        # Archive asset nằm cạnh exe onefile, ngoài artifact nhận về: đóng gói lại tại chỗ (nội dung như trên worker)
+        from . import assets
+        assets.prepare(options, emit)
+        assets.place(options, artifact_path(options), emit)
+    result.artifact = artifact_path(options)
+    result.message = f'{result.message} ({address})'
+    return result
+
+
+class WorkerNode:
+    """Giữ bản sao nguồn và workpath warm của từng project dưới root/projects/<key>, chạy tối đa slots build cùng lúc"""
+
+    def __init__(self, root, slots=1, max_mb=20480):
+        self.root = os.path.abspath(root)
+        self.slots = slots
+        self.max_bytes = max_mb * 1024 * 1024
+        self.semaphore = threading.Semaphore(slots)
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.project_locks = {}
+        self.stats = {'jobs': 0, 'failed': 0}
+
+    def projects_root(self):
+        return os.path.join(self.root, 'projects')
+
+    def project_lock(self, key):
+        with self.lock:
+            return self.project_locks.setdefault(key, threading.Lock())
+
+    def status(self):
+        projects = {}
+        root = self.projects_root()
+        if os.path.isdir(root):
+            for key in os.listdir(root):
+                if KEY_PATTERN.fullmatch(key):
+                    projects[key] = workcache.last_used(os.path.join(root, key))
+        with self.lock:
+            busy = self.busy
+        return dict(self.stats, type='status', protocol=PROTOCOL, name=socket.gethostname(),
+                    slots=self.slots, busy=busy, projects=projects)
+
+    def sync(self, project, manifest, rfile, send):
+        """Báo client các file còn thiếu, nhận và giải nén chúng, xoá file không còn trong manifest"""
+        source = os.path.join(project, 'src')
+        manifest_file = os.path.join(project, 'manifest.json')
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = {}
+        os.makedirs(source, exist_ok=True)
+        paths = {name: source_path(source, name) for name in manifest}
+        needed = sorted(name for name, digest in manifest.items()
+                        if current.get(name) != digest or not os.path.isfile(paths[name]))
+        send({'type': 'need', 'files': needed})
+
+        message = read_message(rfile)
+        blob = tmp_name(os.path.join(project, 'sources.tar.gz'))
+        try:
+            read_payload(rfile, message['size'], blob)
+            with tarfile.open(blob, 'r:gz') as tar:
+                # Chỉ file thường có tên đúng như trong manifest (đã kiểm tra ở trên), không link/thiết bị
+                for member in tar.getmembers():
+                    if member.isfile() and member.name in paths:
+                        path = paths[member.name]
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with tar.extractfile(member) as src, open(path, 'wb') as dst:
+                            shutil.copyfileobj(src, dst, CHUNK)
+        finally:
+            if os.path.exists(blob):
+                os.remove(blob)
+        for name in current:
+            if name not in manifest:
+                try:
+                    os.remove(source_path(source, name))
+                except (OSError, ValueError):
+                    pass
+        write_json(manifest_file, manifest)
+        return source
+
+    def local_options(self, source, values):
+        """BuildOptions trên worker: đường dẫn trong bản sao nguồn, build warm để giữ analysis cache giữa các lần"""
+        known = {f.name for f in fields(BuildOptions)}
+        values = {key: value for key, value in values.items() if key in known}
+        values['script'] = os.path.join(source, values['script'])
+        if values.get('icon'):
+            values['icon'] = os.path.join(source, values['icon'])
+        values.update(warm=True, distpath='', workpath='', specpath='', daemon='', remote='')
+        return BuildOptions(**values)
+
+    def pack_artifact(self, project, options, result):
+        """tar.gz của artifact, dùng lại bản đã nén nếu dist không đổi từ lần trước; trả về (đường dẫn, meta)"""
+        root = artifacts.output_root(options, result.artifact)
+        blob = os.path.join(project, 'artifact.tar.gz')
+        meta_file = os.path.join(project, 'artifact.json')
+        stamp = os.stat(root).st_mtime_ns
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('stamp') == stamp and os.path.isfile(blob):
+            return blob, meta
+        digest = artifacts.pack(root, tmp_name(blob))
+        os.replace(tmp_name(blob), blob)
+        meta = {'name': os.path.basename(root), 'sha256': digest, 'stamp': stamp}
+        write_json(meta_file, meta)
+        return blob, meta
+
+    def build(self, request, rfile, wfile):
+        write_lock = threading.Lock()
+        cancel = CancelToken()
+
+        def send(message, payload=None):
+            with write_lock:
+                write_message(wfile, message, payload)
+
+        def forward(message):
+            # Client đã ngắt kết nối (huỷ build): dừng PyInstaller, bỏ các dòng log còn lại
+            if cancel.cancelled:
+                return
+            try:
+                send(message)
+            except OSError:
+                cancel.cancel()
+
+        key = request.get('project', '')
+        if request.get('protocol') != PROTOCOL or not KEY_PATTERN.fullmatch(key):
+            send({'type': 'error', 'message': f"unsupported request (protocol {request.get('protocol')})"})
+            return
+        project = os.path.join(self.projects_root(), key)
+        os.makedirs(project, exist_ok=True)
+
+        with self.project_lock(key):
+            # Build của project khác xong có thể evict trong lúc sync/build: giữ lock tới khi gửi xong
+            in_use = workcache.lock(project)
+            try:
+                source = self.sync(project, request['manifest'], rfile, send)
+                options = self.local_options(source, request['options'])
+
+                def watch_disconnect():
+                    # Client không gửi gì thêm sau bundle nguồn: đọc được EOF nghĩa là client đã đi
+                    try:
+                        rfile.read(1)
+                    except OSError:
+                        pass
+                    cancel.cancel()
+                threading.Thread(target=watch_disconnect, daemon=True).start()
+
+                if not self.semaphore.acquire(blocking=False):
+                    forward({'type': 'status', 'text': 'Waiting for a free worker slot'})
+                    self.semaphore.acquire()
+                with self.lock:
+                    self.busy += 1
+                try:
+                    result = run_build(options,
+                                       on_output=lambda line: forward({'type': 'output', 'line': line}),
+                                       on_progress=lambda value: forward({'type': 'progress', 'value': value}),
+                                       on_status=lambda text: forward({'type': 'status', 'text': text}),
+                                       cancel=cancel)
+                finally:
+                    with self.lock:
+                        self.busy -= 1
+                        self.stats['jobs'] += 1
+                    self.semaphore.release()
+                if cancel.cancelled:
+                    return
+                if not result.success:
+                    with self.lock:
+                        self.stats['failed'] += 1
+                    send({'type': 'result', 'result': result.to_dict()})
+                    return
+                blob, meta = self.pack_artifact(project, options, result)
+                message = {'type': 'result', 'result': result.to_dict(), 'artifact': meta}
+                send(message, None if meta['sha256'] == request.get('have') else blob)
+            finally:
+                workcache.unlock(in_use)
+        workcache.enforce_limit(self.projects_root(), self.max_bytes, keep=project)
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = read_message(self.rfile)
+        except (EOFError, ValueError):
+            return
+        node = self.server.node
+        if not token_matches(request.get('token'), self.server.token):
+            try:
+                write_message(self.wfile, {'type': 'error', 'message': 'unauthorized: wrong worker token'})
+            except OSError:
+                pass
+            return
+        try:
+            if request.get('op') == 'status':
+                write_message(self.wfile, node.status())
+            elif request.get('op') == 'build':
+                node.build(request, self.rfile, self.wfile)
+            else:
+                write_message(self.wfile, {'type': 'error', 'message': f"unknown op {request.get('op')!r}"})
+        except (OSError, EOFError):
+            # Client ngắt kết nối: không còn ai để báo
+            pass
+        except Exception as e:
+            try:
+                write_message(self.wfile, {'type': 'error', 'message': f'{type(e).__name__}: {e}'})
+            except OSError:
+                pass
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, node, token=''):
+        super().__init__(parse_address(address), WorkerHandler)
+        self.node = node
+        self.token = token
+
+
+def default_root():
+    from .envindex import cache_dir
+    return os.path.join(cache_dir(), 'worker')
+
+
+def serve(address=DEFAULT_ADDRESS, root=None, slots=1, max_mb=20480, token=''):
+    server = WorkerServer(address, WorkerNode(root or default_root(), slots, max_mb), token)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
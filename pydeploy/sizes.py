@@ -0,0 +1,189 @@
+"""Báo cáo dung lượng artifact theo package/binary/data từ các file TOC/warn PyInstaller để lại trong workpath"""
+import ast
+import json
+import os
+import re
+
+from .fsutil import write_json
+
+
+CONTENT_TYPES = {'PYMODULE', 'PYSOURCE', 'EXTENSION', 'BINARY', 'DATA', 'ZIPFILE', 'SPLASH'}
+MISSING_RE = re.compile(r'missing module named ([\w.]+)')
+
+
+def build_dir(options):
+    """Thư mục PyInstaller ghi TOC/warn/xref: <workpath>/<name>"""
+    return os.path.join(options.resolved_workpath(), options.output_name)
+
+
+def report_path(options):
+    return os.path.join(options.script_dir, 'build', f'.pydeploy-sizes-{options.output_name}.json')
+
+
+def read_toc(path):
+    """Đọc file .toc (Python literal) và trả về mọi entry (name, path, typecode)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = ast.literal_eval(f.read())
+    except (OSError, ValueError, SyntaxError):
+        return []
+
+    entries = []
+    pending = [data]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, tuple) and len(item) == 3 and all(isinstance(x, str) for x in item):
+            entries.append(item)
+        elif isinstance(item, (list, tuple)):
+            pending.extend(item)
+        elif isinstance(item, dict):
+            pending.extend(item.values())
+    return entries
+
+
+def archive_lengths(workdir, name):
+    """Kích thước nén của từng entry trong PKG và PYZ, đọc bằng reader của PyInstaller nếu có"""
+    compressed = {}
+    try:
+        from PyInstaller.archive.readers import CArchiveReader, ZlibArchiveReader
+    except ImportError:
+        return compressed
+
+    pkg_path = os.path.join(workdir, f'{name}.pkg')
+    try:
+        for entry_name, entry in dict(CArchiveReader(pkg_path).toc).items():
+            # (offset, length nén, length gốc, cờ nén, typecode)
+            compressed[entry_name] = entry[1]
+    except Exception:
+        pass
+
+    for filename in os.listdir(workdir):
+        if not filename.endswith('.pyz'):
+            continue
+        try:
+            for entry_name, entry in dict(ZlibArchiveReader(os.path.join(workdir, filename)).toc).items():
+                compressed[entry_name] = entry[-1]
+        except Exception:
+            pass
+    return compressed
+
+
+def owner_of(entry_name, typecode):
+    """Gán entry cho package cấp cao nhất, hoặc binary/data đứng riêng"""
+    if typecode in ('PYMODULE', 'PYSOURCE'):
+        return 'package', entry_name.split('.')[0]
+    parts = re.split(r'[\\/]', entry_name)
+    if len(parts) > 1:
+        return 'package', parts[0]
+    if typecode == 'EXTENSION':
+        return 'package', entry_name.split('.')[0]
+    kind = 'data' if typecode in ('DATA', 'ZIPFILE', 'SPLASH') else 'binary'
+    return kind, entry_name
+
+
+def missing_modules(workdir, name):
+    try:
+        with open(os.path.join(workdir, f'warn-{name}.txt'), 'r', encoding='utf-8', errors='replace') as f:
+            return sorted({m.group(1) for m in MISSING_RE.finditer(f.read())})
+    except OSError:
+        return []
+
+
+def build_size_report(options):
+    """Tổng hợp bytes nén/gốc theo từng package, binary và data file của lần build gần nhất"""
+    workdir = build_dir(options)
+    if not os.path.isdir(workdir):
+        raise FileNotFoundError(f'PyInstaller work directory not found: {workdir}')
+
+    entries = {}
+    for filename in sorted(os.listdir(workdir)):
+        if filename.endswith('.toc') and filename.split('-')[0] in ('PYZ', 'PKG', 'COLLECT'):
+            for entry_name, path, typecode in read_toc(os.path.join(workdir, filename)):
+                if typecode in CONTENT_TYPES:
+                    entries.setdefault(entry_name, (path, typecode))
+
+    compressed = archive_lengths(workdir, options.output_name)
+    groups = {}
+    for entry_name, (path, typecode) in entries.items():
+        kind, owner = owner_of(entry_name, typecode)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        group = groups.setdefault(owner, {'name': owner, 'kind': kind, 'files': 0,
+                                          'bytes': 0, 'compressed_bytes': 0})
+        group['files'] += 1
+        group['bytes'] += size
+        # Binary/data của onedir không nén: kích thước nén = kích thước gốc
+        group['compressed_bytes'] += compressed.get(entry_name, size)
+
+    ranked = sorted(groups.values(), key=lambda g: g['compressed_bytes'], reverse=True)
+    return {
+        'name': options.output_name,
+        'total_bytes': sum(g['bytes'] for g in ranked),
+        'total_compressed_bytes': sum(g['compressed_bytes'] for g in ranked),
+        'exact_compression': bool(compressed),
+        'groups': ranked,
+        'missing_modules': missing_modules(workdir, options.output_name)
+    }
+
+
+def load_previous(options):
+    try:
+        with open(report_path(options), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_report(options, report):
+    write_json(report_path(options), report, indent=2)
+
+
+def diff_reports(old, new, min_bytes=1024):
+    """Các nhóm tăng/giảm dung lượng so với lần build trước, sắp theo mức thay đổi"""
+    if not old:
+        return []
+    before = {g['name']: g['compressed_bytes'] for g in old.get('groups', [])}
+    after = {g['name']: g['compressed_bytes'] for g in new['groups']}
+    changes = []
+    for name in set(before) | set(after):
+        delta = after.get(name, 0) - before.get(name, 0)
+        if abs(delta) >= min_bytes:
+            changes.append({'name': name, 'before': before.get(name, 0),
+                            'after': after.get(name, 0), 'delta': delta})
+    return sorted(changes, key=lambda c: abs(c['delta']), reverse=True)
+
+
+def size_report(options):
+    """Tạo báo cáo, so với báo cáo trước của cùng project rồi lưu lại làm mốc mới"""
+    report = build_size_report(options)
+    report['diff'] = diff_reports(load_previous(options), report)
+    save_report(options, report)
+    return report
+
+
+def human_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+def format_size_report(report, top=15):
+    lines = [f"Size of {report['name']}: {human_size(report['total_compressed_bytes'])} compressed, "
+             f"{human_size(report['total_bytes'])} uncompressed"]
+    if not report['exact_compression']:
+        lines.append('  (PyInstaller archive readers unavailable: compressed = uncompressed sizes)')
+    for group in report['groups'][:top]:
+        lines.append(f"  {human_size(group['compressed_bytes']):>10}  {human_size(group['bytes']):>10}  "
+                     f"{group['kind']:<7} {group['name']} ({group['files']} files)")
+    if report.get('diff'):
+        lines.append('Changes since previous build:')
+        for change in report['diff'][:top]:
+            sign = '+' if change['delta'] > 0 else '-'
+            lines.append(f"  {sign}{human_size(abs(change['delta'])):>10}  {change['name']}")
+    if report['missing_modules']:
+        lines.append(f"Missing modules reported by PyInstaller: {len(report['missing_modules'])}")
+    return '\n'.join(lines)
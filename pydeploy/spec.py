@@ -0,0 +1,174 @@
+"""Sinh file .spec cho nhiều biến thể (console/windowed × onefile/onedir) dùng chung một Analysis"""
+import os
+from dataclasses import replace
+
+from .engine import get_gui_imports, run_build
+
+
+VARIANTS = ['console-onefile', 'console-onedir', 'windowed-onefile', 'windowed-onedir']
+
+
+def variant_name(options, variant):
+    return f'{options.output_name}-{variant}'
+
+
+def spec_path(options):
+    return os.path.join(options.resolved_workpath(), f'{options.output_name}-variants.spec')
+
+
+def analysis_block(options, var='a'):
+    """Khối Analysis cho một script; var là tên biến trong spec"""
+    runtime_hooks = []
+    if options.startup_hook:
+        from .startup import HOOK_PATH
+        runtime_hooks.append(HOOK_PATH)
+    pathex, datas = [options.script_dir], []
+    hiddenimports = get_gui_imports(options.gui_framework) + list(options.hidden_imports)
+    if options.asset_dirs:
+        from . import assets
+        pathex.append(assets.runtime_dir(options))
+        hiddenimports.append(assets.RUNTIME_MODULE)
+        if options.assets_inside:
+            datas.append((assets.archive_path(options), '.'))
+    return [
+        f'{var} = Analysis(',
+        f'    [{os.path.abspath(options.script)!r}],',
+        f'    pathex={pathex!r},',
+        '    binaries=[],',
+        f'    datas={datas!r},',
+        f'    hiddenimports={hiddenimports!r},',
+        '    hookspath=[],',
+        '    hooksconfig={},',
+        f'    runtime_hooks={runtime_hooks!r},',
+        f'    excludes={list(options.excludes)!r},',
+        f'    noarchive={options.noarchive!r},',
+    ] + ([f'    optimize={options.optimize},'] if options.optimize else []) + [
+        ')',
+    ]
+
+
+def generate_spec(options, variants):
+    """Nội dung spec: một Analysis + PYZ, mỗi biến thể một EXE (và COLLECT nếu là onedir)"""
+    lines = [
+        '# -*- mode: python ; coding: utf-8 -*-',
+        f'# Generated by PyDeploy: {len(variants)} variant(s) sharing one Analysis',
+        '',
+        *analysis_block(options),
+        *upx_lines(options),
+        'pyz = PYZ(a.pure)',
+        '',
+    ]
+    for i, variant in enumerate(variants):
+        lines += exe_block(options, i, variant_name(options, variant), variant.endswith('onefile'),
+                           variant.startswith('console'), strip=options.strip and not options.upx)
+    return '\n'.join(lines)
+
+
+def upx_lines(options):
+    # Binary đã được strip trước khi nén, nên EXE/COLLECT không strip lại bản UPX
+    if not options.upx:
+        return []
+    from .upx import spec_lines
+    return spec_lines(options)
+
+
+def exe_block(options, i, name, onefile, console, strip=None):
+    """EXE (onefile) hoặc EXE + COLLECT (onedir) dùng Analysis `a` và `pyz` của spec"""
+    icon = options.icon or None
+    strip = options.strip if strip is None else strip
+    if onefile:
+        return [
+            f'exe_{i} = EXE(',
+            '    pyz, a.scripts, a.binaries, a.datas, [],',
+            f'    name={name!r}, debug=False, bootloader_ignore_signals=False, strip={strip!r},',
+            f'    upx=False, runtime_tmpdir=None, console={console!r}, icon={icon!r},',
+            ')',
+            '',
+        ]
+    return [
+        f'exe_{i} = EXE(',
+        '    pyz, a.scripts, [], exclude_binaries=True,',
+        f'    name={name!r}, debug=False, bootloader_ignore_signals=False, strip={strip!r},',
+        f'    upx=False, console={console!r}, icon={icon!r},',
+        ')',
+        f'coll_{i} = COLLECT(exe_{i}, a.binaries, a.datas, strip={strip!r}, upx=False, name={name!r})',
+        '',
+    ]
+
+
+def build_spec_path(options):
+    # Cùng tên với output để PyInstaller dùng <workpath>/<name> như khi build bằng tham số dòng lệnh
+    return os.path.join(options.resolved_workpath(), f'{options.output_name}.spec')
+
+
+def generate_build_spec(options):
+    """Spec tương đương build thường, kèm bước nén UPX song song có cache thay cho UPX tuần tự của PyInstaller"""
+    return '\n'.join([
+        '# -*- mode: python ; coding: utf-8 -*-',
+        '# Generated by PyDeploy: UPX compression with a hash-keyed cache',
+        '',
+        *analysis_block(options),
+        *upx_lines(options),
+        'pyz = PYZ(a.pure)',
+        '',
+        *exe_block(options, 0, options.output_name, options.onefile, not options.noconsole, strip=False),
+    ])
+
+
+def write_build_spec(options):
+    path = build_spec_path(options)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_build_spec(options))
+    return path
+
+
+def write_spec(options, variants):
+    path = spec_path(options)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_spec(options, variants))
+    return path
+
+
+def spec_args(options, spec_file):
+    # Khi build từ spec PyInstaller chỉ nhận các tuỳ chọn đường dẫn / dọn dẹp
+    args = [spec_file, f'--distpath={options.resolved_distpath()}',
+            f'--workpath={options.resolved_workpath()}', '-y']
+    if options.clean and not options.warm:
+        args.append('--clean')
+    if options.upx:
+        # PyDeploy đã tự nén song song: không để PyInstaller nén lại tuần tự bằng upx tìm thấy trên PATH
+        args.append('--noupx')
+    return args
+
+
+def estimate_savings(result, variant_count):
+    """Build riêng từng biến thể sẽ lặp lại phần khởi động + analysis + hook (variant_count - 1) lần"""
+    phases = result.phases.get('phases', {})
+    shared = sum(phases.get(name, 0) for name in ('startup', 'analysis', 'hooks'))
+    separate = result.duration + shared * (variant_count - 1)
+    return {
+        'variants': variant_count,
+        'duration': round(result.duration, 3),
+        'shared_analysis_seconds': round(shared, 3),
+        'estimated_separate_seconds': round(separate, 3),
+        'estimated_saved_seconds': round(separate - result.duration, 3)
+    }
+
+
+def build_variants(options, variants, on_output=None, on_progress=None, on_status=None, cancel=None,
+                   on_resources=None):
+    """Build mọi biến thể trong một lần chạy PyInstaller; trả về (BuildResult, thống kê thời gian tiết kiệm)"""
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        raise ValueError(f'Unknown variant(s): {", ".join(unknown)}')
+    options = replace(options, incremental=False)
+    spec_file = write_spec(options, variants)
+    result = run_build(options, on_output, on_progress, on_status, cancel, args=spec_args(options, spec_file),
+                       on_resources=on_resources)
+    savings = estimate_savings(result, len(variants))
+    if result.success and on_output:
+        on_output(f"{len(variants)} variants in {savings['duration']:.1f}s, ~{savings['estimated_saved_seconds']:.1f}s "
+                  f"saved vs separate builds (analysis shared: {savings['shared_analysis_seconds']:.1f}s)")
+    return result, savings
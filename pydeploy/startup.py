@@ -0,0 +1,123 @@
+"""Đo độ trễ khởi động của file exe đã build: lần chạy đầu/warm, chi phí giải nén onefile, import time"""
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+
+HOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_hook.py')
+
+
+def artifact_mode(artifact):
+    """onedir nếu cạnh exe có thư mục _internal (PyInstaller 6) hoặc thư viện python, ngược lại onefile"""
+    folder = os.path.dirname(os.path.abspath(artifact))
+    if os.path.isdir(os.path.join(folder, '_internal')):
+        return 'onedir'
+    for name in os.listdir(folder):
+        if name.startswith(('python3', 'libpython3', 'base_library')):
+            return 'onedir'
+    return 'onefile'
+
+
+def launch(artifact, mode='exit', timeout=30, import_timeout=5):
+    """Chạy artifact một lần; trả về dict wall time + report của runtime hook (nếu có)"""
+    fd, report_path = tempfile.mkstemp(prefix='pydeploy-startup-', suffix='.json')
+    os.close(fd)
+    os.remove(report_path)
+
+    env = dict(os.environ)
+    env.update({
+        'PYDEPLOY_STARTUP_REPORT': report_path,
+        'PYDEPLOY_STARTUP_MODE': mode,
+        'PYDEPLOY_STARTUP_TIMEOUT': str(import_timeout),
+        'PYDEPLOY_STARTUP_T0': repr(time.time())
+    })
+    started = time.perf_counter()
+    timed_out = False
+    try:
+        subprocess.run([artifact], env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+    wall = time.perf_counter() - started
+
+    run = {'wall_seconds': round(wall, 4), 'timed_out': timed_out, 'hook': False}
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        os.remove(report_path)
+        run.update({
+            'hook': True,
+            'time_to_python': round(report['time_to_python'], 4),
+            'imports': report.get('imports', {})
+        })
+    except (OSError, ValueError):
+        pass
+    return run
+
+
+def median_of(runs, key):
+    values = [run[key] for run in runs if key in run]
+    return round(statistics.median(values), 4) if values else None
+
+
+def top_imports(imports, count=20):
+    ranked = sorted(imports.items(), key=lambda item: item[1]['self_us'], reverse=True)
+    return [{'module': name, **timing} for name, timing in ranked[:count]]
+
+
+def profile_startup(artifact, runs=5, imports=False, timeout=30, import_timeout=5):
+    """Chạy artifact `runs` lần: lần đầu (first_run) và trung vị các lần sau (warm).
+    Lần đầu không phải cold start thật: page cache vẫn còn file vừa build, chỉ khác ở cache của chính app
+    (vd. __pycache__, thư mục giải nén onefile) và bộ nhớ đệm của OS cho process mới"""
+    samples = [launch(artifact, 'exit', timeout) for _ in range(max(runs, 1))]
+    warm = samples[1:] or samples
+    report = {
+        'artifact': os.path.abspath(artifact),
+        'mode': artifact_mode(artifact),
+        'size_bytes': os.path.getsize(artifact),
+        'hook': samples[0]['hook'],
+        'runs': samples,
+        'first_run': {'wall_seconds': samples[0]['wall_seconds'],
+                 'time_to_python': samples[0].get('time_to_python')},
+        'warm': {'wall_seconds': median_of(warm, 'wall_seconds'),
+                 'time_to_python': median_of(warm, 'time_to_python')}
+    }
+    if not report['hook']:
+        report['note'] = ('Artifact was built without the startup hook; only process wall time '
+                          'is measured. Rebuild with the startup profiling option.')
+    if imports and report['hook']:
+        run = launch(artifact, 'imports', timeout, import_timeout)
+        report['imports'] = top_imports(run.get('imports', {}))
+    return report
+
+
+def compare_modes(reports):
+    """Chi phí giải nén của onefile = time_to_python warm của onefile trừ của onedir"""
+    by_mode = {report['mode']: report for report in reports}
+    onefile, onedir = by_mode.get('onefile'), by_mode.get('onedir')
+    if not onefile or not onedir:
+        return None
+    a, b = onefile['warm']['time_to_python'], onedir['warm']['time_to_python']
+    if a is None or b is None:
+        a, b = onefile['warm']['wall_seconds'], onedir['warm']['wall_seconds']
+    return {'onefile_warm': a, 'onedir_warm': b, 'extraction_overhead_seconds': round(a - b, 4)}
+
+
+def format_report(report):
+    lines = [f"{os.path.basename(report['artifact'])} ({report['mode']}, "
+             f"{report['size_bytes'] / 1024 / 1024:.1f} MB)"]
+    for key, label in (('first_run', 'first run'), ('warm', 'warm')):
+        timing = report[key]
+        line = f"  {label}: {timing['wall_seconds']}s total"
+        if timing['time_to_python'] is not None:
+            line += f", {timing['time_to_python']}s to Python"
+        lines.append(line)
+    if report.get('note'):
+        lines.append(f"  {report['note']}")
+    for entry in report.get('imports', [])[:10]:
+        lines.append(f"  import {entry['module']}: {entry['self_us'] / 1000:.1f} ms self, "
+                     f"{entry['cumulative_us'] / 1000:.1f} ms cumulative")
+    return '\n'.join(lines)
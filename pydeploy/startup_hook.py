@@ -0,0 +1,82 @@
+# PyInstaller runtime hook của PyDeploy: đo thời gian khởi động của app đã đóng gói.
+# Không làm gì trừ khi biến môi trường PYDEPLOY_STARTUP_REPORT được đặt (do `pydeploy startup`).
+import os
+
+_report_path = os.environ.get('PYDEPLOY_STARTUP_REPORT')
+
+if _report_path:
+    import atexit
+    import json
+    import sys
+    import threading
+    import time
+
+    _hook_time = time.time()
+    _launch_time = float(os.environ.get('PYDEPLOY_STARTUP_T0', _hook_time))
+    _mode = os.environ.get('PYDEPLOY_STARTUP_MODE', 'exit')
+    _imports = {}
+    _stack = []
+
+    def _write_report():
+        data = {
+            'time_to_python': _hook_time - _launch_time,
+            'time_to_exit': time.time() - _launch_time,
+            'bundle_dir': getattr(sys, '_MEIPASS', ''),
+            'imports': _imports
+        }
+        with open(_report_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    class _TimedLoader:
+        """Bọc loader thật để đo thời gian exec_module (cumulative và self)"""
+
+        def __init__(self, loader, name):
+            self._loader = loader
+            self._name = name
+
+        def __getattr__(self, attr):
+            return getattr(self._loader, attr)
+
+        def create_module(self, spec):
+            return self._loader.create_module(spec)
+
+        def exec_module(self, module):
+            _stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                self._loader.exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - started
+                children = _stack.pop()
+                if _stack:
+                    _stack[-1] += cumulative
+                _imports[self._name] = {'self_us': int((cumulative - children) * 1e6),
+                                        'cumulative_us': int(cumulative * 1e6)}
+
+    class _TimingFinder:
+        def find_spec(self, name, path=None, target=None):
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(spec.loader, name)
+                    return spec
+            return None
+
+    if _mode == 'exit':
+        # Chỉ đo bootloader + giải nén + khởi tạo interpreter
+        _write_report()
+        os._exit(0)
+
+    sys.meta_path.insert(0, _TimingFinder())
+    atexit.register(_write_report)
+
+    def _stop_after_timeout():
+        # App GUI không tự thoát: ghi report rồi dừng sau khoảng thời gian cho phép
+        time.sleep(float(os.environ.get('PYDEPLOY_STARTUP_TIMEOUT', '5')))
+        _write_report()
+        os._exit(0)
+
+    threading.Thread(target=_stop_after_timeout, daemon=True).start()
@@ -0,0 +1,126 @@
+"""Build một bộ nhiều executable dùng chung dependency (MERGE / COLLECT chung), so dung lượng với build riêng"""
+import os
+from dataclasses import replace
+
+from .bench import artifact_size
+from .engine import run_build
+from .sizes import human_size, read_toc
+from .spec import analysis_block, spec_args
+
+
+DEPENDENCY_TYPES = {'BINARY', 'EXTENSION', 'DATA', 'ZIPFILE'}
+
+
+def tool_options(base, scripts):
+    """Một BuildOptions cho mỗi script, dùng chung các tuỳ chọn còn lại của base"""
+    return [replace(base, script=os.path.abspath(script), name='') for script in scripts]
+
+
+def generate_suite_spec(suite_name, tools, onefile):
+    """Onedir: mọi EXE vào một COLLECT (chung _internal). Onefile: MERGE để các EXE sau tham chiếu dependency của EXE đầu"""
+    icon = tools[0].icon or None
+    lines = [
+        '# -*- mode: python ; coding: utf-8 -*-',
+        f'# Generated by PyDeploy: suite {suite_name!r} with {len(tools)} executable(s)',
+        '',
+    ]
+    for i, tool in enumerate(tools):
+        lines += analysis_block(tool, f'a_{i}')
+    lines.append('')
+
+    if onefile:
+        merge = ', '.join(f'(a_{i}, {t.output_name!r}, {t.output_name!r})' for i, t in enumerate(tools))
+        lines += [f'MERGE({merge})', '']
+
+    for i, tool in enumerate(tools):
+        lines.append(f'pyz_{i} = PYZ(a_{i}.pure)')
+        if onefile:
+            lines += [
+                f'exe_{i} = EXE(',
+                f'    pyz_{i}, a_{i}.scripts, a_{i}.binaries, a_{i}.datas, a_{i}.dependencies,',
+                f'    name={tool.output_name!r}, debug=False, strip={tool.strip!r}, upx=False,',
+                f'    runtime_tmpdir=None, console={not tool.noconsole!r}, icon={icon!r},',
+                ')',
+            ]
+        else:
+            lines += [
+                f'exe_{i} = EXE(',
+                f'    pyz_{i}, a_{i}.scripts, [], exclude_binaries=True,',
+                f'    name={tool.output_name!r}, debug=False, strip={tool.strip!r}, upx=False,',
+                f'    console={not tool.noconsole!r}, icon={icon!r},',
+                ')',
+            ]
+        lines.append('')
+
+    if not onefile:
+        parts = ', '.join(f'exe_{i}, a_{i}.binaries, a_{i}.datas' for i in range(len(tools)))
+        lines.append(f'coll = COLLECT({parts}, strip={tools[0].strip!r}, upx=False, name={suite_name!r})')
+    return '\n'.join(lines) + '\n'
+
+
+def separate_estimate(workdir, dist_bytes):
+    """Ước tính tổng dung lượng nếu build riêng: mỗi Analysis mang bản dependency riêng của nó"""
+    shared = 0
+    per_tool = 0
+    seen = set()
+    for filename in sorted(os.listdir(workdir)) if os.path.isdir(workdir) else []:
+        if not (filename.startswith('Analysis-') and filename.endswith('.toc')):
+            continue
+        for _, path, typecode in set(read_toc(os.path.join(workdir, filename))):
+            if typecode not in DEPENDENCY_TYPES or path.startswith(':'):
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            per_tool += size
+            if path not in seen:
+                seen.add(path)
+                shared += size
+    return max(dist_bytes, dist_bytes + per_tool - shared)
+
+
+def build_suite(scripts, options, on_output=None, on_progress=None, on_status=None, cancel=None):
+    """Build mọi script trong một lần chạy PyInstaller; trả về (BuildResult, báo cáo dung lượng)"""
+    if not scripts:
+        raise ValueError('No scripts given')
+    tools = tool_options(options, scripts)
+    names = [tool.output_name for tool in tools]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Duplicate executable names: {", ".join(names)}')
+
+    suite_name = options.name or f'{names[0]}-suite'
+    primary = replace(tools[0], name=suite_name, incremental=False)
+    workpath = primary.resolved_workpath()
+    spec_file = os.path.join(workpath, f'{suite_name}.spec')
+    os.makedirs(workpath, exist_ok=True)
+    with open(spec_file, 'w', encoding='utf-8') as f:
+        f.write(generate_suite_spec(suite_name, tools, options.onefile))
+
+    result = run_build(primary, on_output, on_progress, on_status, cancel, args=spec_args(primary, spec_file))
+    if not result.success:
+        return result, None
+
+    distpath = primary.resolved_distpath()
+    if options.onefile:
+        outputs = [os.path.join(distpath, name) for name in names]
+        outputs = [p for p in outputs + [p + '.exe' for p in outputs] if os.path.exists(p)]
+    else:
+        outputs = [os.path.join(distpath, suite_name)]
+        result.artifact = outputs[0]
+
+    # COLLECT chung / MERGE đã chỉ giữ một bản mỗi dependency: dung lượng thật là tổng các output
+    output_bytes = sum(artifact_size(p) for p in outputs)
+    separate_bytes = separate_estimate(os.path.join(workpath, suite_name), output_bytes)
+    stats = {'tools': names, 'output_bytes': output_bytes, 'separate_bytes': separate_bytes,
+             'saved_bytes': separate_bytes - output_bytes}
+    if on_output:
+        on_output(format_suite_report(stats))
+    return result, stats
+
+
+def format_suite_report(stats):
+    return (f"Suite: {len(stats['tools'])} executables\n"
+            f"  separate builds (est.): {human_size(stats['separate_bytes'])}\n"
+            f"  merged output:          {human_size(stats['output_bytes'])} "
+            f"(-{human_size(stats['saved_bytes'])} shared dependencies)")
@@ -0,0 +1,195 @@
+"""Nén binary bằng UPX song song trên nhiều core, kết quả cache theo hash file + phiên bản/cờ UPX.
+PyInstaller được gọi với upx=False; spec do PyDeploy sinh thay a.binaries bằng bản đã nén trong cache."""
+import fnmatch
+import functools
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .fingerprint import file_digest
+from .fsutil import tmp_name
+
+
+UPX_FLAGS = ['--best', '-q']
+UPX_CACHE_MB = 4096
+
+# Binary hay hỏng sau khi nén: runtime MSVC/UCRT, Python DLL/.so, plugin platform của Qt,
+# .dylib (chữ ký số trên macOS)
+DEFAULT_EXCLUDES = ['vcruntime140*.dll', 'msvcp140*.dll', 'ucrtbase.dll', 'api-ms-win-*.dll',
+                    'python3*.dll', 'libpython3*.so*', 'qwindows.dll', '*.dylib']
+
+
+def cache_root():
+    from .envindex import cache_dir
+    return os.path.join(cache_dir(), 'upx')
+
+
+def find_upx(upx_dir=''):
+    if upx_dir:
+        for name in ('upx.exe', 'upx'):
+            path = os.path.join(upx_dir, name)
+            if os.path.isfile(path):
+                return path
+        return None
+    return shutil.which('upx')
+
+
+@functools.lru_cache(maxsize=None)
+def upx_version(upx):
+    """Dòng đầu của `upx -V`, vd. 'upx 4.2.2'; rỗng nếu không chạy được"""
+    try:
+        process = subprocess.run([upx, '-V'], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return ''
+    lines = process.stdout.strip().splitlines()
+    return lines[0].strip() if process.returncode == 0 and lines else ''
+
+
+def strip_command():
+    if sys.platform == 'win32' or not shutil.which('strip'):
+        return None
+    return ['strip', '-S'] if sys.platform == 'darwin' else ['strip']
+
+
+def exclude_patterns(options):
+    return DEFAULT_EXCLUDES + list(options.upx_exclude)
+
+
+def is_excluded(name, patterns):
+    name = os.path.basename(name).lower()
+    return any(fnmatch.fnmatch(name, pattern.lower()) for pattern in patterns)
+
+
+def cache_key(source, steps):
+    return hashlib.sha256('\0'.join([file_digest(source)] + steps).encode('utf-8')).hexdigest()
+
+
+def process_binary(source, upx, flags, strip, excluded, objects):
+    """Strip và/hoặc nén một binary qua cache; trả về (đường dẫn dùng thay source, trạng thái).
+    Trạng thái: excluded / hit / compressed / skipped (UPX từ chối file, được nhớ để không thử lại)"""
+    steps = []
+    if strip:
+        steps.append('strip:' + ' '.join(strip))
+    if not excluded:
+        steps += ['upx:' + upx_version(upx)] + list(flags)
+    if not steps:
+        return source, 'excluded'
+    key = cache_key(source, steps)
+    entry = os.path.join(objects, key[:2], key)
+    if os.path.isfile(entry + '.skip'):
+        os.utime(entry + '.skip')
+        return source, 'excluded' if excluded else 'skipped'
+    if os.path.isfile(entry):
+        os.utime(entry)
+        return entry, 'hit'
+
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    work = tmp_name(entry)
+    shutil.copyfile(source, work)
+    try:
+        changed = False
+        if strip:
+            changed = subprocess.run(strip + [work], stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.DEVNULL).returncode == 0
+        compressed = False
+        if not excluded:
+            # NotCompressible / AlreadyPacked / định dạng lạ: UPX trả mã lỗi và không sửa file
+            compressed = subprocess.run([upx] + list(flags) + [work], stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL).returncode == 0
+        if not (changed or compressed):
+            open(entry + '.skip', 'w').close()
+            return source, 'skipped' if not excluded else 'excluded'
+        shutil.copymode(source, work)
+        os.replace(work, entry)
+    finally:
+        if os.path.exists(work):
+            os.remove(work)
+    return entry, 'compressed' if compressed else 'excluded'
+
+
+def compress_binaries(binaries, upx, excludes, objects, workers=0, strip=False, flags=UPX_FLAGS):
+    """Gọi trong spec sau Analysis: nén song song các entry (dest, source, typecode) của a.binaries,
+    trả về TOC cùng kiểu với source trỏ vào bản đã nén trong cache.
+    Không có upx thì vẫn strip (spec đã tắt strip của EXE khi bật UPX), chỉ bỏ bước nén"""
+    strip = strip_command() if strip else None
+    compress = bool(upx) and bool(upx_version(upx))
+    if not compress:
+        print('PyDeploy UPX: upx not found, binaries are not compressed' + (', stripping only' if strip else ''))
+        if not strip:
+            return binaries
+    entries = list(binaries)
+    stats = {'files': 0, 'hit': 0, 'compressed': 0, 'skipped': 0, 'excluded': 0, 'before': 0, 'after': 0}
+
+    def run(entry):
+        dest, source, typecode = entry
+        try:
+            excluded = not compress or is_excluded(dest, excludes)
+            path, status = process_binary(source, upx, flags, strip, excluded, objects)
+        except OSError as e:
+            print(f'PyDeploy UPX: {dest}: {e}')
+            path, status = source, 'skipped'
+        return (dest, path, typecode), status, os.path.getsize(source), os.path.getsize(path)
+
+    result = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        # Mỗi thread chờ một process strip/UPX nên dùng thread là đủ chạy song song trên mọi core
+        for entry, status, before, after in executor.map(run, entries):
+            result.append(entry)
+            stats['files'] += 1
+            stats[status] += 1
+            stats['before'] += before
+            stats['after'] += after
+    print(format_stats(stats))
+    trim_cache(objects)
+    return type(binaries)(result)
+
+
+def trim_cache(objects, max_bytes=UPX_CACHE_MB * 1024 * 1024):
+    """Xoá object ít dùng nhất (theo mtime, được touch mỗi lần hit) khi cache vượt max_bytes"""
+    entries = []
+    for dirpath, _, filenames in os.walk(objects):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        evicted.append(path)
+    return evicted
+
+
+def format_stats(stats):
+    from .sizes import human_size
+
+    saved = stats['before'] - stats['after']
+    return (f"PyDeploy UPX: {stats['files']} binaries, {stats['hit']} cached, {stats['compressed']} compressed, "
+            f"{stats['skipped']} not compressible, {stats['excluded']} excluded; "
+            f"{human_size(stats['before'])} -> {human_size(stats['after'])} (-{human_size(saved)})")
+
+
+def spec_lines(options):
+    """Các dòng spec chèn sau Analysis để thay a.binaries bằng bản đã nén"""
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    upx = find_upx(options.upx_dir) or ''
+    return [
+        'import sys',
+        f'sys.path.insert(0, {package_root!r})',
+        'from pydeploy.upx import compress_binaries',
+        f'a.binaries = compress_binaries(a.binaries, {upx!r}, {exclude_patterns(options)!r},',
+        f'                               {os.path.join(cache_root(), "objects")!r}, workers={options.upx_workers},',
+        f'                               strip={options.strip!r})',
+    ]
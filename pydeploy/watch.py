@@ -0,0 +1,177 @@
+"""Watch mode headless: theo dõi script và các module local bằng thông báo của hệ điều hành,
+debounce các lần lưu liên tiếp và huỷ build đang chạy khi input thay đổi"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from .engine import run_build
+from .imports import ParseCache, build_import_graph, import_cache_path
+from .procs import CancelToken
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Theo dõi thư mục chứa các file (bắt được cả kiểu lưu ghi-file-tạm-rồi-rename của editor)"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        self.files = set()
+
+    def watch(self, files):
+        self.files = {os.path.abspath(f) for f in files}
+        for directory in {os.path.dirname(f) for f in self.files} - set(self.dirs.values()):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = directory
+
+    def read(self, timeout):
+        """Chờ tối đa timeout giây; trả về các file đang theo dõi vừa thay đổi"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            path = os.path.join(self.dirs.get(wd, ''), os.fsdecode(name))
+            if path in self.files:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WatchdogWatcher:
+    """Dùng package watchdog (nếu có cài) trên Windows/macOS"""
+
+    def __init__(self):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+        self.files = set()
+        self.changed = set()
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.watched_dirs = set()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                for path in (getattr(event, 'src_path', ''), getattr(event, 'dest_path', '')):
+                    if path and os.path.abspath(path) in watcher.files:
+                        with watcher.lock:
+                            watcher.changed.add(os.path.abspath(path))
+                        watcher.event.set()
+
+        self.handler = Handler()
+        self.observer = Observer()
+        self.observer.start()
+
+    def watch(self, files):
+        self.files = {os.path.abspath(f) for f in files}
+        for directory in {os.path.dirname(f) for f in self.files} - self.watched_dirs:
+            self.observer.schedule(self.handler, directory, recursive=False)
+            self.watched_dirs.add(directory)
+
+    def read(self, timeout):
+        self.event.wait(timeout)
+        with self.lock:
+            changed, self.changed = self.changed, set()
+            self.event.clear()
+        return changed
+
+    def close(self):
+        self.observer.stop()
+
+
+def create_watcher():
+    if sys.platform.startswith('linux'):
+        return InotifyWatcher()
+    try:
+        return WatchdogWatcher()
+    except ImportError:
+        raise RuntimeError('Watch mode needs Linux inotify or the watchdog package (pip install watchdog)')
+
+
+def watched_files(options):
+    files = build_import_graph(options.script, ParseCache(import_cache_path(options.script))).files
+    if options.icon and os.path.isfile(options.icon):
+        files.append(os.path.abspath(options.icon))
+    return files
+
+
+class BuildRunner:
+    """Chạy một build trong thread nền, có thể huỷ"""
+
+    def __init__(self, options, on_output, on_finished):
+        self.token = CancelToken()
+        self.thread = threading.Thread(target=self.run, args=(options, on_output, on_finished), daemon=True)
+        self.thread.start()
+
+    def run(self, options, on_output, on_finished):
+        on_finished(run_build(options, on_output, cancel=self.token))
+
+    def cancel(self):
+        self.token.cancel()
+        self.thread.join()
+
+    def running(self):
+        return self.thread.is_alive()
+
+
+def watch(options, debounce=0.5, on_output=print, on_finished=None, stop_event=None):
+    """Rebuild mỗi khi script hoặc module local thay đổi; thay đổi trong lúc build sẽ huỷ build cũ"""
+    on_finished = on_finished or (lambda result: on_output(result.message))
+    stop_event = stop_event or threading.Event()
+    watcher = create_watcher()
+    watcher.watch(watched_files(options))
+    runner = BuildRunner(options, on_output, on_finished)
+
+    try:
+        while not stop_event.is_set():
+            changed = watcher.read(0.5)
+            if not changed:
+                continue
+            # Debounce: gom các lần lưu liên tiếp cho tới khi yên lặng đủ lâu
+            deadline = time.monotonic() + debounce
+            while time.monotonic() < deadline:
+                more = watcher.read(max(deadline - time.monotonic(), 0))
+                if more:
+                    changed |= more
+                    deadline = time.monotonic() + debounce
+
+            for path in sorted(changed):
+                on_output(f'Changed: {path}')
+            if runner.running():
+                on_output('Cancelling in-flight build...')
+                runner.cancel()
+            # Import mới có thể kéo thêm module local vào closure
+            watcher.watch(watched_files(options))
+            runner = BuildRunner(options, on_output, on_finished)
+    finally:
+        if runner.running():
+            runner.cancel()
+        watcher.close()
@@ -0,0 +1,121 @@
+"""Workpath "warm" cho từng bộ tuỳ chọn, giữ lại analysis cache của PyInstaller với giới hạn dung lượng LRU"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from .fingerprint import option_values
+
+
+WARM_DIR = os.path.join('build', 'warm')
+STAMP_FILE = '.pydeploy-last-used'
+# Mỗi build đang chạy giữ một file lock riêng trong workpath; eviction bỏ qua thư mục còn lock
+LOCK_PREFIX = '.pydeploy-in-use-'
+# Lock cũ hơn thế này là của build đã chết (crash, kill -9): không để nó chặn eviction mãi
+STALE_LOCK_SECONDS = 24 * 3600
+
+# Build song song trong cùng process (batch queue, worker nhiều slot): lấy lock và eviction không xen nhau
+_lock = threading.Lock()
+
+# Ngoài các tuỳ chọn không ảnh hưởng output (fingerprint.NON_OUTPUT_OPTIONS), distpath chỉ đổi chỗ ghi
+# kết quả chứ không đổi nội dung workpath; mọi tuỳ chọn còn lại (kể cả tuỳ chọn thêm sau này) đều vào key
+IGNORED_OPTIONS = {'distpath'}
+
+
+def options_key(options):
+    data = {key: value for key, value in option_values(options).items() if key not in IGNORED_OPTIONS}
+    data['script'] = os.path.abspath(data['script'])
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def warm_root(options):
+    return os.path.join(options.script_dir, WARM_DIR)
+
+
+def warm_workpath(options):
+    return os.path.join(warm_root(options), f'{options.output_name}-{options_key(options)}')
+
+
+def dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def last_used(path):
+    try:
+        return os.path.getmtime(os.path.join(path, STAMP_FILE))
+    except OSError:
+        return os.path.getmtime(path)
+
+
+def touch(path):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, STAMP_FILE), 'w') as f:
+        f.write(str(time.time()))
+
+
+def lock(path):
+    """Đánh dấu workpath đang được build dùng (và cập nhật last-used ngay từ đầu); trả về file lock cho unlock()"""
+    lock_file = os.path.join(path, f'{LOCK_PREFIX}{os.getpid()}-{threading.get_ident()}')
+    with _lock:
+        touch(path)
+        with open(lock_file, 'w') as f:
+            f.write(str(time.time()))
+    return lock_file
+
+
+def unlock(lock_file):
+    try:
+        os.remove(lock_file)
+    except OSError:
+        pass
+
+
+def in_use(path):
+    now = time.time()
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return False
+    for name in names:
+        if name.startswith(LOCK_PREFIX):
+            try:
+                if now - os.path.getmtime(os.path.join(path, name)) < STALE_LOCK_SECONDS:
+                    return True
+            except OSError:
+                pass
+    return False
+
+
+def enforce_limit(root, max_bytes, keep=None):
+    """Xoá các workpath ít dùng nhất (trừ keep và thư mục build khác đang dùng) cho tới khi tổng dung lượng
+    <= max_bytes; trả về danh sách đã xoá"""
+    if not os.path.isdir(root):
+        return []
+
+    entries = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            entries.append([last_used(path), dir_size(path), path])
+
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    with _lock:
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if keep and os.path.abspath(path) == os.path.abspath(keep) or in_use(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(path)
+    return evicted